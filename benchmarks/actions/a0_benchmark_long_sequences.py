@@ -0,0 +1,76 @@
+"""
+        Cost of launching and running long action sequences.
+
+        A sequence of n segments, like MoveBy + RotateBy + ... , is launched
+        with node.do on many nodes, and then the nodes are stepped at 60 fps.
+
+        Reported, in microseconds:
+            do: time per node.do call (includes the deepcopy of the template)
+            frame: time per frame, divided by the number of nodes
+
+        Both should be near constant as the number of segments grows.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import gc
+import time
+
+from cocos.director import director
+director.init(visible=False)
+
+from cocos.cocosnode import CocosNode
+import cocos.actions as ac
+
+stats_params = {
+    'segments': [2, 10, 50],
+    'num_nodes': 1000,
+    'dt': 1.0 / 60.0,
+    'num_frames': 60,
+    }
+
+def make_sequence(segments):
+    template = ac.MoveBy((10, 0), 0.5)
+    for i in range(1, segments):
+        if i % 2:
+            template = template + ac.RotateBy(15, 0.25)
+        else:
+            template = template + ac.MoveBy((0, 10), 0.5)
+    return template
+
+def measure(segments, stats_params):
+    template = make_sequence(segments)
+    nodes = [CocosNode() for i in range(stats_params['num_nodes'])]
+    gc.collect()
+    start_time = time.time()
+    for node in nodes:
+        node.do(template)
+    do_time = (time.time() - start_time) / len(nodes)
+
+    dt = stats_params['dt']
+    start_time = time.time()
+    for i in range(stats_params['num_frames']):
+        for node in nodes:
+            node._step(dt)
+    frame_time = ((time.time() - start_time) / stats_params['num_frames'] /
+                  len(nodes))
+    return do_time, frame_time
+
+def benchmark_long_sequences(stats_params):
+    stats = {}
+    for segments in stats_params['segments']:
+        stats[segments] = measure(segments, stats_params)
+    return stats
+
+def pprint_stats(stats, stats_params):
+    print('\ntimes per node in microseconds, %d nodes' %
+          stats_params['num_nodes'])
+    print('%10s %10s %10s' % ('segments', 'do', 'frame'))
+    for segments in stats_params['segments']:
+        do_time, frame_time = stats[segments]
+        print('%10d %10.2f %10.2f' % (segments, do_time * 1.0e6,
+                                      frame_time * 1.0e6))
+
+if __name__ == '__main__':
+    stats = benchmark_long_sequences(stats_params)
+    pprint_stats(stats, stats_params)
@@ -0,0 +1,89 @@
+"""
+        Time per frame moving many projectiles with WrappedMove, comparing
+        one WrappedMove action per node, stepped by node._step, with a single
+        SwarmMover.
+
+        Nodes are plain CocosNode, so the numbers exclude the sprite vertex
+        updates, which both modes trigger the same way by setting position.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import gc
+import random
+import time
+
+from cocos.director import director
+director.init(visible=False)
+
+from cocos.cocosnode import CocosNode
+import cocos.actions as ac
+
+stats_params = {
+    'num_nodes': [1000, 10000],
+    'dt': 1.0 / 60.0,
+    'num_frames': 30,
+    'width': 800,
+    'height': 600,
+    }
+
+def make_nodes(num_nodes, stats_params):
+    rand = random.Random(1)
+    nodes = []
+    for i in range(num_nodes):
+        node = CocosNode()
+        node.position = (rand.uniform(0, stats_params['width']),
+                         rand.uniform(0, stats_params['height']))
+        node.velocity = (rand.uniform(-200, 200), rand.uniform(-200, 200))
+        node.width = node.height = 8
+        nodes.append(node)
+    return nodes
+
+def actions_frames(nodes, stats_params):
+    move = ac.WrappedMove(stats_params['width'], stats_params['height'])
+    for node in nodes:
+        node.do(move)
+    def frame(dt):
+        for node in nodes:
+            node._step(dt)
+    return frame
+
+def swarm_frames(nodes, stats_params):
+    mover = ac.SwarmMover('wrap', stats_params['width'],
+                          stats_params['height'])
+    for node in nodes:
+        mover.add(node)
+    return mover.step
+
+def frame_times(setup, num_nodes, stats_params):
+    nodes = make_nodes(num_nodes, stats_params)
+    frame = setup(nodes, stats_params)
+    dt = stats_params['dt']
+    times = []
+    gc.collect()
+    for i in range(stats_params['num_frames']):
+        start_time = time.time()
+        frame(dt)
+        times.append(time.time() - start_time)
+    return times
+
+def benchmark_swarm_mover(stats_params):
+    stats = {}
+    for mode, setup in [('actions', actions_frames), ('swarm', swarm_frames)]:
+        for num_nodes in stats_params['num_nodes']:
+            stats[(mode, num_nodes)] = frame_times(setup, num_nodes,
+                                                   stats_params)
+    return stats
+
+def pprint_stats(stats, stats_params):
+    print('\ntime per frame in ms')
+    print('%10s %10s %10s' % ('nodes', 'mode', 'mean'))
+    for num_nodes in stats_params['num_nodes']:
+        for mode in ['actions', 'swarm']:
+            times = stats[(mode, num_nodes)]
+            print('%10d %10s %10.3f' % (num_nodes, mode,
+                                        sum(times) / len(times) * 1000))
+
+if __name__ == '__main__':
+    stats = benchmark_swarm_mover(stats_params)
+    pprint_stats(stats, stats_params)
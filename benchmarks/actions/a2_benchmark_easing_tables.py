@@ -0,0 +1,72 @@
+"""
+        Cost of the per frame math in the easing and path actions, computing
+        the curve each update (exact) or reading it from a lookup table.
+
+        Each case starts one action on many nodes and steps all the nodes;
+        the reported number is the time per update in microseconds, which
+        includes the update of the inner action.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import gc
+import time
+
+from cocos.director import director
+director.init(visible=False)
+
+from cocos.cocosnode import CocosNode
+from cocos.path import Bezier as BezierPath
+import cocos.actions as ac
+
+stats_params = {
+    'num_nodes': 1000,
+    'num_frames': 60,
+    'resolution': 256,
+    }
+
+path = BezierPath((0, 0), (300, 0), (50, 200), (250, -200))
+
+def cases(resolution):
+    inner = ac.RotateBy(90, 1)
+    return [
+        # the table through Ease, Accelerate always computes t**rate
+        ('Accelerate', ac.Accelerate(inner, 3.0),
+                       ac.Ease(inner, lambda t: t ** 3.0, resolution)),
+        ('JumpBy', ac.JumpBy((100, 0), 50, 3, 1),
+                   ac.JumpBy((100, 0), 50, 3, 1, resolution)),
+        ('Bezier', ac.Bezier(path, 1),
+                   ac.Bezier(path, 1, resolution=resolution)),
+        ]
+
+def time_per_update(template, stats_params):
+    nodes = [CocosNode() for i in range(stats_params['num_nodes'])]
+    for node in nodes:
+        node.do(template)
+    dt = 1.0 / stats_params['num_frames']
+    gc.collect()
+    start_time = time.time()
+    # stay below the action duration
+    for i in range(stats_params['num_frames'] - 1):
+        for node in nodes:
+            node._step(dt)
+    elapsed = time.time() - start_time
+    return elapsed / len(nodes) / (stats_params['num_frames'] - 1)
+
+def benchmark_easing_tables(stats_params):
+    stats = []
+    for name, exact, table in cases(stats_params['resolution']):
+        stats.append((name, time_per_update(exact, stats_params),
+                      time_per_update(table, stats_params)))
+    return stats
+
+def pprint_stats(stats, stats_params):
+    print('\ntime per update in microseconds, table resolution %d' %
+          stats_params['resolution'])
+    print('%12s %10s %10s' % ('action', 'exact', 'table'))
+    for name, exact, table in stats:
+        print('%12s %10.3f %10.3f' % (name, exact * 1.0e6, table * 1.0e6))
+
+if __name__ == '__main__':
+    stats = benchmark_easing_tables(stats_params)
+    pprint_stats(stats, stats_params)
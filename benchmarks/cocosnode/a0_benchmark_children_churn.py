@@ -0,0 +1,67 @@
+"""
+        Time per frame for a node with many children where each frame some
+        children are killed and the same number of new ones are added, as
+        with bullets; the frame ends iterating the children once, as visit
+        does.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import gc
+import random
+import time
+
+from cocos.director import director
+director.init(visible=False)
+
+from cocos.cocosnode import CocosNode
+
+stats_params = {
+    'num_children': [1000, 10000],
+    'churn': [10, 100, 1000],
+    'num_frames': 30,
+    }
+
+def frame_times(num_children, churn, stats_params):
+    rand = random.Random(1)
+    parent = CocosNode()
+    children = []
+    for i in range(num_children):
+        child = CocosNode()
+        parent.add(child, z=rand.randint(-5, 5))
+        children.append(child)
+    times = []
+    gc.collect()
+    for i in range(stats_params['num_frames']):
+        start_time = time.time()
+        for j in range(churn):
+            k = rand.randrange(len(children))
+            children[k].kill()
+            child = CocosNode()
+            parent.add(child, z=rand.randint(-5, 5))
+            children[k] = child
+        for z, child in parent.children:
+            pass
+        times.append(time.time() - start_time)
+    return times
+
+def benchmark_children_churn(stats_params):
+    stats = {}
+    for num_children in stats_params['num_children']:
+        for churn in stats_params['churn']:
+            stats[(num_children, churn)] = frame_times(num_children, churn,
+                                                       stats_params)
+    return stats
+
+def pprint_stats(stats, stats_params):
+    print('\ntime per frame in ms')
+    print('%10s %10s %10s' % ('children', 'churn', 'mean'))
+    for num_children in stats_params['num_children']:
+        for churn in stats_params['churn']:
+            times = stats[(num_children, churn)]
+            print('%10d %10d %10.3f' % (num_children, churn,
+                                        sum(times) / len(times) * 1000))
+
+if __name__ == '__main__':
+    stats = benchmark_children_churn(stats_params)
+    pprint_stats(stats, stats_params)
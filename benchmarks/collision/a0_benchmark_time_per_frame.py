@@ -17,7 +17,7 @@ base_demo_world_params = {
     'k_border': 10.0,
     'k_ball': 10.0,
     
-    'cshape_cls_name': None, # must be filled 'CircleShape' #'AARectShape'
+    'cshape_cls_name': None, # must be filled 'CircleShape' #'AARectShape' #'mixed'
     'collision_manager': None # must be filled, see below
     }
 
@@ -63,10 +63,40 @@ collman_cases = {
         'collman_cls_name': 'CollisionManagerGrid',
         'cshape_cls_name': 'CircleShape',
         'collman_gen_args': [3.0]
+        },
+    'Numpy, automatic cell size': {
+        'collman_cls_name': 'CollisionManagerNumpy',
+        'cshape_cls_name': 'CircleShape',
+        'collman_gen_args': []
+        },
+    'SweepAndPrune': {
+        'collman_cls_name': 'CollisionManagerSweepAndPrune',
+        'cshape_cls_name': 'CircleShape',
+        'collman_gen_args': []
         }
     }
 
-# Always Grid, CircleShape vs AARectShape
+# Grid vs Numpy at high ball counts, shape is always CircleShape
+numpy_cases = {
+    'Grid, cell width to ball width ratio 1.25': {
+        'collman_cls_name': 'CollisionManagerGrid',
+        'cshape_cls_name': 'CircleShape',
+        'collman_gen_args': [1.25]
+        },
+    'Numpy, automatic cell size': {
+        'collman_cls_name': 'CollisionManagerNumpy',
+        'cshape_cls_name': 'CircleShape',
+        'collman_gen_args': []
+        }
+    }
+
+numpy_stats_params = {
+    'ball_quantities': [500, 1000, 2500, 5000],
+    'num_frames': 10,
+    'dt': 1.0 / 60.0
+}
+
+# CircleShape vs AARectShape vs both shapes mixed in the same manager
 cshape_cases = {
     'Grid, cshape CircleShape, cell to ball 1.25': {
         'collman_cls_name': 'CollisionManagerGrid',
@@ -87,6 +117,16 @@ cshape_cases = {
         'collman_cls_name': 'CollisionManagerGrid',
         'cshape_cls_name': 'AARectShape',
         'collman_gen_args': [2.0]
+        },
+    'Grid, cshape mixed, cell to ball 1.25': {
+        'collman_cls_name': 'CollisionManagerGrid',
+        'cshape_cls_name': 'mixed',
+        'collman_gen_args': [1.25]
+        },
+    'Numpy, cshape mixed': {
+        'collman_cls_name': 'CollisionManagerNumpy',
+        'cshape_cls_name': 'mixed',
+        'collman_gen_args': []
         }
     }
 
@@ -149,6 +189,8 @@ def benchmark_time_per_frame(cases, base_world_params, stats_params):
             collman_args = (0.0, d['world_width'],
                             0.0, d['world_height'],
                             cell_side, cell_side)
+        elif collman_cls_name == 'CollisionManagerNumpy':
+            collman_args = case_params['collman_gen_args']
         world_params['collision_manager'] = collman_cls(*collman_args)
 
         times = []
@@ -250,8 +292,21 @@ def plot_cshape_cases():
     plot_benchmark_time_per_frame(ball_quantities, stats, title, fname)
     print('Done. Resulting plot saved in file:', fname)
 
+def compare_numpy_vs_grid():
+    print('\nWorking, it will take a few minutes to complete.')
+    ball_quantities = numpy_stats_params['ball_quantities']
+    stats = benchmark_time_per_frame(numpy_cases, base_demo_world_params,
+                                     numpy_stats_params)
+    pprint_stats(stats)
+    grid = stats['Grid, cell width to ball width ratio 1.25']
+    vectorized = stats['Numpy, automatic cell size']
+    for quantity, t_grid, t_numpy in zip(ball_quantities, grid, vectorized):
+        print('balls: %5d  grid: %8.2f ms  numpy: %8.2f ms  speedup: %5.2f' %
+              (quantity, t_grid * 1000, t_numpy * 1000, t_grid / t_numpy))
+
 plot_collman_cases()
 #plot_cshape_cases()
+#compare_numpy_vs_grid()
 
 ##if __name__ == '__main__':
 ##    sample_plot()
@@ -41,11 +41,19 @@ def get_ball_maker(cshape_cls_name, radius):
         rx = 0.8 * radius
         cshape = cm.AARectShape(center, rx, rx)
         return Ball(cshape, velocity)
+
+    makers = [with_CircleShape, with_AARectShape]
+    def with_mixed_shapes(center, velocity):
+        # alternates CircleShape and AARectShape
+        makers.reverse()
+        return makers[0](center, velocity)
     
     if cshape_cls_name == 'CircleShape':
         return with_CircleShape
     elif cshape_cls_name == 'AARectShape':
         return with_AARectShape
+    elif cshape_cls_name == 'mixed':
+        return with_mixed_shapes
     else:
         print("\n Error, unknown cshape class name:", cshape_cls_name)
 
@@ -135,7 +143,10 @@ class World(object):
                 actor.colliding = False
 
         # update collman
-        if not isinstance(self.collman, cm.CollisionManagerBruteForce):
+        if isinstance(self.collman, cm.CollisionManagerSweepAndPrune):
+            # keeps the objects order between frames, refresh in place
+            self.collman.update_many(self.actors)
+        elif not isinstance(self.collman, cm.CollisionManagerBruteForce):
             add = self.collman.add
             self.collman.clear()
             for actor in self.actors:
@@ -0,0 +1,100 @@
+"""
+        Compares two ways to keep a collision manager in sync when most of
+        the known objects are static and only a few move each frame:
+
+            rebuild: collman.clear() and then collman.add(actor) for all actors
+
+            update: collman.update_many(moving_actors)
+
+        Each frame the moving actors do a random walk, then the collision
+        manager is brought in sync and each moving actor asks which objects
+        it collides with.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import random
+import time
+import gc
+
+import cocos.collision_model as cm
+from actors_Model import make_actors, random_walk
+
+world_params = {
+    'seed': 123456,
+    'world_width': 2000.0,
+    'world_height': 2000.0,
+    'actor_radius': 8.0,
+    'step': 3.0, # max displacement per frame for moving actors
+    }
+
+stats_params = {
+    'actor_quantities': [1000, 2500, 5000, 10000],
+    'moving_ratio': 0.1,
+    'num_frames': 50,
+    }
+
+def make_collman(cls_name, params):
+    collman_cls = getattr(cm, cls_name)
+    if cls_name == 'CollisionManagerGrid':
+        cell_side = 2.0 * params['actor_radius'] * 1.25
+        return collman_cls(0.0, params['world_width'],
+                           0.0, params['world_height'],
+                           cell_side, cell_side)
+    return collman_cls()
+
+def time_per_frame(cls_name, mode, quantity, params, stats_params):
+    random.seed(params['seed'])
+    r = params['actor_radius']
+    width = params['world_width']
+    height = params['world_height']
+    actors = make_actors(quantity, width, height, r)
+    num_moving = int(quantity * stats_params['moving_ratio'])
+    moving = actors[:num_moving]
+    collman = make_collman(cls_name, params)
+    for actor in actors:
+        collman.add(actor)
+
+    num_frames = stats_params['num_frames']
+    gc.collect()
+    start_time = time.time()
+    for i in range(num_frames):
+        random_walk(moving, params['step'], r, width - r, r, height - r)
+        if mode == 'rebuild':
+            collman.clear()
+            for actor in actors:
+                collman.add(actor)
+        else:
+            collman.update_many(moving)
+        for actor in moving:
+            collman.objs_colliding(actor)
+    end_time = time.time()
+    return (end_time - start_time) / num_frames
+
+def benchmark_update_vs_rebuild(cls_names, params, stats_params):
+    stats = {}
+    for cls_name in cls_names:
+        for mode in ['rebuild', 'update']:
+            stats[(cls_name, mode)] = [
+                time_per_frame(cls_name, mode, quantity, params, stats_params)
+                for quantity in stats_params['actor_quantities']]
+    return stats
+
+def pprint_stats(cls_names, stats, stats_params):
+    print('\nmoving ratio: %s' % stats_params['moving_ratio'])
+    print('time per frame in ms')
+    for cls_name in cls_names:
+        print('\n%s' % cls_name)
+        print('%8s %10s %10s %8s' % ('actors', 'rebuild', 'update', 'ratio'))
+        rebuild = stats[(cls_name, 'rebuild')]
+        update = stats[(cls_name, 'update')]
+        for quantity, t_rebuild, t_update in zip(
+                stats_params['actor_quantities'], rebuild, update):
+            print('%8d %10.3f %10.3f %8.2f' % (quantity, t_rebuild * 1000,
+                                               t_update * 1000,
+                                               t_rebuild / t_update))
+
+if __name__ == '__main__':
+    cls_names = ['CollisionManagerGrid', 'CollisionManagerNumpy']
+    stats = benchmark_update_vs_rebuild(cls_names, world_params, stats_params)
+    pprint_stats(cls_names, stats, stats_params)
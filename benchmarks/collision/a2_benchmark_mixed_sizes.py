@@ -0,0 +1,119 @@
+"""
+        Time per frame for collision managers when object sizes are very
+        different, like small bullets mixed with big bosses and long terrain
+        slabs.
+
+        All objects use AARectShape. Each frame the bullets move, the
+        collision manager is refreshed with clear() + add() for all objects,
+        and all the collisions are collected with iter_all_collisions.
+
+        With numpy installed CollisionManagerNumpy is included; the few
+        bosses and slabs must not make its automatic cells fit to them.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import random
+import time
+import gc
+
+import cocos.collision_model as cm
+import cocos.euclid as eu
+from actors_Model import Actor
+
+world_params = {
+    'seed': 123456,
+    'world_width': 8000.0,
+    'world_height': 2000.0,
+    # (half_width, half_height, proportion of the population)
+    'populations': {
+        'bullet': (8.0, 8.0, 0.94),
+        'boss': (400.0, 400.0, 0.01),
+        'slab': (1000.0, 40.0, 0.05),
+        },
+    'bullet_step': 6.0,
+    }
+
+stats_params = {
+    'actor_quantities': [250, 500, 1000, 2000],
+    'num_frames': 20,
+    }
+
+collman_cases = {
+    'BruteForce': ('CollisionManagerBruteForce', []),
+    'Grid, cell side fit to bullets': (
+        'CollisionManagerGrid',
+        [0.0, world_params['world_width'], 0.0, world_params['world_height'],
+         20.0, 20.0]),
+    'Grid, cell side fit to bosses': (
+        'CollisionManagerGrid',
+        [0.0, world_params['world_width'], 0.0, world_params['world_height'],
+         1000.0, 1000.0]),
+    'HierarchicalGrid': ('CollisionManagerHierarchicalGrid', [16.0]),
+    'Numpy, automatic cell size': ('CollisionManagerNumpy', []),
+    }
+
+def make_actors(quantity, params):
+    random_uniform = random.uniform
+    actors = []
+    for kind, (rx, ry, proportion) in params['populations'].items():
+        for i in range(max(1, int(quantity * proportion))):
+            center = eu.Vector2(random_uniform(rx, params['world_width'] - rx),
+                                random_uniform(ry, params['world_height'] - ry))
+            actors.append(Actor(cm.AARectShape(center, rx, ry), kind))
+    return actors
+
+def move_bullets(bullets, params):
+    random_uniform = random.uniform
+    step = params['bullet_step']
+    width = params['world_width']
+    height = params['world_height']
+    for bullet in bullets:
+        x, y = bullet.cshape.center
+        x = (x + random_uniform(-step, step)) % width
+        y = (y + random_uniform(-step, step)) % height
+        bullet.cshape.center = eu.Vector2(x, y)
+
+def time_per_frame(case, quantity, params, stats_params):
+    cls_name, ctor_args = case
+    random.seed(params['seed'])
+    actors = make_actors(quantity, params)
+    bullets = [actor for actor in actors if actor.kind == 'bullet']
+    collman = getattr(cm, cls_name)(*ctor_args)
+    for actor in actors:
+        collman.add(actor)
+
+    num_frames = stats_params['num_frames']
+    gc.collect()
+    start_time = time.time()
+    for i in range(num_frames):
+        move_bullets(bullets, params)
+        collman.clear()
+        for actor in actors:
+            collman.add(actor)
+        for pair in collman.iter_all_collisions():
+            pass
+    end_time = time.time()
+    return (end_time - start_time) / num_frames
+
+def benchmark_mixed_sizes(cases, params, stats_params):
+    stats = {}
+    for case_name in cases:
+        stats[case_name] = [
+            time_per_frame(cases[case_name], quantity, params, stats_params)
+            for quantity in stats_params['actor_quantities']]
+    return stats
+
+def pprint_stats(stats, stats_params):
+    quantities = stats_params['actor_quantities']
+    print('\ntime per frame in ms, mixed sizes')
+    print('%-32s' % 'actors' + ''.join(['%10d' % q for q in quantities]))
+    for case_name in sorted(stats):
+        print('%-32s' % case_name +
+              ''.join(['%10.2f' % (t * 1000) for t in stats[case_name]]))
+
+if __name__ == '__main__':
+    if cm.numpy is None:
+        del collman_cases['Numpy, automatic cell size']
+    stats = benchmark_mixed_sizes(collman_cases, world_params, stats_params)
+    pprint_stats(stats, stats_params)
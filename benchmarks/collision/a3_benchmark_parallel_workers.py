@@ -0,0 +1,72 @@
+"""
+        Speedup of CollisionManagerNumpy.iter_all_collisions when the
+        broad phase is split in stripes resolved by a pool of threads.
+
+        No window is needed, the collision model is used alone as in a
+        headless server simulation.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import random
+import time
+import gc
+
+import cocos.collision_model as cm
+from actors_Model import make_actors
+
+world_params = {
+    'seed': 123456,
+    'world_width': 8000.0,
+    'world_height': 8000.0,
+    'actor_radius': 16.0,
+    }
+
+stats_params = {
+    'actor_quantities': [20000, 50000],
+    'workers': [1, 2, 4, 8],
+    'num_frames': 10,
+    }
+
+def time_per_frame(actors, workers, stats_params):
+    collman = cm.CollisionManagerNumpy(workers=workers)
+    for actor in actors:
+        collman.add(actor)
+    # warm up, creates the threads pool
+    for pair in collman.iter_all_collisions():
+        pass
+
+    num_frames = stats_params['num_frames']
+    gc.collect()
+    start_time = time.time()
+    for i in range(num_frames):
+        # forces the arrays rebuild, as a frame with moving actors would do
+        collman.update_many(actors)
+        for pair in collman.iter_all_collisions():
+            pass
+    end_time = time.time()
+    collman.close()
+    return (end_time - start_time) / num_frames
+
+def benchmark_parallel_workers(params, stats_params):
+    stats = {}
+    for quantity in stats_params['actor_quantities']:
+        random.seed(params['seed'])
+        actors = make_actors(quantity, params['world_width'],
+                             params['world_height'], params['actor_radius'])
+        stats[quantity] = [time_per_frame(actors, workers, stats_params)
+                           for workers in stats_params['workers']]
+    return stats
+
+def pprint_stats(stats, stats_params):
+    print('\ntime per frame in ms, speedup relative to 1 worker')
+    for quantity in sorted(stats):
+        print('\nactors: %d' % quantity)
+        times = stats[quantity]
+        for workers, t in zip(stats_params['workers'], times):
+            print('    workers: %2d  %10.2f ms  speedup: %5.2f' %
+                  (workers, t * 1000, times[0] / t))
+
+if __name__ == '__main__':
+    stats = benchmark_parallel_workers(world_params, stats_params)
+    pprint_stats(stats, stats_params)
@@ -0,0 +1,265 @@
+"""
+        Collision managers benchmark suite with machine readable output.
+
+        Runs a grid of scenarios combining:
+
+            collision manager class
+            number of actors, up to 50000
+            ratio of moving actors, the others are static
+            shapes: all CircleShape, all AARectShape or mixed
+            workload: 'all_pairs' (iter_all_collisions each frame) or
+                      'queries' (objs_colliding, objs_near and knn asked by
+                      some moving actors each frame)
+
+        The world grows with the number of actors to keep the density
+        constant. Each frame the moving actors do a random walk, the manager
+        is refreshed with update_many and then the workload runs.
+
+        Results can be written as JSON and CSV. With a baseline JSON from a
+        previous run each scenario is compared against it, and scenarios
+        slower than baseline * (1 + threshold) are flagged as regressions;
+        then the exit code is 1, which allows gating upgrades in CI.
+
+        Usage examples:
+
+            python a4_benchmark_suite.py --preset quick --json base.json
+            python a4_benchmark_suite.py --preset quick --baseline base.json
+            python a4_benchmark_suite.py --preset full --filter Numpy --csv r.csv
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import csv
+import gc
+import json
+import math
+import optparse
+import random
+import sys
+import time
+
+import six
+
+import cocos.collision_model as cm
+from actors_Model import make_actors, random_walk
+
+world_params = {
+    'seed': 123456,
+    'min_radius': 4.0,
+    'max_radius': 8.0,
+    'area_per_actor': 40.0 * 40.0,
+    'step': 2.0, # max displacement per frame for moving actors
+    'num_queries': 100, # max actors asking questions, 'queries' workload
+    }
+
+presets = {
+    'quick': {
+        'collmans': ['BruteForce', 'Grid', 'SweepAndPrune',
+                     'HierarchicalGrid', 'Numpy'],
+        'counts': [500, 2000],
+        'moving_ratios': [1.0, 0.1],
+        'shapes': ['circle', 'aarect', 'mixed'],
+        'workloads': ['all_pairs', 'queries'],
+        'num_frames': 5,
+        },
+    'full': {
+        'collmans': ['BruteForce', 'Grid', 'SweepAndPrune',
+                     'HierarchicalGrid', 'Numpy'],
+        'counts': [500, 2000, 5000, 20000, 50000],
+        'moving_ratios': [1.0, 0.1],
+        'shapes': ['circle', 'aarect', 'mixed'],
+        'workloads': ['all_pairs', 'queries'],
+        'num_frames': 10,
+        },
+    }
+
+# BruteForce is O(n**2), beyond this count it is skipped
+brute_force_max_count = 2000
+
+csv_fields = ['name', 'collman', 'count', 'moving_ratio', 'shapes',
+              'workload', 'num_frames', 'median_ms', 'min_ms', 'max_ms',
+              'results']
+
+def world_side(count, params):
+    return math.sqrt(count * params['area_per_actor'])
+
+def make_collman(collman_name, side, params):
+    if collman_name == 'Grid':
+        cell_side = 2.0 * params['max_radius'] * 1.25
+        return cm.CollisionManagerGrid(0.0, side, 0.0, side,
+                                       cell_side, cell_side)
+    if collman_name == 'HierarchicalGrid':
+        return cm.CollisionManagerHierarchicalGrid(2.0 * params['min_radius'])
+    return getattr(cm, 'CollisionManager' + collman_name)()
+
+def run_workload(collman, workload, askers, params):
+    # returns the number of results, used as a sanity check between runs
+    if workload == 'all_pairs':
+        return sum(1 for pair in collman.iter_all_collisions())
+    results = 0
+    near_distance = params['max_radius']
+    for actor in askers:
+        results += len(collman.objs_colliding(actor))
+        results += len(collman.objs_near(actor, near_distance))
+        results += len(collman.knn(actor, 4))
+    return results
+
+def scenario_name(scenario):
+    return '%(collman)s|n=%(count)d|moving=%(moving_ratio)s|%(shapes)s|%(workload)s' % scenario
+
+def iter_scenarios(preset):
+    for collman_name in preset['collmans']:
+        for count in preset['counts']:
+            if collman_name == 'BruteForce' and count > brute_force_max_count:
+                continue
+            for moving_ratio in preset['moving_ratios']:
+                for shapes in preset['shapes']:
+                    for workload in preset['workloads']:
+                        scenario = {
+                            'collman': collman_name,
+                            'count': count,
+                            'moving_ratio': moving_ratio,
+                            'shapes': shapes,
+                            'workload': workload,
+                            }
+                        scenario['name'] = scenario_name(scenario)
+                        yield scenario
+
+def run_scenario(scenario, num_frames, params):
+    count = scenario['count']
+    side = world_side(count, params)
+    actors = make_actors(count, side, side, params['min_radius'],
+                         params['max_radius'], scenario['shapes'],
+                         random.Random(params['seed']))
+    moving = actors[:int(count * scenario['moving_ratio'])]
+    askers = moving[:params['num_queries']]
+    collman = make_collman(scenario['collman'], side, params)
+    for actor in actors:
+        collman.add(actor)
+
+    rnd = random.Random(params['seed'])
+    times = []
+    results = 0
+    gc.collect()
+    for i in range(num_frames):
+        random_walk(moving, params['step'], 0.0, side, 0.0, side, rnd)
+        start_time = time.time()
+        collman.update_many(moving)
+        results = run_workload(collman, scenario['workload'], askers, params)
+        times.append(time.time() - start_time)
+    times.sort()
+    row = dict(scenario)
+    row['num_frames'] = num_frames
+    row['median_ms'] = times[len(times) // 2] * 1000.0
+    row['min_ms'] = times[0] * 1000.0
+    row['max_ms'] = times[-1] * 1000.0
+    row['results'] = results
+    return row
+
+def run_suite(preset, params, name_filter=None, verbose=True):
+    rows = []
+    for scenario in iter_scenarios(preset):
+        if name_filter and name_filter not in scenario['name']:
+            continue
+        row = run_scenario(scenario, preset['num_frames'], params)
+        if verbose:
+            print('%-60s %10.3f ms' % (row['name'], row['median_ms']))
+            sys.stdout.flush()
+        rows.append(row)
+    return rows
+
+def save_json(rows, fname, preset_name):
+    data = {'preset': preset_name, 'world_params': world_params,
+            'results': rows}
+    with open(fname, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+def load_json(fname):
+    with open(fname) as f:
+        return json.load(f)['results']
+
+def save_csv(rows, fname):
+    # the csv module wants binary files in py2 and newline='' in py3
+    if six.PY2:
+        f = open(fname, 'wb')
+    else:
+        f = open(fname, 'w', newline='')
+    with f:
+        writer = csv.DictWriter(f, csv_fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict((k, row[k]) for k in csv_fields))
+
+def compare_with_baseline(rows, baseline_rows, threshold):
+    """
+    Returns a list of (name, baseline_ms, current_ms, ratio, status) for the
+    scenarios present in both runs. status is 'REGRESSION' if current is
+    slower than baseline * (1 + threshold), 'improved' if faster than
+    baseline / (1 + threshold), 'ok' otherwise. If the results count differ
+    status is 'MISMATCH', usually meaning a behavior change.
+    """
+    baseline = dict((row['name'], row) for row in baseline_rows)
+    report = []
+    for row in rows:
+        base = baseline.get(row['name'])
+        if base is None:
+            continue
+        ratio = row['median_ms'] / max(base['median_ms'], 1.0e-9)
+        if row['results'] != base['results']:
+            status = 'MISMATCH'
+        elif ratio > 1.0 + threshold:
+            status = 'REGRESSION'
+        elif ratio < 1.0 / (1.0 + threshold):
+            status = 'improved'
+        else:
+            status = 'ok'
+        report.append((row['name'], base['median_ms'], row['median_ms'],
+                       ratio, status))
+    return report
+
+def pprint_report(report):
+    print('\n%-60s %10s %10s %7s  %s' % ('scenario', 'base ms', 'now ms',
+                                         'ratio', 'status'))
+    for name, base_ms, now_ms, ratio, status in report:
+        print('%-60s %10.3f %10.3f %7.2f  %s' % (name, base_ms, now_ms,
+                                                 ratio, status))
+
+def main(argv):
+    usage = '%prog [options]\n' + __doc__
+    parser = optparse.OptionParser(usage=usage)
+    parser.add_option('--preset', default='quick',
+                      help='scenarios set: %s [default: %%default]' %
+                      ', '.join(sorted(presets)))
+    parser.add_option('--filter', default=None,
+                      help='only run scenarios whose name contains FILTER')
+    parser.add_option('--frames', type='int', default=None,
+                      help='frames per scenario, overrides the preset')
+    parser.add_option('--json', default=None, help='write results to JSON')
+    parser.add_option('--csv', default=None, help='write results to CSV')
+    parser.add_option('--baseline', default=None,
+                      help='JSON results from a previous run to compare with')
+    parser.add_option('--threshold', type='float', default=0.15,
+                      help='relative slowdown flagged as regression '
+                           '[default: %default]')
+    options, args = parser.parse_args(argv)
+    if options.preset not in presets:
+        parser.error('unknown preset %s' % options.preset)
+
+    preset = dict(presets[options.preset])
+    if options.frames:
+        preset['num_frames'] = options.frames
+    rows = run_suite(preset, world_params, options.filter)
+    if options.json:
+        save_json(rows, options.json, options.preset)
+    if options.csv:
+        save_csv(rows, options.csv)
+    if options.baseline:
+        report = compare_with_baseline(rows, load_json(options.baseline),
+                                       options.threshold)
+        pprint_report(report)
+        if [r for r in report if r[4] in ('REGRESSION', 'MISMATCH')]:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
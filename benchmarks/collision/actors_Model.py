@@ -0,0 +1,58 @@
+"""
+        Actors shared by the collision benchmarks a1 .. a4: objects that only
+        have a cshape, scattered at random in a rectangular world, and a
+        random walk to move them each frame.
+
+        Randomness comes from rnd, the random module by default, so a
+        benchmark can seed the module or pass its own random.Random.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import random
+
+import cocos.collision_model as cm
+import cocos.euclid as eu
+
+
+class Actor(object):
+    def __init__(self, cshape, kind=None):
+        self.cshape = cshape
+        self.kind = kind
+
+
+def make_actors(quantity, width, height, radius, max_radius=None,
+                shapes='circle', rnd=random):
+    """
+    Returns a list of quantity actors fully inside the world.
+
+    With max_radius None all actors have the given radius, else each one
+    gets a radius in [radius, max_radius]. shapes is 'circle', 'aarect' or
+    'mixed'; mixed alternates AARectShape and CircleShape, and the
+    AARectShape has half sides equal to the radius.
+    """
+    random_uniform = rnd.uniform
+    actors = []
+    r = radius
+    for i in range(quantity):
+        if max_radius is not None:
+            r = random_uniform(radius, max_radius)
+        center = eu.Vector2(random_uniform(r, width - r),
+                            random_uniform(r, height - r))
+        if shapes == 'circle' or (shapes == 'mixed' and i % 2):
+            cshape = cm.CircleShape(center, r)
+        else:
+            cshape = cm.AARectShape(center, r, r)
+        actors.append(Actor(cshape))
+    return actors
+
+
+def random_walk(actors, step, x_lo, x_hi, y_lo, y_hi, rnd=random):
+    """moves each actor at most step along each axis, clamping the center
+    to [x_lo, x_hi] x [y_lo, y_hi]"""
+    random_uniform = rnd.uniform
+    for actor in actors:
+        x, y = actor.cshape.center
+        x = min(max(x + random_uniform(-step, step), x_lo), x_hi)
+        y = min(max(y + random_uniform(-step, step), y_lo), y_hi)
+        actor.cshape.center = eu.Vector2(x, y)
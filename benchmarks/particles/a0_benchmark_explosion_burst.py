@@ -0,0 +1,132 @@
+"""
+        Frame time spikes when an Explosion bursts, comparing the one by one
+        emission used before (a while loop initializing one particle at a
+        time with scalar code, as the old init_particle did) with the
+        batched ParticleSystem.emit now used by step.
+
+        Each run creates some explosions in the same frame and steps them at
+        60 fps; the reported numbers are the worst frame (the burst) and the
+        mean frame time.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import gc
+import math
+import random
+import time
+
+from cocos.director import director
+director.init(visible=False)
+
+from cocos.particle import ExceptionNoEmptyParticle
+import cocos.particle_systems as ps
+
+stats_params = {
+    'explosions_per_burst': [1, 5, 20],
+    'dt': 1.0 / 60.0,
+    'num_frames': 30,
+    }
+
+rand = lambda: random.random() * 2 - 1
+
+def scalar_init_particle(system):
+    # ParticleSystem.init_particle as it was before batched emission: finds
+    # the first free slot and sets each attribute from python scalars
+    idxs = (system.particle_life < 0).nonzero()
+    if len(idxs[0]) == 0:
+        raise ExceptionNoEmptyParticle()
+    idx = idxs[0][0]
+
+    system.particle_pos[idx][0] = system.pos_var.x * rand()
+    system.particle_pos[idx][1] = system.pos_var.y * rand()
+    system.start_pos[idx][0] = system.x
+    system.start_pos[idx][1] = system.y
+
+    a = math.radians(system.angle + system.angle_var * rand())
+    s = system.speed + system.speed_var * rand()
+    system.particle_dir[idx][0] = math.cos(a) * s
+    system.particle_dir[idx][1] = math.sin(a) * s
+
+    system.particle_rad[idx] = (system.radial_accel +
+                                system.radial_accel_var * rand())
+    system.particle_tan[idx] = (system.tangential_accel +
+                                system.tangential_accel_var * rand())
+
+    life = system.life + system.life_var * rand()
+    system.particle_life[idx] = life
+    system.particle_total_life[idx] = life
+
+    start_color = system.start_color.to_array()
+    start_color_var = system.start_color_var.to_array()
+    end_color = system.end_color.to_array()
+    end_color_var = system.end_color_var.to_array()
+    for k in range(4):
+        sc = start_color[k] + start_color_var[k] * rand()
+        ec = end_color[k] + end_color_var[k] * rand()
+        system.particle_color[idx][k] = sc
+        system.particle_delta_color[idx][k] = (ec - sc) / life
+
+    system.particle_size[idx] = system.size + system.size_var * rand()
+    system.particle_grav[idx][0] = system.gravity.x
+    system.particle_grav[idx][1] = system.gravity.y
+
+    start_spin = system.start_spin + system.start_spin_var * rand()
+    end_spin = system.end_spin + system.end_spin_var * rand()
+    system.particle_rotation[idx] = start_spin
+    system.particle_delta_rotation[idx] = (end_spin - start_spin) / life
+
+def one_by_one_step(system, delta):
+    # ParticleSystem.step as it was before batched emission
+    if system.active:
+        rate = 1.0 / system.emission_rate
+        system.emit_counter += delta
+        while (system.particle_count < system.total_particles and
+               system.emit_counter > rate):
+            scalar_init_particle(system)
+            system.particle_count += 1
+            system.emit_counter -= rate
+        system.elapsed += delta
+        if system.duration != -1 and system.duration < system.elapsed:
+            system.stop_system()
+    system.update_particles(delta)
+    system.remove_dead_particles()
+
+def batched_step(system, delta):
+    system.step(delta)
+
+def frame_times(step_func, num_explosions, stats_params):
+    systems = [ps.Explosion(fallback=False) for i in range(num_explosions)]
+    dt = stats_params['dt']
+    times = []
+    gc.collect()
+    for i in range(stats_params['num_frames']):
+        start_time = time.time()
+        for system in systems:
+            step_func(system, dt)
+        times.append(time.time() - start_time)
+    return times
+
+def benchmark_explosion_burst(stats_params):
+    stats = {}
+    for mode, step_func in [('one_by_one', one_by_one_step),
+                            ('batched', batched_step)]:
+        for num_explosions in stats_params['explosions_per_burst']:
+            stats[(mode, num_explosions)] = frame_times(step_func,
+                                                        num_explosions,
+                                                        stats_params)
+    return stats
+
+def pprint_stats(stats, stats_params):
+    print('\ntime per frame in ms')
+    print('%12s %12s %10s %10s' % ('explosions', 'mode', 'worst', 'mean'))
+    for num_explosions in stats_params['explosions_per_burst']:
+        for mode in ['one_by_one', 'batched']:
+            times = stats[(mode, num_explosions)]
+            print('%12d %12s %10.3f %10.3f' % (num_explosions, mode,
+                                               max(times) * 1000,
+                                               sum(times) / len(times) * 1000))
+
+if __name__ == '__main__':
+    stats = benchmark_explosion_burst(stats_params)
+    pprint_stats(stats, stats_params)
@@ -0,0 +1,98 @@
+"""
+        Time per frame moving and rotating many sprites, comparing one
+        Sprite per object with a single SpriteArray.
+
+        Sprite mode: set position and rotation of each sprite, each set
+        updates the sprite vertex list.
+        SpriteArray mode: update the position and rotation columns with numpy
+        and compute the quads with fill_buffer, as draw does.
+
+        Needs a real pyglet, the sprites use a texture.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import gc
+import random
+import time
+
+from cocos.director import director
+director.init(visible=False)
+
+import pyglet
+import numpy
+
+from cocos.batch import BatchNode
+from cocos.sprite import Sprite
+from cocos.sprite_array import SpriteArray
+
+stats_params = {
+    'num_sprites': [1000, 10000],
+    'dt': 1.0 / 60.0,
+    'num_frames': 30,
+    }
+
+def make_image():
+    pattern = pyglet.image.SolidColorImagePattern((255, 255, 255, 255))
+    return pyglet.image.create(8, 8, pattern)
+
+def sprites_frames(num_sprites, stats_params):
+    rand = random.Random(1)
+    image = make_image()
+    batch = BatchNode()
+    sprites = []
+    for i in range(num_sprites):
+        sprite = Sprite(image, position=(rand.uniform(0, 800),
+                                         rand.uniform(0, 600)))
+        batch.add(sprite)
+        sprites.append(sprite)
+    def frame(dt):
+        for sprite in sprites:
+            x, y = sprite.position
+            sprite.position = (x + 100 * dt, y)
+            sprite.rotation += 90 * dt
+    return frame
+
+def array_frames(num_sprites, stats_params):
+    rand = random.Random(1)
+    array = SpriteArray(make_image())
+    for i in range(num_sprites):
+        array.add_sprite((rand.uniform(0, 800), rand.uniform(0, 600)))
+    def frame(dt):
+        n = array.size
+        array.positions[:n, 0] += 100 * dt
+        array.rotations[:n] += 90 * dt
+        array.fill_buffer()
+    return frame
+
+def frame_times(setup, num_sprites, stats_params):
+    frame = setup(num_sprites, stats_params)
+    dt = stats_params['dt']
+    times = []
+    gc.collect()
+    for i in range(stats_params['num_frames']):
+        start_time = time.time()
+        frame(dt)
+        times.append(time.time() - start_time)
+    return times
+
+def benchmark_sprite_array(stats_params):
+    stats = {}
+    for mode, setup in [('sprites', sprites_frames), ('array', array_frames)]:
+        for num_sprites in stats_params['num_sprites']:
+            stats[(mode, num_sprites)] = frame_times(setup, num_sprites,
+                                                     stats_params)
+    return stats
+
+def pprint_stats(stats, stats_params):
+    print('\ntime per frame in ms')
+    print('%10s %10s %10s' % ('sprites', 'mode', 'mean'))
+    for num_sprites in stats_params['num_sprites']:
+        for mode in ['sprites', 'array']:
+            times = stats[(mode, num_sprites)]
+            print('%10d %10s %10.3f' % (num_sprites, mode,
+                                        sum(times) / len(times) * 1000))
+
+if __name__ == '__main__':
+    stats = benchmark_sprite_array(stats_params)
+    pprint_stats(stats, stats_params)
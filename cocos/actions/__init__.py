@@ -44,3 +44,4 @@ from .tiledgrid_actions import *
 from .grid3d_actions import *
 from .camera_actions import *
 from .move_actions import *
+from .batched_actions import *
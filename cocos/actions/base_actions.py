@@ -400,6 +400,7 @@ from __future__ import division, print_function, unicode_literals
 
 __docformat__ = 'restructuredtext'
 
+import bisect
 import copy
 
 __all__ = [
@@ -486,6 +487,22 @@ class Action(object):
         raise Exception("Action %s cannot be reversed"%(self.__class__.__name__))
 
 
+def _deepcopy_sharing(action, memo, shared):
+    """deepcopy for composite actions that only use their component templates
+    to make new workers; the attributes named in shared are referenced, not
+    copied, so do() cost does not grow with the number of components"""
+    cls = action.__class__
+    result = cls.__new__(cls)
+    memo[id(action)] = result
+    d = result.__dict__
+    for k, v in action.__dict__.items():
+        if k in shared:
+            d[k] = v
+        else:
+            d[k] = copy.deepcopy(v, memo)
+    return result
+
+
 class IntervalAction( Action ):
     """
     IntervalAction()
@@ -667,7 +684,8 @@ class Loop_IntervalAction(IntervalAction):
                 Number of times that the action will be repeated
         """
 
-        self.one = one
+        # template for each repetition, shared by the worker copies
+        self.one = copy.deepcopy(one)
         self.times = times
 
         if not hasattr(self.one, "duration"):
@@ -685,6 +703,9 @@ class Loop_IntervalAction(IntervalAction):
         self.current_action.target = self.target
         self.current_action.start()
 
+    def __deepcopy__(self, memo):
+        return _deepcopy_sharing(self, memo, ('one',))
+
     def __repr__(self):
         return "( %s * %i )" %( self.one, self.times )
 
@@ -805,6 +826,16 @@ class Sequence_InstantAction(InstantAction):
 class Sequence_IntervalAction(IntervalAction):
     """implements sequence when the result can be expresed as IntervalAction but
         not as InstantAction
+
+    The operands are flattened into a timeline: ``a + b + c`` stores the
+    components a, b, c and the normalized time where each one begins, and
+    update finds the current component by bisection.
+
+    The component templates are shared by all the copies of the sequence;
+    start creates the workers for the first two components, the workers
+    for the others are created when the component begins.
+
+    `one` and `two` are the left and right operands, as in ``one + two``.
     """
     def init(self,  one, two, **kwargs ):
         """Init method
@@ -816,61 +847,167 @@ class Sequence_IntervalAction(IntervalAction):
                 The second action to execute
         """
 
-        self.one = copy.deepcopy(one)
-        self.two = copy.deepcopy(two)
-        self.actions = [self.one, self.two]
-
-        if not hasattr(self.one, "duration") or not hasattr(self.two, "duration"):
+        if not hasattr(one, "duration") or not hasattr(two, "duration"):
             raise Exception("You can only sequence actions with finite duration, not repeats or others like that")
 
-        self.duration = float(self.one.duration + self.two.duration)
-        try:
-            self.split = self.one.duration / self.duration
-        except ZeroDivisionError:
-            self.split = 0.0
+        self.templates = self._components(one) + self._components(two)
+        self.duration = float(one.duration + two.duration)
+        # operands structure, (number of components in one, tree of one,
+        # tree of two); the tree of a single action is None. The trees of
+        # the operands are shared, not copied.
+        self.tree = (len(self.templates) - self._num_components(two),
+                     self._tree(one), self._tree(two))
+        self._set_splits()
+
+        # workers, created on demand
+        self.actions = None
         self.last = None
 
+    def _set_splits(self):
+        # normalized begin time for each component. The total is the same
+        # running sum, not self.duration, which adds the durations in other
+        # order: with float rounding the last splits could be above 1.0 and
+        # trailing zero duration components would never run
+        begins = []
+        begin = 0.0
+        for a in self.templates:
+            begins.append(begin)
+            begin += a.duration
+        total = begin
+        self.splits = []
+        for begin in begins:
+            try:
+                self.splits.append(min(begin / total, 1.0))
+            except ZeroDivisionError:
+                self.splits.append(0.0)
+        self.ends = self.splits[1:] + [1.0]
+
+    @staticmethod
+    def _components(action):
+        if isinstance(action, Sequence_IntervalAction):
+            # templates are never started, so they can be shared
+            return action.templates
+        return [copy.deepcopy(action)]
+
+    @staticmethod
+    def _num_components(action):
+        if isinstance(action, Sequence_IntervalAction):
+            return len(action.templates)
+        return 1
+
+    @staticmethod
+    def _tree(action):
+        if isinstance(action, Sequence_IntervalAction):
+            return action.tree
+        return None
+
+    def __deepcopy__(self, memo):
+        return _deepcopy_sharing(self, memo,
+                                 ('templates', 'splits', 'ends', 'tree'))
+
+    def _worker(self, i):
+        if self.actions is None:
+            self.actions = [None] * len(self.templates)
+        action = self.actions[i]
+        if action is None:
+            action = self.actions[i] = copy.deepcopy(self.templates[i])
+            action.target = self.target
+        return action
+
+    def _operand(self, lo, hi, tree):
+        # the operand made by the components lo:hi; a single component is
+        # its worker once the sequence has started, else a new sequence
+        # sharing the components templates
+        if tree is None:
+            if self.actions is None:
+                return self.templates[lo]
+            return self._worker(lo)
+        operand = Sequence_IntervalAction.__new__(Sequence_IntervalAction)
+        operand.templates = self.templates[lo:hi]
+        operand.duration = float(sum(a.duration for a in operand.templates))
+        operand.tree = tree
+        operand._set_splits()
+        operand.actions = None
+        operand.last = None
+        operand.target = self.target
+        operand._elapsed = 0.0
+        operand._done = False
+        operand.scheduled_to_remove = False
+        return operand
+
+    @property
+    def one(self):
+        """the left operand"""
+        num_one, tree_one, tree_two = self.tree
+        return self._operand(0, num_one, tree_one)
+
+    @property
+    def two(self):
+        """the right operand"""
+        num_one, tree_one, tree_two = self.tree
+        return self._operand(num_one, len(self.templates), tree_two)
+
     def start(self):
-        self.one.target = self.target
-        self.two.target = self.target
-        self.one.start()
-        self.last = 0 #index in self.actions
-        if self.one.duration==0.0:
-            self.one.update(1.0)
-            self.one.stop()
-            self.two.start()
-            self.last = 1
+        self.actions = None
+        self.last = 0 #index in self.templates
+        self._worker(0).start()
+        if len(self.templates) > 1:
+            self._worker(1)
+        # zero duration components at the beginning are done in start
+        last_index = len(self.templates) - 1
+        while self.last < last_index and self.templates[self.last].duration == 0.0:
+            action = self.actions[self.last]
+            action.update(1.0)
+            action.stop()
+            self.last += 1
+            self._worker(self.last).start()
 
     def __repr__(self):
-        return "( %s + %s )" %( self.one, self.two )
+        return "( %s )" % " + ".join(str(a) for a in self.templates)
 
     def update(self, t):
-        current = t>=self.split
-        if current!=self.last:
-            self.actions[self.last].update(1.0)
-            self.actions[self.last].stop()
-            self.last = current
-            self.actions[self.last].start()
-        if current==0:
-            try:
-                sub_t = t/self.split
-            except ZeroDivisionError:
-                sub_t = 1.0
+        current = self.last
+        begin = self.splits[current]
+        if begin <= t < self.ends[current]:
+            # still in the current component, the usual case
+            self.actions[current].update(
+                (t - begin) / (self.ends[current] - begin))
+            return
+        if t >= 1.0:
+            # all the components run, whatever the splits rounding
+            current = len(self.templates) - 1
         else:
-            try:
-                sub_t = (t - self.split) / (1.0 - self.split)
-            except ZeroDivisionError:
-                sub_t = 1.0
+            current = bisect.bisect_right(self.splits, t) - 1
+            if current < 0:
+                current = 0
+        if current != self.last:
+            action = self.actions[self.last]
+            action.update(1.0)
+            action.stop()
+            # the components jumped over begin and end in this update
+            for i in range(self.last + 1, current):
+                action = self._worker(i)
+                action.start()
+                action.update(1.0)
+                action.stop()
+            self.last = current
+            self._worker(current).start()
+        begin = self.splits[current]
+        try:
+            sub_t = (t - begin) / (self.ends[current] - begin)
+        except ZeroDivisionError:
+            sub_t = 1.0
         self.actions[current].update(sub_t)
 
     def stop(self):
-        if self.last:
-            self.two.stop()
-        else:
-            self.one.stop()
+        self._worker(self.last or 0).stop()
 
     def __reversed__(self):
-        return Sequence_IntervalAction( Reverse(self.two), Reverse(self.one) )
+        actions = [Reverse(a) for a in reversed(self.templates)]
+        result = actions[0]
+        for a in actions[1:]:
+            result = Sequence_IntervalAction(result, a)
+        return result
 
 
 def spawn(action_1, action_2):
@@ -925,37 +1062,73 @@ class Spawn_Action(Action):
 
 class Spawn_IntervalAction(IntervalAction):
     """implements spawn when the result cannot be expresed as InstantAction
+
+    The operands are flattened: ``a | b | c`` stores the components a, b, c;
+    each one is updated until its own duration is reached.
+    The component templates are shared by all the copies of the spawn.
     """
 
     def init(self, one, two):
-        from cocos.actions.interval_actions import Delay
-
-        one = copy.deepcopy(one)
-        two = copy.deepcopy(two)
+        self.templates = self._components(one) + self._components(two)
         self.duration = max(one.duration, two.duration)
+        # workers
+        self.actions = None
+        self.running = None
 
-        if one.duration > two.duration:
-            two = two + Delay( one.duration-two.duration )
-        elif two.duration > one.duration:
-            one = one + Delay( two.duration-one.duration )
+    @staticmethod
+    def _components(action):
+        if isinstance(action, Spawn_IntervalAction):
+            return action.templates
+        return [copy.deepcopy(action)]
 
-        self.actions = [one, two]
+    def __deepcopy__(self, memo):
+        return _deepcopy_sharing(self, memo, ('templates',))
 
     def start(self):
-        for a in self.actions:
+        self.actions = []
+        self.running = []
+        for template in self.templates:
+            a = copy.deepcopy(template)
             a.target = self.target
             a.start()
+            self.actions.append(a)
+            if a.duration == 0.0 and self.duration > 0.0:
+                # as it were padded with a Delay, it is done before the next
+                # component starts
+                a.update(1.0)
+                a.stop()
+            else:
+                self.running.append(a)
 
     def update(self, t):
-        self.actions[0].update(t)
-        self.actions[1].update(t)
+        running = []
+        for a in self.running:
+            try:
+                sub_t = t * self.duration / a.duration
+            except ZeroDivisionError:
+                sub_t = 1.0
+            if sub_t >= 1.0:
+                a.update(1.0)
+                a.stop()
+            else:
+                a.update(sub_t)
+                running.append(a)
+        self.running = running
         self._done = (t >= 1.0)
-        if self._done:
-            self.actions[0].stop()
-            self.actions[1].stop()
 
     def __reversed__(self):
-        return Reverse( self.actions[0]  ) | Reverse( self.actions[1] )
+        from cocos.actions.interval_actions import Delay
+
+        result = None
+        for template in self.templates:
+            a = Reverse(template)
+            if template.duration < self.duration:
+                a = Delay(self.duration - template.duration) + a
+            if result is None:
+                result = a
+            else:
+                result = result | a
+        return result
 
 
 class Spawn_InstantAction(InstantAction):
@@ -991,9 +1164,13 @@ class Repeat(Action):
                 The action that will be repeated
         """
         self.duration = None
-        self.original = action
+        # template for each repetition, shared by the worker copies
+        self.original = copy.deepcopy( action )
         self.action = copy.deepcopy( action )
 
+    def __deepcopy__(self, memo):
+        return _deepcopy_sharing(self, memo, ('original',))
+
     def start(self):
         self.action.target = self.target
         self.action.start()
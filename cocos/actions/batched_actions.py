@@ -0,0 +1,455 @@
+# ----------------------------------------------------------------------------
+# cocos2d
+# Copyright (c) 2008-2012 Daniel Moisset, Ricardo Quesada, Rayentray Tappa,
+# Lucio Torre
+# Copyright (c) 2009-2014  Richard Jones, Claudio Canepa
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#   * Neither the name of cocos2d nor the names of its
+#     contributors may be used to endorse or promote products
+#     derived from this software without specific prior written
+#     permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# ----------------------------------------------------------------------------
+'''Batched execution of many interval actions
+
+`ActionManager` is an opt-in alternative to `CocosNode.do` for scenes where
+thousands of nodes run the same simple interval actions, like `MoveBy`,
+`RotateBy` or `FadeTo` on many sprites.
+
+The actions started through the manager are grouped by the attribute they
+interpolate; each group stores the start values, deltas, durations and
+elapsed times in numpy arrays, evaluates update(t) for all its actions with
+a few numpy operations and then writes the results back to the targets.
+
+Usage::
+
+    manager = ActionManager()
+    layer.schedule(manager.step)
+    for sprite in sprites:
+        manager.do(MoveBy((100, 0), 2), sprite)
+
+Actions not supported by the manager are passed to target.do, so they run as
+usual.
+
+`SwarmMover` does the same for the `Move`, `WrappedMove` and `BoundedMove`
+physics: it keeps the kinematic state of many nodes in numpy arrays,
+integrates all of them in each step and writes the positions back to the
+nodes.
+
+Usage::
+
+    mover = SwarmMover('wrap', width, height)
+    layer.schedule(mover.step)
+    for bullet in bullets:
+        mover.add(bullet)
+'''
+
+from __future__ import division, print_function, unicode_literals
+
+__docformat__ = 'restructuredtext'
+
+import copy
+
+from .interval_actions import (MoveTo, MoveBy, RotateTo, RotateBy, ScaleTo,
+                               ScaleBy, FadeTo, FadeOut, FadeIn)
+
+# numpy is only needed by ActionManager and SwarmMover
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['ActionManager', 'SwarmMover']
+
+
+def _position_params(action):
+    return 'position', (action.start_position[0], action.start_position[1]), (action.delta[0], action.delta[1]), False
+
+def _rotation_params(action):
+    return 'rotation', (action.start_angle,), (action.angle,), True
+
+def _scale_params(action):
+    return 'scale', (action.start_scale,), (action.delta,), False
+
+def _fade_to_params(action):
+    return 'opacity', (action.start_alpha,), (action.alpha - action.start_alpha,), False
+
+def _fade_out_params(action):
+    return 'opacity', (255.0,), (-255.0,), False
+
+def _fade_in_params(action):
+    return 'opacity', (0.0,), (255.0,), False
+
+
+class _LerpGroup(object):
+    """
+    Actions whose update(t) is target.attrib = start + delta * t, optionally
+    modulo 360, stored as numpy arrays.
+    """
+    def __init__(self, attrib, size, wrap):
+        self.attrib = attrib
+        self.size = size
+        self.wrap = wrap
+        self.actions = []
+        self.start = numpy.zeros((0, size))
+        self.delta = numpy.zeros((0, size))
+        self.duration = numpy.zeros(0)
+        self.elapsed = numpy.zeros(0)
+        # (action, start, delta) added since last step
+        self.pending = []
+        # actions removed since last step
+        self.removed = set()
+
+    def __len__(self):
+        return len(self.actions) + len(self.pending) - len(self.removed)
+
+    def add(self, action, start, delta):
+        self.pending.append((action, start, delta))
+
+    def remove(self, action):
+        self.removed.add(action)
+
+    def _flush(self):
+        if self.removed:
+            keep = numpy.array([a not in self.removed for a in self.actions],
+                               dtype=bool)
+            self.actions = [a for a in self.actions if a not in self.removed]
+            self.start = self.start[keep]
+            self.delta = self.delta[keep]
+            self.duration = self.duration[keep]
+            self.elapsed = self.elapsed[keep]
+            self.pending = [p for p in self.pending if p[0] not in self.removed]
+            self.removed = set()
+        if self.pending:
+            actions = [p[0] for p in self.pending]
+            self.actions.extend(actions)
+            self.start = numpy.concatenate(
+                (self.start, numpy.array([p[1] for p in self.pending], float).reshape(-1, self.size)))
+            self.delta = numpy.concatenate(
+                (self.delta, numpy.array([p[2] for p in self.pending], float).reshape(-1, self.size)))
+            self.duration = numpy.concatenate(
+                (self.duration, numpy.array([a.duration for a in actions], float)))
+            self.elapsed = numpy.concatenate(
+                (self.elapsed, numpy.zeros(len(actions))))
+            self.pending = []
+
+    def step(self, dt):
+        """advances all the actions dt seconds; returns the finished ones"""
+        self._flush()
+        if not self.actions:
+            return []
+        self.elapsed += dt
+        duration = self.duration
+        t = numpy.ones(len(duration))
+        positive = duration > 0
+        t[positive] = numpy.minimum(1.0, self.elapsed[positive] / duration[positive])
+        values = self.start + self.delta * t[:, numpy.newaxis]
+        if self.wrap:
+            values %= 360
+
+        attrib = self.attrib
+        if self.size == 1:
+            for action, value in zip(self.actions, values[:, 0].tolist()):
+                setattr(action.target, attrib, value)
+        else:
+            for action, value in zip(self.actions, values.tolist()):
+                setattr(action.target, attrib, tuple(value))
+
+        done = (self.elapsed >= duration).nonzero()[0]
+        finished = [self.actions[i] for i in done.tolist()]
+        self.removed.update(finished)
+        return finished
+
+
+class ActionManager(object):
+    """
+    Runs interval actions in vectorized groups.
+
+    Supported actions, matched by exact class so subclasses that customize
+    update run as usual: MoveTo, MoveBy, RotateTo, RotateBy, ScaleTo, ScaleBy,
+    FadeTo, FadeOut, FadeIn. Other actions are passed to target.do.
+
+    The manager must be stepped by the application, usually scheduling
+    manager.step in the layer or scene holding the targets. Pausing a target
+    node does not pause the actions it runs through the manager; use the
+    manager pause and resume methods.
+    """
+
+    #: action class -> function returning (attrib, start, delta, wrap) for
+    #: a started action
+    batchable = {
+        MoveTo: _position_params,
+        MoveBy: _position_params,
+        RotateTo: _rotation_params,
+        RotateBy: _rotation_params,
+        ScaleTo: _scale_params,
+        ScaleBy: _scale_params,
+        FadeTo: _fade_to_params,
+        FadeOut: _fade_out_params,
+        FadeIn: _fade_in_params,
+        }
+
+    def __init__(self):
+        if numpy is None:
+            raise ImportError("ActionManager needs numpy")
+        # (attrib, size, wrap) -> _LerpGroup
+        self.groups = {}
+        # action -> group
+        self.group_of = {}
+        self.paused = False
+
+    def do(self, action, target):
+        """
+        Starts a clone of action on target, as target.do(action) would.
+
+        Returns the clone, which can be passed to remove_action.
+        """
+        params = self.batchable.get(type(action))
+        if params is None:
+            return target.do(action)
+        a = copy.deepcopy(action)
+        a.target = target
+        a.start()
+        attrib, start, delta, wrap = params(a)
+        key = (attrib, len(start), wrap)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = _LerpGroup(*key)
+        group.add(a, start, delta)
+        self.group_of[a] = group
+        return a
+
+    def remove_action(self, action):
+        """stops an action started with do before it finishes"""
+        group = self.group_of.pop(action, None)
+        if group is None:
+            action.target.remove_action(action)
+            return
+        group.remove(action)
+        action.stop()
+
+    def are_actions_running(self):
+        return bool(self.group_of)
+
+    def __len__(self):
+        """number of batched actions running"""
+        return len(self.group_of)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def step(self, dt):
+        """advances all the batched actions dt seconds"""
+        if self.paused:
+            return
+        for group in list(self.groups.values()):
+            for action in group.step(dt):
+                del self.group_of[action]
+                action.stop()
+
+
+class SwarmMover(object):
+    """
+    Moves many nodes as `Move`, `WrappedMove` or `BoundedMove` would, with
+    the state of all the nodes in numpy arrays.
+
+    The node attributes follow the `Move` conventions::
+
+        node.position = (x, y)
+        node.velocity = (dx, dy)
+        node.acceleration = (ddx, ddy) = (0, 0)
+        node.gravity = 0
+        node.rotation
+        node.dr = 0
+        node.ddr = 0
+
+    and, when wrapping or bounding, node.width and node.height.
+
+    They are read by add. After each step the mover writes node.position,
+    and also node.velocity, node.rotation and node.dr for the nodes where
+    they changed. If code outside the mover changes any of those attributes
+    it must call refresh(node) to load the new values.
+    """
+
+    def __init__(self, edges=None, width=None, height=None):
+        """
+        :Parameters:
+            `edges` : None, 'wrap' or 'bound'
+                None moves as `Move`, 'wrap' as `WrappedMove` and 'bound' as
+                `BoundedMove`
+            `width` : number
+                The width to wrap or bound position at.
+            `height` : number
+                The height to wrap or bound position at.
+        """
+        if numpy is None:
+            raise ImportError("SwarmMover needs numpy")
+        if edges not in (None, 'wrap', 'bound'):
+            raise ValueError("edges must be None, 'wrap' or 'bound'")
+        self.edges = edges
+        self.width = width
+        self.height = height
+        self.paused = False
+
+        self.nodes = []
+        # node -> row
+        self.index = {}
+        self._alloc(64)
+
+    def _alloc(self, capacity):
+        self.capacity = capacity
+        self.position = numpy.zeros((capacity, 2))
+        self.velocity = numpy.zeros((capacity, 2))
+        self.acceleration = numpy.zeros((capacity, 2))
+        self.gravity = numpy.zeros(capacity)
+        self.rotation = numpy.zeros(capacity)
+        self.dr = numpy.zeros(capacity)
+        self.ddr = numpy.zeros(capacity)
+        self.size = numpy.zeros((capacity, 2))
+
+    def _arrays(self):
+        return {'position': self.position, 'velocity': self.velocity,
+                'acceleration': self.acceleration, 'gravity': self.gravity,
+                'rotation': self.rotation, 'dr': self.dr, 'ddr': self.ddr,
+                'size': self.size}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def add(self, node):
+        """starts moving node"""
+        if node in self.index:
+            return
+        i = len(self.nodes)
+        if i == self.capacity:
+            self._grow()
+        self.nodes.append(node)
+        self.index[node] = i
+        self._load(i, node)
+
+    def _grow(self):
+        old_arrays = self._arrays()
+        n = len(self.nodes)
+        self.capacity *= 2
+        for name, arr in old_arrays.items():
+            new = numpy.zeros((self.capacity,) + arr.shape[1:])
+            new[:n] = arr[:n]
+            setattr(self, name, new)
+
+    def _load(self, i, node):
+        self.position[i] = node.position
+        self.velocity[i] = node.velocity
+        self.acceleration[i] = getattr(node, 'acceleration', (0, 0))
+        self.gravity[i] = getattr(node, 'gravity', 0)
+        self.rotation[i] = node.rotation
+        self.dr[i] = getattr(node, 'dr', 0)
+        self.ddr[i] = getattr(node, 'ddr', 0)
+        if self.edges is not None:
+            self.size[i] = (node.width, node.height)
+
+    def refresh(self, node):
+        """reloads the node attributes changed by code outside the mover"""
+        self._load(self.index[node], node)
+
+    def remove(self, node):
+        """stops moving node; the node keeps the last values written"""
+        i = self.index.pop(node)
+        last = len(self.nodes) - 1
+        if i != last:
+            # move the last row to the hole
+            moved = self.nodes[last]
+            self.nodes[i] = moved
+            self.index[moved] = i
+            for arr in self._arrays().values():
+                arr[i] = arr[last]
+        self.nodes.pop()
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def step(self, dt):
+        """integrates all the nodes dt seconds"""
+        n = len(self.nodes)
+        if self.paused or not n:
+            return
+        position = self.position[:n]
+        velocity = self.velocity[:n]
+        acceleration = self.acceleration[:n]
+        gravity = self.gravity[:n]
+
+        accelerated = (acceleration[:, 0] != 0) | (acceleration[:, 1] != 0) | (gravity != 0)
+        velocity[:, 0] += acceleration[:, 0] * dt
+        velocity[:, 1] += (acceleration[:, 1] + gravity) * dt
+        position += velocity * dt
+
+        if self.edges == 'wrap':
+            self._wrap(position, self.size[:n])
+        elif self.edges == 'bound':
+            self._bound(position, self.size[:n])
+
+        dr = self.dr[:n]
+        ddr = self.ddr[:n]
+        spin_accelerated = ddr != 0
+        dr += ddr * dt
+        spinning = dr != 0
+        self.rotation[:n] += dr * dt
+
+        # sync back
+        nodes = self.nodes
+        for node, x, y in zip(nodes, position[:, 0].tolist(),
+                              position[:, 1].tolist()):
+            node.position = (x, y)
+        for i in accelerated.nonzero()[0].tolist():
+            nodes[i].velocity = (float(velocity[i, 0]), float(velocity[i, 1]))
+        for i in spin_accelerated.nonzero()[0].tolist():
+            nodes[i].dr = float(dr[i])
+        rotation = self.rotation
+        for i in spinning.nonzero()[0].tolist():
+            nodes[i].rotation = float(rotation[i])
+
+    def _wrap(self, position, size):
+        # as WrappedMove, assumes center anchor
+        for axis, limit in ((0, self.width), (1, self.height)):
+            p = position[:, axis]
+            s = size[:, axis]
+            p -= numpy.where(p > limit + s / 2, limit + s, 0.0)
+            p += numpy.where(p < -s / 2, limit + s, 0.0)
+
+    def _bound(self, position, size):
+        # as BoundedMove, assumes center anchor
+        for axis, limit in ((0, self.width), (1, self.height)):
+            p = position[:, axis]
+            half = size[:, axis] / 2
+            hi = limit - half
+            p[:] = numpy.where(p > hi, hi, numpy.where(p < half, half, p))
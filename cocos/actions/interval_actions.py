@@ -81,6 +81,7 @@ Modifier actions
 
   * `Accelerate`
   * `AccelDeccel`
+  * `Ease`
   * `Speed`
 
 
@@ -95,6 +96,28 @@ Examples::
                                                 # of height in 5 seconds
 
     accel_move = Accelerate(move)               # accelerates action move
+
+
+Lookup tables
+=============
+
+`Jump`, `JumpBy` and `Bezier` accept a ``resolution`` parameter; when
+given, the curve (or the path) is sampled once into a table of
+resolution + 1 values and each update does a linear interpolation between
+two samples. Tables are shared by all the actions with the same parameters
+and by all their copies.
+
+`Ease` applies any easing function through a table; pass the same
+`EasingTable` to share it between actions.
+
+In CPython reading a table costs about the same as t**rate or one
+math.exp, so `Accelerate` and `AccelDeccel` always compute the exact curve;
+tables pay for paths and for easing functions with more math.
+
+Example::
+
+    # constant speed along the path, 512 samples
+    action = Bezier(path, 5, resolution=512, arc_length=True)
 '''
 
 from __future__ import division, print_function, unicode_literals
@@ -108,6 +131,7 @@ import math
 
 from .base_actions import *
 from cocos.euclid import *
+from cocos.path import PathTable
 
 __all__ = [  'Lerp',                            # interpolation
             'MoveTo','MoveBy',                  # movement actions
@@ -119,9 +143,60 @@ __all__ = [  'Lerp',                            # interpolation
             'FadeOut','FadeIn','FadeTo',        # Fades in/out action
             'Blink',                            # Blink action
 
-            'Accelerate','AccelDeccel','Speed', # Time alter actions
+            'Accelerate','AccelDeccel','Ease',  # Time alter actions
+            'Speed',
+
+            'EasingTable',                      # Lookup tables
             ]
 
+
+class EasingTable(object):
+    """
+    A function f(t), t in [0, 1], sampled at resolution + 1 evenly spaced
+    points and evaluated by linear interpolation between the samples.
+
+    The table is immutable: copies of an action holding it share it.
+    """
+    def __init__(self, func, resolution=256):
+        self.resolution = resolution
+        self.values = [func(i / resolution) for i in range(resolution + 1)]
+
+    def __call__(self, t):
+        values = self.values
+        if t >= 1.0:
+            return values[-1]
+        if t <= 0.0:
+            return values[0]
+        x = t * self.resolution
+        i = int(x)
+        return values[i] + (values[i + 1] - values[i]) * (x - i)
+
+    def reversed(self):
+        """returns the table for 1 - f(1 - t)"""
+        table = EasingTable.__new__(EasingTable)
+        table.resolution = self.resolution
+        table.values = [1.0 - v for v in reversed(self.values)]
+        return table
+
+    def __deepcopy__(self, memo):
+        return self
+
+# built-in curves, name -> parameter -> f(t)
+_easing_funcs = {
+    'jump': lambda jumps: (lambda t: abs(math.sin(t * math.pi * jumps))),
+    }
+
+# (name, parameter, resolution) -> EasingTable, only for the built-in curves
+_easing_tables = {}
+
+def _easing_table(name, parameter, resolution):
+    key = (name, parameter, resolution)
+    table = _easing_tables.get(key)
+    if table is None:
+        func = _easing_funcs[name](parameter)
+        table = _easing_tables[key] = EasingTable(func, resolution)
+    return table
+
 class Lerp( IntervalAction ):
     """
     Interpolate between values for some specified attribute 
@@ -334,6 +409,51 @@ class AccelDeccel( IntervalAction ):
         return AccelDeccel( Reverse(self.other) )
 
 
+class Ease( IntervalAction ):
+    """
+    Changes the time progression of an action with an easing function,
+    sampled once into an `EasingTable`.
+
+    Example::
+
+        def ease_out_bounce(t):
+            ...
+
+        action = Ease( MoveBy( (0, -200), 2 ), ease_out_bounce )
+        sprite.do( action )
+    """
+    def init(self, other, func, resolution=256):
+        """Init method.
+
+        :Parameters:
+            `other` : IntervalAction
+                The action that will be affected
+            `func` : callable or `EasingTable`
+                f(t) for t in [0, 1], usually with f(0) = 0 and f(1) = 1.
+                A callable is sampled into a new table for this action
+                and its copies; pass an `EasingTable` to share one table
+                between actions.
+            `resolution` : int
+                Number of intervals in the table; not used if func is
+                an `EasingTable`
+        """
+        self.other = other
+        if isinstance(func, EasingTable):
+            self.ease = func
+        else:
+            self.ease = EasingTable(func, resolution)
+        self.duration = other.duration
+
+    def start(self):
+        self.other.target = self.target
+        self.other.start()
+
+    def update(self, t):
+        self.other.update( self.ease(t) )
+
+    def __reversed__(self):
+        return Ease( Reverse(self.other), self.ease.reversed() )
+
 
 class MoveTo( IntervalAction ):
     """Moves a `CocosNode` object to the position x,y. x and y are absolute coordinates
@@ -557,7 +677,8 @@ class Bezier( IntervalAction ):
         sprite.do( action )                       # bezier path 'bezier_conf.path1'
                                                   # in 5 seconds
     """
-    def init(self, bezier, duration=5, forward=True):
+    def init(self, bezier, duration=5, forward=True, resolution=None,
+             arc_length=False):
         """Init method
 
         :Parameters:
@@ -565,8 +686,18 @@ class Bezier( IntervalAction ):
                 A bezier configuration
             `duration` : float
                 Duration time in seconds
+            `resolution` : int or None
+                If not None, the path is sampled once into a
+                `cocos.path.PathTable` with this resolution, shared by all the
+                copies of the action.
+            `arc_length` : bool
+                If True the path is sampled at equal distances, so the
+                target moves at constant speed. Implies a table, with
+                resolution 256 if not given.
         """
         self.duration = duration
+        if resolution is not None or arc_length:
+            bezier = PathTable(bezier, resolution or 256, arc_length)
         self.bezier = bezier
         self.forward = forward
 
@@ -593,7 +724,7 @@ class Jump(IntervalAction):
                                        # of 50 pixels of height
     """
 
-    def init(self, y=150, x=120, jumps=1, duration=5):
+    def init(self, y=150, x=120, jumps=1, duration=5, resolution=None):
         """Init method
 
         :Parameters:
@@ -605,6 +736,9 @@ class Jump(IntervalAction):
                 quantity of jumps
             `duration` : float
                 Duration time in seconds
+            `resolution` : int or None
+                If not None, the jump curve is read from a shared
+                `EasingTable` with this resolution.
         """
 
         import warnings
@@ -615,18 +749,25 @@ class Jump(IntervalAction):
         self.x = x
         self.duration = duration
         self.jumps = jumps
+        self.resolution = resolution
+        self.hop = None
+        if resolution is not None:
+            self.hop = _easing_table('jump', jumps, resolution)
 
     def start( self ):
         self.start_position = self.target.position
 
     def update(self, t):
-        y = int( self.y * abs( math.sin( t * math.pi * self.jumps ) ) )
+        if self.hop is None:
+            y = int( self.y * abs( math.sin( t * math.pi * self.jumps ) ) )
+        else:
+            y = int( self.y * self.hop(t) )
 
         x = self.x * t
         self.target.position = self.start_position + Point2(x,y)
 
     def __reversed__(self):
-        return Jump(self.y, -self.x, self.jumps, self.duration)
+        return Jump(self.y, -self.x, self.jumps, self.duration, self.resolution)
 
 class JumpBy(IntervalAction):
     """Moves a `CocosNode` object simulating a jump movement by modifying it's position attribute.
@@ -639,7 +780,8 @@ class JumpBy(IntervalAction):
                                        # of 200 pixels of height
     """
 
-    def init(self, position=(0,0), height=100, jumps=1, duration=5):
+    def init(self, position=(0,0), height=100, jumps=1, duration=5,
+             resolution=None):
         """Init method
 
         :Parameters:
@@ -652,24 +794,35 @@ class JumpBy(IntervalAction):
                 quantity of jumps
             `duration` : float
                 Duration time in seconds
+            `resolution` : int or None
+                If not None, the jump curve is read from a shared
+                `EasingTable` with this resolution; use several samples
+                per jump.
         """
         self.position = position
         self.height = height
         self.duration = duration
         self.jumps = jumps
+        self.resolution = resolution
+        self.hop = None
+        if resolution is not None:
+            self.hop = _easing_table('jump', jumps, resolution)
 
     def start( self ):
         self.start_position = self.target.position
         self.delta = Vector2(*self.position)
         
     def update(self, t):
-        y = self.height * abs( math.sin( t * math.pi * self.jumps ) )
+        if self.hop is None:
+            y = self.height * abs( math.sin( t * math.pi * self.jumps ) )
+        else:
+            y = self.height * self.hop(t)
         y = int(y+self.delta[1] * t)
         x = self.delta[0] * t
         self.target.position = self.start_position + Point2(x,y)
         
     def __reversed__(self):
-        return JumpBy( (-self.position[0],-self.position[1]), self.height, self.jumps, self.duration)
+        return JumpBy( (-self.position[0],-self.position[1]), self.height, self.jumps, self.duration, self.resolution)
 
 class JumpTo(JumpBy):
     """Moves a `CocosNode` object to a position simulating a jump movement by modifying
@@ -52,7 +52,7 @@ from pyglet.graphics import OrderedGroup
 from pyglet import image
 from pyglet.gl import *
 
-__all__ = ['BatchNode','BatchableNode']
+__all__ = ['BatchNode','BatchableNode', 'vertex_updates']
 
 
 def ensure_batcheable(node):
@@ -61,6 +61,60 @@ def ensure_batcheable(node):
     for c in  node.get_children():
         ensure_batcheable(c)
 
+class _VertexUpdates(object):
+    """
+    Nodes whose vertex list must be rebuilt before drawing; used by the
+    sprites with `cocos.sprite.Sprite.deferred_updates` set.
+
+    Only `BatchNode.visit` and `cocos.sprite.Sprite.draw` call `flush`
+    before drawing; code drawing deferred sprites by other means, by example
+    a pyglet batch of its own, must call `flush` before drawing.
+
+    A sprite leaving the stage is rebuilt and dropped from the pending set,
+    and a deleted one is dropped, so the set does not keep them alive.
+    """
+    def __init__(self):
+        self.pending = set()
+
+        #: rebuilds avoided since the last flush, by changes to nodes
+        #: already pending
+        self.avoided = 0
+
+        #: rebuilds avoided in the period before the last flush with pending
+        #: nodes, that is, in the last frame
+        self.last_avoided = 0
+
+    def mark(self, node):
+        """node.rebuild_vertexs() will be called at the next flush"""
+        if node in self.pending:
+            self.avoided += 1
+        else:
+            self.pending.add(node)
+
+    def flush_node(self, node):
+        """rebuilds the vertex list of node now if it is pending"""
+        if node in self.pending:
+            self.pending.discard(node)
+            node.rebuild_vertexs()
+
+    def discard(self, node):
+        """forgets node, without rebuilding its vertex list"""
+        self.pending.discard(node)
+
+    def flush(self):
+        """rebuilds the vertex lists of the pending nodes"""
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = set()
+        for node in pending:
+            node.rebuild_vertexs()
+        self.last_avoided = self.avoided
+        self.avoided = 0
+
+vertex_updates = _VertexUpdates()
+
+
 class BatchNode( CocosNode ):
     def __init__(self):
         super(BatchNode, self).__init__()
@@ -76,6 +130,7 @@ class BatchNode( CocosNode ):
         """ All children are placed in to self.batch, so nothing to visit """
         if not self.visible:   
            return 
+        vertex_updates.flush()
         glPushMatrix()
         self.transform()
         self.batch.draw()
@@ -51,11 +51,20 @@ from cocos.camera import Camera
 from cocos import euclid
 
 import math
+import operator
 import weakref
 
+# numpy is only needed by points_to_world
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 __all__ = ['CocosNode']
 
+_z_order = operator.itemgetter(0)
+
 class CocosNode(object):
     """
     Cocosnode is the main element. Anything thats gets drawn or contains things that get drawn is a cocosnode.
@@ -73,10 +82,20 @@ class CocosNode(object):
         - create callbacks to handle the advancement of time
         - overriding draw to render the node
     """
+
+    #: order of the node callbacks when the scene uses a
+    #: `cocos.scheduler.Scheduler`; lower values are called first
+    schedule_priority = 0
+
+    # Scheduler used while in the stage, None means pyglet.clock
+    _scheduler = None
+
+    # RenderGraph drawing this node, None means drawn by visit
+    _render_graph = None
+
     def __init__(self):
         # composition stuff
 
-        #: list of (int, child-reference) where int is the z-order, sorted by ascending z (back to front order)
         self.children = []
 
         #: dictionary that maps children names with children references
@@ -167,6 +186,18 @@ class CocosNode(object):
         self.is_inverse_transform_dirty = False
         self.inverse_transform_matrix = euclid.Matrix3().identity()
 
+        # world matrix caches: a generation bumps each time the matrix is
+        # recomputed, and the world matrices remember the generations they
+        # were computed from
+        self._local_generation = 0
+        self._world_matrix = None
+        self._world_key = None
+        self._world_generation = 0
+        self._local_inverse_generation = 0
+        self._world_inverse = None
+        self._world_inverse_key = None
+        self._world_inverse_generation = 0
+
 
     def make_property(attr):
         types = { 'anchor_x': "int", 'anchor_y': "int", "anchor": "(int, int)"}
@@ -240,7 +271,9 @@ class CocosNode(object):
 
         You should not have to schedule things using pyglet by yourself.
         """
-        if self.is_running:
+        if self._scheduler is not None:
+            self._scheduler.schedule_interval(self, callback, interval, *args, **kwargs)
+        elif self.is_running:
             pyglet.clock.schedule_interval(callback, interval, *args, **kwargs)
         self.scheduled_interval_calls.append(
                 (callback, interval, args, kwargs)
@@ -268,7 +301,9 @@ class CocosNode(object):
 
         You should not have to schedule things using pyglet by yourself.
         """
-        if self.is_running:
+        if self._scheduler is not None:
+            self._scheduler.schedule(self, callback, *args, **kwargs)
+        elif self.is_running:
             pyglet.clock.schedule(callback, *args, **kwargs)
         self.scheduled_calls.append(
                 (callback, args, kwargs)
@@ -301,7 +336,9 @@ class CocosNode(object):
                 c for c in self.scheduled_interval_calls if c[0] != callback
                 ]
 
-        if self.is_running:
+        if self._scheduler is not None:
+            self._scheduler.unschedule(self, callback)
+        elif self.is_running:
             pyglet.clock.unschedule( callback )
 
     def resume_scheduler(self):
@@ -309,6 +346,9 @@ class CocosNode(object):
         Time will continue/start passing for this node and callbacks
         will be called, worker actions will be called
         """
+        if self._scheduler is not None:
+            self._scheduler.resume_node(self)
+            return
         for c, i, a, k in self.scheduled_interval_calls:
             pyglet.clock.schedule_interval(c, i, *a, **k)
         for c, a, k in self.scheduled_calls:
@@ -319,6 +359,9 @@ class CocosNode(object):
         Time will stop passing for this node: scheduled callbacks will
         not be called, worker actions will not be called
         """
+        if self._scheduler is not None:
+            self._scheduler.pause_node(self)
+            return
         for f in set(
                 [ x[0] for x in self.scheduled_interval_calls ] +
                 [ x[0] for x in self.scheduled_calls ]
@@ -334,6 +377,8 @@ class CocosNode(object):
     def _set_parent(self, parent):
         if parent is None: self._parent = None
         else: self._parent = weakref.ref(parent)
+        self._world_key = None
+        self._world_inverse_key = None
 
     parent = property(_get_parent, _set_parent, doc='''The parent of this object.
 
@@ -426,6 +471,46 @@ class CocosNode(object):
     rotation = property( _get_rotation, lambda self, angle: self._set_rotation(angle))
 
 
+    # children
+    #
+    # add appends to _added_children and _remove puts the child in
+    # _dead_children, both O(1); the sorted list is rebuilt when children is
+    # read, at most once per frame when visiting. The rebuild makes a new
+    # list, so iterations in progress are not disturbed.
+
+    def _get_children(self):
+        if self._added_children or self._dead_children:
+            self._compact_children()
+        return self._children
+
+    def _set_children(self, children):
+        self._children = children
+        self._added_children = []
+        self._dead_children = set()
+        self._children_count = {}
+        for z, c in children:
+            self._children_count[c] = self._children_count.get(c, 0) + 1
+
+    children = property(_get_children, _set_children, doc='''list of (int, child-reference) where int is the z-order, sorted by
+    ascending z (back to front order); children with the same z are in the
+    order they were added.
+
+    :type: list
+    ''')
+
+    def _compact_children(self):
+        children = self._children
+        if self._added_children:
+            # stable, and linear when few children were added
+            children = children + self._added_children
+            children.sort(key=_z_order)
+            self._added_children = []
+        if self._dead_children:
+            dead = self._dead_children
+            children = [ elem for elem in children if elem[1] not in dead ]
+            self._dead_children = set()
+        self._children = children
+
     def add(self, child, z=0, name=None ):
         """Adds a child and if it becomes part of the active scene calls its on_enter method
 
@@ -452,19 +537,14 @@ class CocosNode(object):
 
         child.parent = self
 
-        elem = z, child
-
-        # inlined and customized bisect.insort_right, the stock one fails in py3
-        lo = 0
-        hi = len(self.children)
-        a = self.children
-        while lo < hi:
-            mid = (lo+hi)//2
-            if z < a[mid][0]: hi = mid
-            else: lo = mid+1
-        self.children.insert(lo, elem)
-
+        if child in self._dead_children:
+            # its old entries must go before adding the new one
+            self._compact_children()
+        self._added_children.append((z, child))
+        self._children_count[child] = self._children_count.get(child, 0) + 1
 
+        if self._render_graph is not None:
+            self._render_graph.invalidate()
 
         if self.is_running:
             child.on_enter()
@@ -500,14 +580,18 @@ class CocosNode(object):
             self._remove(obj)
 
     def _remove( self, child ):
-        l_old = len(self.children)
-        self.children = [ (z,c) for (z,c) in self.children if c != child ]
-
-        if l_old == len(self.children):
+        if child not in self._children_count:
             raise Exception("Child not found: %s" % str(child) )
 
+        del self._children_count[child]
+        self._dead_children.add(child)
+
+        if self._render_graph is not None:
+            self._render_graph.invalidate()
+
         if self.is_running:
             child.on_exit()
+        child._detach_scheduler()
 
     def get_children(self):
         """Return a list with the node's childs, order is back to front
@@ -519,7 +603,7 @@ class CocosNode(object):
         return [ c for (z, c) in self.children ]
 
     def __contains__(self, child):
-        return child in self.get_children()
+        return child in self._children_count
 
     def get( self, name ):
         """Gets a child given its name
@@ -554,6 +638,9 @@ class CocosNode(object):
         """
         self.is_running = True
 
+        # the clock to use while in the stage
+        self._attach_scheduler(self._find_scheduler())
+
         # start actions
         self.resume()
         # resume scheduler
@@ -564,6 +651,34 @@ class CocosNode(object):
             c.on_enter()
 
 
+    def _find_scheduler(self):
+        """returns the `cocos.scheduler.Scheduler` this node should use, None
+        means pyglet.clock"""
+        parent = self.parent
+        if parent is None:
+            return None
+        return parent._scheduler
+
+    def _attach_scheduler(self, scheduler):
+        # called while not running, so nothing is scheduled in the old clock
+        # besides the callbacks kept by the old scheduler
+        if scheduler is self._scheduler:
+            return
+        if self._scheduler is not None:
+            self._scheduler.forget(self)
+        self._scheduler = scheduler
+        if scheduler is not None:
+            scheduler.adopt(self)
+
+    def _detach_scheduler(self):
+        # the node left the scene: its scheduler should not keep it, nor its
+        # children, alive. on_enter will attach it again from the node lists
+        if self._scheduler is None:
+            return
+        self._attach_scheduler(None)
+        for c in self.get_children():
+            c._detach_scheduler()
+
     def on_exit( self ):
         """
         Called every time just before the node leaves the stage
@@ -642,7 +757,7 @@ class CocosNode(object):
         if r is not None:
             collect.append( r )
 
-        for node in self.get_children():
+        for z, node in self.children:
             node.walk(callback, collect)
 
         return collect
@@ -677,10 +792,11 @@ class CocosNode(object):
         # we visit all nodes that should be drawn before ourselves
 
 
-        if self.children and self.children[0][0] < 0:
+        children = self.children
+        if children and children[0][0] < 0:
             glPushMatrix()
             self.transform()
-            for z,c in self.children:
+            for z,c in children:
                 if z >= 0: break
                 position += 1
                 c.visit()
@@ -691,11 +807,13 @@ class CocosNode(object):
         self.draw()
 
         # we visit all the remaining nodes, that are over ourselves
-        if position < len(self.children):
+        n = len(children)
+        if position < n:
             glPushMatrix()
             self.transform()
-            for z,c in self.children[position:]:
-                c.visit()
+            while position < n:
+                children[position][1].visit()
+                position += 1
             glPopMatrix()
 
         if self.grid and self.grid.active:
@@ -745,7 +863,7 @@ class CocosNode(object):
         if not self.scheduled:
             if self.is_running:
                 self.scheduled = True
-                pyglet.clock.schedule( self._step )
+                self._schedule_step()
         return a
 
     def remove_action(self, action):
@@ -774,7 +892,7 @@ class CocosNode(object):
         if not self.scheduled:
             return
         self.scheduled = False
-        pyglet.clock.unschedule( self._step )
+        self._unschedule_step()
 
     def resume(self):
         """
@@ -783,7 +901,7 @@ class CocosNode(object):
         if self.scheduled:
             return
         self.scheduled = True
-        pyglet.clock.schedule( self._step )
+        self._schedule_step()
         self.skip_frame = True
 
     def stop(self):
@@ -802,6 +920,18 @@ class CocosNode(object):
         """
         return bool(set(self.actions) - set(self.to_remove))
 
+    def _schedule_step(self):
+        if self._scheduler is None:
+            pyglet.clock.schedule( self._step )
+        else:
+            self._scheduler.schedule_actions(self)
+
+    def _unschedule_step(self):
+        if self._scheduler is None:
+            pyglet.clock.unschedule( self._step )
+        else:
+            self._scheduler.unschedule_actions(self)
+
     def _step(self, dt):
         """pumps all the actions in the node actions container
 
@@ -826,7 +956,7 @@ class CocosNode(object):
 
         if len( self.actions ) == 0:
             self.scheduled = False
-            pyglet.clock.unschedule( self._step )
+            self._unschedule_step()
 
         for action in self.actions:
             if not action.scheduled_to_remove:
@@ -854,22 +984,36 @@ class CocosNode(object):
             self.is_transform_dirty = False
 
             self.transform_matrix = matrix
+            self._local_generation += 1
 
         return self.transform_matrix
 
     def get_world_transform( self ):
         '''returns an euclid.Matrix3 with the world transformation matrix
 
+        The matrix is cached until the transform of the node or of one of
+        its ancestors changes, so it must not be modified.
+
         :rtype: euclid.Matrix3
         '''
-        matrix = self.get_local_transform()
+        local = self.get_local_transform()
 
         p = self.parent
-        while p != None:
-            matrix = p.get_local_transform() * matrix
-            p = p.parent
+        if p is None:
+            key = (self._local_generation, -1)
+        else:
+            parent_matrix = p.get_world_transform()
+            key = (self._local_generation, p._world_generation)
+
+        if key != self._world_key:
+            if p is None:
+                self._world_matrix = local
+            else:
+                self._world_matrix = parent_matrix * local
+            self._world_key = key
+            self._world_generation += 1
 
-        return matrix
+        return self._world_matrix
 
     def point_to_world( self, p ):
         '''returns an euclid.Vector2 converted to world space
@@ -880,6 +1024,22 @@ class CocosNode(object):
         matrix = self.get_world_transform()
         return matrix *  v
 
+    def points_to_world( self, points ):
+        '''returns the points converted to world space; needs numpy
+
+        :Parameters:
+            `points` : N x 2 array-like
+                points in local space
+
+        :rtype: numpy.ndarray
+        :return: a new N x 2 float array
+        '''
+        if numpy is None:
+            raise ImportError("points_to_world needs numpy")
+        m = self.get_world_transform()
+        points = numpy.asarray(points, dtype=float)
+        return points.dot([[m.a, m.e], [m.b, m.f]]) + (m.c, m.g)
+
     def get_local_inverse( self ):
         '''returns an euclid.Matrix3 with the local inverse transformation matrix
 
@@ -890,22 +1050,36 @@ class CocosNode(object):
             matrix = self.get_local_transform().inverse()
             self.inverse_transform_matrix = matrix
             self.is_inverse_transform_dirty = False
+            self._local_inverse_generation += 1
 
         return self.inverse_transform_matrix
 
     def get_world_inverse( self ):
         '''returns an euclid.Matrix3 with the world inverse transformation matrix
 
+        The matrix is cached until the transform of the node or of one of
+        its ancestors changes, so it must not be modified.
+
         :rtype: euclid.Matrix3
         '''
-        matrix = self.get_local_inverse()
+        local = self.get_local_inverse()
 
         p = self.parent
-        while p != None:
-            matrix = matrix * p.get_local_inverse()
-            p = p.parent
+        if p is None:
+            key = (self._local_inverse_generation, -1)
+        else:
+            parent_matrix = p.get_world_inverse()
+            key = (self._local_inverse_generation, p._world_inverse_generation)
+
+        if key != self._world_inverse_key:
+            if p is None:
+                self._world_inverse = local
+            else:
+                self._world_inverse = local * parent_matrix
+            self._world_inverse_key = key
+            self._world_inverse_generation += 1
 
-        return matrix
+        return self._world_inverse
 
     def point_to_local( self, p ):
         '''returns an euclid.Vector2 converted to local space
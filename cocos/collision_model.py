@@ -39,8 +39,16 @@ __docformat__ = 'restructuredtext'
 
 import operator as op
 import math
+import bisect
+import heapq
 import cocos.euclid as eu
 
+# numpy is only needed by CollisionManagerNumpy
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 ###### interfaces, abstract base clases ######################################
 
 # cshape reference interfase 
@@ -51,6 +59,13 @@ class Cshape(object):
 
     Implementations are free to restrict the type of geometrical shapes
     that will accept, by example circles or axis aligned rectangles.
+
+    CircleShape and AARectShape accept each other; they find the function
+    for each pair of classes in a table indexed by the other shape 'kind'
+    class attribute, so there are no isinstance checks per call.
+    'kind' is CircleShape.kind for circles and AARectShape.kind for axis
+    aligned rectangles; a cshape without a 'kind' attribute is treated as
+    one of the same class as self, as duck typed shapes were before.
     """
     
     def overlaps(self, other):
@@ -113,6 +128,19 @@ class Cshape(object):
         """
         pass
 
+    def segment_hit(self, x0, y0, x1, y1):
+        """
+        Returns None if the segment from (x0, y0) to (x1, y1) don't touches
+        the shape, else the fraction t in [0.0, 1.0] of the segment where it
+        first touches the shape, that is, the point
+        (x0 + t * (x1 - x0), y0 + t * (y1 - y0)).
+
+        If (x0, y0) is inside the shape returns 0.0 .
+
+        :rtype: float or None
+        """
+        pass
+
     def copy(self):
         """
         Returns a copy of itself
@@ -155,11 +183,10 @@ class CollisionManager(object):
     Such an object can be called 'a collidable' in the documentation, and when
     'obj' or 'other' is seen in the code you can assume it means collidable.
 
-    As a limitation imposed by the current Cshapes implementations, all the
-    collidables that interacts with a particular instance of CollisionManager
-    must share the same concrete Cshape subclass: by example, all
-    objects should have a CircleShape cshape, or all objects should have a
-    AARectShape cshape.
+    The collidables that interacts with a particular instance of
+    CollisionManager can mix CircleShape and AARectShape cshapes. Other
+    Cshape implementations may restrict the shapes they accept as the other
+    shape.
 
     The known objects collective for each CollisionManager instance is
     manipulated by calling the methods
@@ -215,6 +242,14 @@ class CollisionManager(object):
         - When an actor reaches end of life use 'remove_tricky' to make it not known, no problem because his cshape has not changed
 
     Examples actors for this case are food, coins, trees, rocks.
+
+    Few of the known objects change cshapes each frame
+
+        - At level start you add all objects
+        - After changing the cshape of a known object call 'update' with it,
+          or collect the moved objects and call 'update_many' once per frame
+
+    Examples are levels with lots of static scenery and some moving actors.
     """
     
     def add(self, obj):
@@ -237,6 +272,21 @@ class CollisionManager(object):
         """
         pass
 
+    def update(self, obj):
+        """
+        Refreshes the internal data structures for the known object obj after
+        obj.cshape has changed, so there is no need to remove_tricky and add
+        it again.
+        obj is required to be a known object.
+        """
+        pass
+
+    def update_many(self, objs):
+        """
+        Same as calling update for each object in objs
+        """
+        pass
+
     def they_collide(self, obj1, obj2):
         """
         Returns a boolean, True if obj1 overlaps objs2
@@ -343,6 +393,29 @@ class CollisionManager(object):
         """
         pass
 
+    def knn(self, obj, k):
+        """
+        Returns a list with the (other, distance) pairs for the k known
+        objects nearest to obj, excluding obj itself, ordered by increasing
+        distance. If less than k objects are known all are returned.
+        obj is not required to be a known object
+
+        Useful to find the closest enemy; it is cheaper than calling
+        ranked_objs_near with growing distances.
+        """
+        pass
+
+    def objs_on_segment(self, p0, p1):
+        """
+        Returns a list with the known objects touched by the segment from
+        point p0 to point p1, ordered by the distance from p0 to the point
+        where the segment first touches the object.
+
+        Useful for line of sight and raycasts, the first object in the list
+        is the first one hit.
+        """
+        pass
+
 
 ###### Cshape implementations #################################################
 
@@ -355,6 +428,9 @@ class CircleShape(object):
     
     Look at Cshape for other class and methods documentation.
     """
+
+    # index in the pair function tables
+    kind = 0
     
     def __init__(self, center, r):
         """
@@ -368,16 +444,16 @@ class CircleShape(object):
         self.r = r
 
     def overlaps(self, other):
-        return abs(self.center - other.center) < self.r + other.r
+        kind = getattr(other, 'kind', self.kind)
+        return self._overlaps_by_kind[kind](self, other)
 
     def distance(self, other):
-        d = abs(self.center - other.center) - self.r - other.r
-        if d<0.0:
-            d = 0.0
-        return d
+        kind = getattr(other, 'kind', self.kind)
+        return self._distance_by_kind[kind](self, other)
     
     def near_than(self, other, near_distance):
-        return abs(self.center - other.center) <= self.r + other.r + near_distance
+        kind = getattr(other, 'kind', self.kind)
+        return self._near_than_by_kind[kind](self, other, near_distance)
 
     def touches_point(self, x, y):
         return abs(self.center - (x,y)) <= self.r
@@ -392,6 +468,25 @@ class CircleShape(object):
         return (self.center[0]-r, self.center[0]+r,
                 self.center[1]-r, self.center[1]+r)
 
+    def segment_hit(self, x0, y0, x1, y1):
+        fx = x0 - self.center[0]
+        fy = y0 - self.center[1]
+        c = fx*fx + fy*fy - self.r*self.r
+        if c <= 0.0:
+            # starts inside
+            return 0.0
+        dx = x1 - x0
+        dy = y1 - y0
+        a = dx*dx + dy*dy
+        b = 2.0 * (fx*dx + fy*dy)
+        disc = b*b - 4.0*a*c
+        if a == 0.0 or disc < 0.0:
+            return None
+        t = (-b - math.sqrt(disc)) / (2.0*a)
+        if 0.0 <= t <= 1.0:
+            return t
+        return None
+
     def copy(self):
         return CircleShape(eu.Vector2(*self.center), self.r)
 
@@ -406,8 +501,13 @@ class AARectShape(object):
     
     Good if actors don't rotate.
 
+    When the other shape is a CircleShape the euclidean distance is used.
+
     Look at Cshape for other class and methods documentation.
     """
+
+    # index in the pair function tables
+    kind = 1
     
     def __init__(self, center, half_width, half_height):
         """
@@ -424,19 +524,16 @@ class AARectShape(object):
         self.ry = half_height
         
     def overlaps(self, other):
-        return ( abs(self.center[0] - other.center[0]) < self.rx + other.rx and
-                 abs(self.center[1] - other.center[1]) < self.ry + other.ry )
+        kind = getattr(other, 'kind', self.kind)
+        return self._overlaps_by_kind[kind](self, other)
 
     def distance(self, other):
-        d = max((abs(self.center[0] - other.center[0])-self.rx - other.rx,
-                abs(self.center[1] - other.center[1])-self.ry - other.ry ))
-        if d<0.0:
-            d = 0.0
-        return d
+        kind = getattr(other, 'kind', self.kind)
+        return self._distance_by_kind[kind](self, other)
     
     def near_than(self, other, near_distance):
-        return ( abs(self.center[0] - other.center[0]) - self.rx - other.rx < near_distance and
-                 abs(self.center[1] - other.center[1]) - self.ry - other.ry < near_distance)
+        kind = getattr(other, 'kind', self.kind)
+        return self._near_than_by_kind[kind](self, other, near_distance)
 
     def touches_point(self, x, y):
         return ( abs(self.center[0] - x) < self.rx and
@@ -450,12 +547,128 @@ class AARectShape(object):
         return (self.center[0] - self.rx, self.center[0] + self.rx,
                 self.center[1] - self.ry, self.center[1] + self.ry)
 
+    def segment_hit(self, x0, y0, x1, y1):
+        clip = _clip_segment_to_box(x0, y0, x1, y1, *self.minmax())
+        if clip is None:
+            return None
+        return clip[0]
+
     def copy(self):
         return AARectShape(eu.Vector2(*self.center), self.rx, self.ry)
 
 
+###### Cshape pair functions #################################################
+
+def _overlaps_circle_circle(circle, other):
+    return abs(circle.center - other.center) < circle.r + other.r
+
+def _distance_circle_circle(circle, other):
+    d = abs(circle.center - other.center) - circle.r - other.r
+    if d<0.0:
+        d = 0.0
+    return d
+
+def _near_than_circle_circle(circle, other, near_distance):
+    return abs(circle.center - other.center) <= circle.r + other.r + near_distance
+
+def _overlaps_aarect_aarect(rect, other):
+    return ( abs(rect.center[0] - other.center[0]) < rect.rx + other.rx and
+             abs(rect.center[1] - other.center[1]) < rect.ry + other.ry )
+
+def _distance_aarect_aarect(rect, other):
+    d = max((abs(rect.center[0] - other.center[0])-rect.rx - other.rx,
+            abs(rect.center[1] - other.center[1])-rect.ry - other.ry ))
+    if d<0.0:
+        d = 0.0
+    return d
+
+def _near_than_aarect_aarect(rect, other, near_distance):
+    return ( abs(rect.center[0] - other.center[0]) - rect.rx - other.rx < near_distance and
+             abs(rect.center[1] - other.center[1]) - rect.ry - other.ry < near_distance)
+
+def _gap_circle_aarect(circle, rect):
+    # returns the squared euclidean distance from the circle center to rect
+    dx = abs(circle.center[0] - rect.center[0]) - rect.rx
+    dy = abs(circle.center[1] - rect.center[1]) - rect.ry
+    if dx < 0.0:
+        dx = 0.0
+    if dy < 0.0:
+        dy = 0.0
+    return dx*dx + dy*dy
+
+def _overlaps_circle_aarect(circle, rect):
+    return _gap_circle_aarect(circle, rect) < circle.r * circle.r
+
+def _distance_circle_aarect(circle, rect):
+    d = math.sqrt(_gap_circle_aarect(circle, rect)) - circle.r
+    if d<0.0:
+        d = 0.0
+    return d
+
+def _near_than_circle_aarect(circle, rect, near_distance):
+    r = circle.r + near_distance
+    return _gap_circle_aarect(circle, rect) <= r * r
+
+def _overlaps_aarect_circle(rect, circle):
+    return _gap_circle_aarect(circle, rect) < circle.r * circle.r
+
+def _distance_aarect_circle(rect, circle):
+    return _distance_circle_aarect(circle, rect)
+
+def _near_than_aarect_circle(rect, circle, near_distance):
+    return _near_than_circle_aarect(circle, rect, near_distance)
+
+def _clip_segment_to_box(x0, y0, x1, y1, minx, maxx, miny, maxy):
+    # returns None if the segment from (x0, y0) to (x1, y1) misses the box,
+    # else (t_lo, t_hi), the segment fractions where it enters and exits
+    t_lo = 0.0
+    t_hi = 1.0
+    for p0, p1, lo, hi in ((x0, x1, minx, maxx), (y0, y1, miny, maxy)):
+        d = p1 - p0
+        if d == 0.0:
+            if not (lo <= p0 <= hi):
+                return None
+            continue
+        ta = (lo - p0) / d
+        tb = (hi - p0) / d
+        if ta > tb:
+            ta, tb = tb, ta
+        if ta > t_lo:
+            t_lo = ta
+        if tb < t_hi:
+            t_hi = tb
+        if t_lo > t_hi:
+            return None
+    return t_lo, t_hi
+
+# tables indexed by the other shape kind
+CircleShape._overlaps_by_kind = (_overlaps_circle_circle,
+                                 _overlaps_circle_aarect)
+CircleShape._distance_by_kind = (_distance_circle_circle,
+                                 _distance_circle_aarect)
+CircleShape._near_than_by_kind = (_near_than_circle_circle,
+                                  _near_than_circle_aarect)
+AARectShape._overlaps_by_kind = (_overlaps_aarect_circle,
+                                 _overlaps_aarect_aarect)
+AARectShape._distance_by_kind = (_distance_aarect_circle,
+                                 _distance_aarect_aarect)
+AARectShape._near_than_by_kind = (_near_than_aarect_circle,
+                                  _near_than_aarect_aarect)
+
+
 ###### CollisionManager implementations #######################################
 
+def _sorted_by_segment_hit(objs, x0, y0, x1, y1):
+    # returns the objs touched by the segment, ordered by first contact
+    hits = []
+    for obj in objs:
+        t = obj.cshape.segment_hit(x0, y0, x1, y1)
+        if t is not None:
+            hits.append((t, obj))
+    hits.sort(key=op.itemgetter(0))
+    return [obj for t, obj in hits]
+
+
 
 class CollisionManagerBruteForce(object):
     """
@@ -479,6 +692,15 @@ class CollisionManagerBruteForce(object):
     def clear(self):
         self.objs.clear()
 
+    def update(self, obj):
+        # cshapes are read at query time, nothing to refresh
+        if obj not in self.objs:
+            raise KeyError(obj)
+
+    def update_many(self, objs):
+        for obj in objs:
+            self.update(obj)
+
     def they_collide(self, obj1, obj2):
         return obj1.cshape.overlaps(obj2.cshape)
 
@@ -561,6 +783,15 @@ class CollisionManagerBruteForce(object):
                 into.add(obj)
         return into
 
+    def knn(self, obj, k):
+        f_distance = obj.cshape.distance
+        tmp = [(other, f_distance(other.cshape)) for other in self.objs
+               if other is not obj]
+        return heapq.nsmallest(k, tmp, key=op.itemgetter(1))
+
+    def objs_on_segment(self, p0, p1):
+        return _sorted_by_segment_hit(self.objs, p0[0], p0[1], p1[0], p1[1])
+
 
 class CollisionManagerGrid(object):
     """
@@ -614,22 +845,48 @@ class CollisionManagerGrid(object):
         numbuckets = cols*rows
         # buckets maps cell identifier -> objs that potentially overlaps the cell
         self.buckets = [set() for k in range(numbuckets)]
+        # maps known obj -> cells range it was stored in, see _cells_range
+        self.obj_cells = {}
 
     def add(self, obj):
         # add to any bucket it overlaps
         # for the collision logic algorithm is fine if a number of buckets
         # that don't overlap are included; this allows to use a faster
         # 'buckets_for_objects' at the cost of potentially some extra buckets
-        for cell_idx in self._iter_cells_for_aabb(obj.cshape.minmax()):
+        cells_range = self._cells_range(obj.cshape.minmax())
+        self.obj_cells[obj] = cells_range
+        for cell_idx in self._iter_cells_in_range(cells_range):
             self.buckets[cell_idx].add(obj)
 
     def remove_tricky(self, obj):
-        for cell_idx in self._iter_cells_for_aabb(obj.cshape.minmax()):
+        cells_range = self.obj_cells.pop(obj)
+        for cell_idx in self._iter_cells_in_range(cells_range):
             self.buckets[cell_idx].remove(obj)
 
     def clear(self):
         for bucket in self.buckets:
             bucket.clear()
+        self.obj_cells.clear()
+
+    def update(self, obj):
+        old_range = self.obj_cells[obj]
+        new_range = self._cells_range(obj.cshape.minmax())
+        if new_range == old_range:
+            # same buckets, cshape is read at query time
+            return
+        buckets = self.buckets
+        old_cells = set(self._iter_cells_in_range(old_range))
+        new_cells = set(self._iter_cells_in_range(new_range))
+        for cell_idx in old_cells - new_cells:
+            buckets[cell_idx].remove(obj)
+        for cell_idx in new_cells - old_cells:
+            buckets[cell_idx].add(obj)
+        self.obj_cells[obj] = new_range
+
+    def update_many(self, objs):
+        update = self.update
+        for obj in objs:
+            update(obj)
 
     def they_collide(self, obj1, obj2):
         return obj1.cshape.overlaps(obj2.cshape)
@@ -735,16 +992,10 @@ class CollisionManagerGrid(object):
                             yield (obj, other)
 
     def knows(self, obj):
-        for bucket in self.buckets:
-            if obj in bucket:
-                return True
-        return False
+        return obj in self.obj_cells
 
     def known_objs(self):
-        objs = set()
-        for bucket in self.buckets:
-            objs |= bucket
-        return objs
+        return set(self.obj_cells)
 
     def objs_touching_point(self, x, y):
         touching = set()
@@ -764,13 +1015,151 @@ class CollisionManagerGrid(object):
                     into.add(obj)
         return into
 
+    def knn(self, obj, k):
+        if k <= 0:
+            return []
+        minx, maxx, miny, maxy = obj.cshape.minmax()
+        f_distance = obj.cshape.distance
+        cols = self.cols
+        rows = self.rows
+        cell_width = self.cell_width
+        cell_height = self.cell_height
+        ix = int(math.floor(((minx + maxx) * 0.5 - self.xmin) / cell_width))
+        iy = int(math.floor(((miny + maxy) * 0.5 - self.ymin) / cell_height))
+        ix = min(max(ix, 0), cols - 1)
+        iy = min(max(iy, 0), rows - 1)
+        last_ring = max(ix, cols - 1 - ix, iy, rows - 1 - iy)
+        inf = float('inf')
+
+        # examine rings of cells around the obj cell, stop when the k-th
+        # best distance is not bigger than the gap to the unexamined cells
+        seen = set([obj])
+        found = []
+        for ring in range(last_ring + 1):
+            for cell_id in self._iter_cells_in_ring(ix, iy, ring):
+                for other in self.buckets[cell_id]:
+                    if other not in seen:
+                        seen.add(other)
+                        found.append((other, f_distance(other.cshape)))
+            if len(found) < k:
+                continue
+            found = heapq.nsmallest(k, found, key=op.itemgetter(1))
+            # border cells also hold the objects outside the world
+            gaps = [inf]
+            if ix - ring > 0:
+                gaps.append(minx - (self.xmin + (ix - ring) * cell_width))
+            if ix + ring < cols - 1:
+                gaps.append(self.xmin + (ix + ring + 1) * cell_width - maxx)
+            if iy - ring > 0:
+                gaps.append(miny - (self.ymin + (iy - ring) * cell_height))
+            if iy + ring < rows - 1:
+                gaps.append(self.ymin + (iy + ring + 1) * cell_height - maxy)
+            if found[-1][1] <= min(gaps):
+                break
+        return heapq.nsmallest(k, found, key=op.itemgetter(1))
+
+    def objs_on_segment(self, p0, p1):
+        x0, y0, x1, y1 = p0[0], p0[1], p1[0], p1[1]
+        buckets = self.buckets
+        seen = set()
+        candidates = []
+        for cell_id in self._iter_cells_on_segment(x0, y0, x1, y1):
+            for obj in buckets[cell_id]:
+                if obj not in seen:
+                    seen.add(obj)
+                    candidates.append(obj)
+        return _sorted_by_segment_hit(candidates, x0, y0, x1, y1)
+
+    def _iter_cells_in_ring(self, ix, iy, ring):
+        # iterate the cells at chebyshev distance ring from cell (ix, iy)
+        cols = self.cols
+        rows = self.rows
+        if ring == 0:
+            yield ix + iy * cols
+            return
+        x_lo = ix - ring
+        x_hi = ix + ring
+        y_lo = iy - ring
+        y_hi = iy + ring
+        for x in range(max(x_lo, 0), min(x_hi, cols - 1) + 1):
+            if y_lo >= 0:
+                yield x + y_lo * cols
+            if y_hi < rows:
+                yield x + y_hi * cols
+        for y in range(max(y_lo + 1, 0), min(y_hi - 1, rows - 1) + 1):
+            if x_lo >= 0:
+                yield x_lo + y * cols
+            if x_hi < cols:
+                yield x_hi + y * cols
+
+    def _iter_cells_on_segment(self, x0, y0, x1, y1):
+        # iterate the cells crossed by the segment, in order from (x0, y0);
+        # walks the grid DDA style (Amanatides - Woo traversal)
+        clip = _clip_segment_to_box(x0, y0, x1, y1, self.xmin, self.xmax,
+                                    self.ymin, self.ymax)
+        if clip is None:
+            return
+        t_lo, t_hi = clip
+        cols = self.cols
+        rows = self.rows
+        cell_width = self.cell_width
+        cell_height = self.cell_height
+        dx = x1 - x0
+        dy = y1 - y0
+        ix = int(math.floor((x0 + t_lo * dx - self.xmin) / cell_width))
+        iy = int(math.floor((y0 + t_lo * dy - self.ymin) / cell_height))
+        ix = min(max(ix, 0), cols - 1)
+        iy = min(max(iy, 0), rows - 1)
+
+        inf = float('inf')
+        if dx > 0.0:
+            step_x = 1
+            t_max_x = (self.xmin + (ix + 1) * cell_width - x0) / dx
+            t_delta_x = cell_width / dx
+        elif dx < 0.0:
+            step_x = -1
+            t_max_x = (self.xmin + ix * cell_width - x0) / dx
+            t_delta_x = -cell_width / dx
+        else:
+            step_x = 0
+            t_max_x = t_delta_x = inf
+        if dy > 0.0:
+            step_y = 1
+            t_max_y = (self.ymin + (iy + 1) * cell_height - y0) / dy
+            t_delta_y = cell_height / dy
+        elif dy < 0.0:
+            step_y = -1
+            t_max_y = (self.ymin + iy * cell_height - y0) / dy
+            t_delta_y = -cell_height / dy
+        else:
+            step_y = 0
+            t_max_y = t_delta_y = inf
+
+        while 0 <= ix < cols and 0 <= iy < rows:
+            yield ix + iy * cols
+            if t_max_x < t_max_y:
+                if t_max_x > t_hi:
+                    break
+                ix += step_x
+                t_max_x += t_delta_x
+            else:
+                if t_max_y > t_hi:
+                    break
+                iy += step_y
+                t_max_y += t_delta_y
+
     def _iter_cells_for_aabb(self, aabb):
         # iterate all buckets overlapping the rectangle minmax
+        return self._iter_cells_in_range(self._cells_range(aabb))
+
+    def _cells_range(self, aabb):
+        # returns (ix_lo, ix_sup, iy_lo, iy_sup), the range of cell columns
+        # and rows overlapping the rectangle minmax
         minx, maxx, miny, maxy = aabb
         ix_lo = int(math.floor((minx - self.xmin) / self.cell_width))
-        ix_sup = int(math.ceil((maxx - self.xmin) / self.cell_width))
+        ix_sup = int(math.floor((maxx - self.xmin) / self.cell_width)) + 1
         iy_lo = int(math.floor((miny - self.ymin) / self.cell_height))
-        iy_sup = int(math.ceil((maxy - self.ymin) / self.cell_height))
+        iy_sup = int(math.floor((maxy - self.ymin) / self.cell_height)) + 1
 
         # but disregard cells ouside world, can come from near questions
         if ix_lo < 0:
@@ -781,9 +1170,1079 @@ class CollisionManagerGrid(object):
             iy_lo = 0
         if iy_sup > self.rows:
             iy_sup = self.rows
+        return ix_lo, ix_sup, iy_lo, iy_sup
 
+    def _iter_cells_in_range(self, cells_range):
+        ix_lo, ix_sup, iy_lo, iy_sup = cells_range
         for iy in range(iy_lo, iy_sup):
             contrib_y = iy * self.cols
             for ix in range(ix_lo, ix_sup):
                 cell_id = ix + contrib_y
                 yield cell_id
+
+
+class CollisionManagerSweepAndPrune(object):
+    """
+    Implements the CollisionManager interface based on the scheme known as
+    sweep and prune, or sort and sweep.
+
+    The AABB of each known object is kept in a list sorted by minimal x.
+    Objects can only overlap if their x extents overlap, so looking for
+    candidates only needs to walk a small window of the sorted list.
+
+    The list order is kept between frames: when the known objects move a bit
+    and are refreshed with 'update' or 'update_many' the list is nearly
+    sorted, and re-sorting it costs close to linear time.
+
+    Memory used depends only on the number of known objects, not on the
+    world size, which suits long, sparse worlds. It is not good when lots of
+    objects share the same x range, by example a tall column of stacked
+    objects.
+
+    Look at CollisionManager for other class and methods documentation.
+    """
+
+    def __init__(self):
+        # records are lists [minx, maxx, miny, maxy, obj]
+        self.records = {}
+        # records sorted by minx, and the minx values for bisect
+        self.sorted_records = []
+        self.mins = []
+        # max width of a known object AABB, bounds the lookup window
+        self.max_width = 0.0
+        self._dirty = False
+        self._removed = 0
+
+    def add(self, obj):
+        record = list(obj.cshape.minmax())
+        record.append(obj)
+        self.records[obj] = record
+        self.sorted_records.append(record)
+        self._dirty = True
+
+    def remove_tricky(self, obj):
+        # lazy removal, the record is discarded on the next re-sort
+        record = self.records.pop(obj)
+        record[4] = None
+        self._removed += 1
+        self._dirty = True
+
+    def clear(self):
+        self.records.clear()
+        self.sorted_records = []
+        self.mins = []
+        self.max_width = 0.0
+        self._dirty = False
+        self._removed = 0
+
+    def update(self, obj):
+        self.records[obj][:4] = obj.cshape.minmax()
+        self._dirty = True
+
+    def update_many(self, objs):
+        records = self.records
+        for obj in objs:
+            records[obj][:4] = obj.cshape.minmax()
+        self._dirty = True
+
+    def they_collide(self, obj1, obj2):
+        return obj1.cshape.overlaps(obj2.cshape)
+
+    def objs_colliding(self, obj):
+        f_overlaps = obj.cshape.overlaps
+        return [other for other in self._iter_candidates(obj.cshape.minmax())
+                if other is not obj and f_overlaps(other.cshape)]
+
+    def iter_colliding(self, obj):
+        f_overlaps = obj.cshape.overlaps
+        for other in self._iter_candidates(obj.cshape.minmax()):
+            if other is not obj and f_overlaps(other.cshape):
+                yield other
+
+    def any_near(self, obj, near_distance):
+        f_near_than = obj.cshape.near_than
+        for other in self._iter_candidates(obj.cshape.minmax(), near_distance):
+            if other is not obj and f_near_than(other.cshape, near_distance):
+                return other
+        return None
+
+    def objs_near(self, obj, near_distance):
+        f_near_than = obj.cshape.near_than
+        return [other for other in
+                self._iter_candidates(obj.cshape.minmax(), near_distance)
+                if other is not obj and f_near_than(other.cshape, near_distance)]
+
+    def objs_near_wdistance(self, obj, near_distance):
+        f_distance = obj.cshape.distance
+        res = []
+        for other in self._iter_candidates(obj.cshape.minmax(), near_distance):
+            if other is obj:
+                continue
+            d = f_distance(other.cshape)
+            if d <= near_distance:
+                res.append((other, d))
+        return res
+
+    def ranked_objs_near(self, obj, near_distance):
+        tmp = self.objs_near_wdistance(obj, near_distance)
+        tmp.sort(key=op.itemgetter(1))
+        return tmp
+
+    def iter_all_collisions(self):
+        self._sort()
+        # copy of the order, so the caller can add objects while iterating;
+        # objects removed while iterating are skipped, their record obj is
+        # None. Updates done while iterating may or may not be seen.
+        sorted_records = list(self.sorted_records)
+        n = len(sorted_records)
+        for i, record in enumerate(sorted_records):
+            minx, maxx, miny, maxy, obj = record
+            if obj is None:
+                continue
+            f_overlaps = obj.cshape.overlaps
+            for j in range(i + 1, n):
+                other_record = sorted_records[j]
+                if other_record[0] > maxx:
+                    # sorted by minx, no further record can overlap
+                    break
+                if other_record[2] > maxy or other_record[3] < miny:
+                    continue
+                other = other_record[4]
+                if other is None:
+                    continue
+                if f_overlaps(other.cshape):
+                    yield (obj, other)
+                    if record[4] is None:
+                        break
+
+    def knows(self, obj):
+        return obj in self.records
+
+    def known_objs(self):
+        return set(self.records)
+
+    def objs_touching_point(self, x, y):
+        touching = set()
+        for obj in self._iter_candidates((x, x, y, y)):
+            if obj.cshape.touches_point(x, y):
+                touching.add(obj)
+        return touching
+
+    def objs_into_box(self, minx, maxx, miny, maxy):
+        into = set()
+        packed_box = (minx, maxx, miny, maxy)
+        for obj in self._iter_candidates(packed_box):
+            if obj.cshape.fits_in_box(packed_box):
+                into.add(obj)
+        return into
+
+    def knn(self, obj, k):
+        if k <= 0:
+            return []
+        self._sort()
+        minx, maxx, miny, maxy = obj.cshape.minmax()
+        f_distance = obj.cshape.distance
+        sorted_records = self.sorted_records
+        max_width = self.max_width
+        n = len(sorted_records)
+        inf = float('inf')
+        # walk the sorted list outwards from obj, always to the side with the
+        # smallest x gap, until the k-th best distance is not bigger than the
+        # gap to the unexamined records
+        right = bisect.bisect_left(self.mins, minx)
+        left = right - 1
+        heap = []
+        while left >= 0 or right < n:
+            if right < n:
+                gap_right = sorted_records[right][0] - maxx
+            else:
+                gap_right = inf
+            if left >= 0:
+                gap_left = minx - (sorted_records[left][0] + max_width)
+            else:
+                gap_left = inf
+            gap = min(gap_left, gap_right)
+            if len(heap) == k and -heap[0][0] <= gap:
+                break
+            if gap_right <= gap_left:
+                other = sorted_records[right][4]
+                right += 1
+            else:
+                other = sorted_records[left][4]
+                left -= 1
+            if other is obj:
+                continue
+            d = f_distance(other.cshape)
+            if len(heap) < k:
+                heapq.heappush(heap, (-d, id(other), other))
+            elif d < -heap[0][0]:
+                heapq.heapreplace(heap, (-d, id(other), other))
+        res = [(other, -d) for d, i, other in heap]
+        res.sort(key=op.itemgetter(1))
+        return res
+
+    def objs_on_segment(self, p0, p1):
+        x0, y0, x1, y1 = p0[0], p0[1], p1[0], p1[1]
+        aabb = (min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1))
+        return _sorted_by_segment_hit(self._iter_candidates(aabb),
+                                      x0, y0, x1, y1)
+
+    def _sort(self):
+        # restores the order after add / remove / update; python sort is
+        # adaptive, so a nearly sorted list is sorted in about linear time
+        if not self._dirty:
+            return
+        sorted_records = self.sorted_records
+        if self._removed:
+            sorted_records = [record for record in sorted_records
+                              if record[4] is not None]
+            self.sorted_records = sorted_records
+            self._removed = 0
+        sorted_records.sort(key=op.itemgetter(0))
+        self.mins = [record[0] for record in sorted_records]
+        if sorted_records:
+            self.max_width = max([record[1] - record[0]
+                                  for record in sorted_records])
+        else:
+            self.max_width = 0.0
+        self._dirty = False
+
+    def _iter_candidates(self, aabb, inflate=0.0):
+        # iterate known objects whose AABB overlaps the rectangle aabb
+        # inflated by inflate
+        self._sort()
+        minx, maxx, miny, maxy = aabb
+        minx -= inflate
+        maxx += inflate
+        miny -= inflate
+        maxy += inflate
+        sorted_records = self.sorted_records
+        lo = bisect.bisect_left(self.mins, minx - self.max_width)
+        hi = bisect.bisect_right(self.mins, maxx)
+        for i in range(lo, hi):
+            record = sorted_records[i]
+            if record[1] >= minx and record[2] <= maxy and record[3] >= miny:
+                yield record[4]
+
+
+class CollisionManagerHierarchicalGrid(object):
+    """
+    Implements the CollisionManager interface with a stack of loose grids,
+    also known as a hierarchical spatial hash; it behaves much like a loose
+    quadtree.
+
+    Level k divides the space in square cells with side
+    min_cell_side * 2**k. Each object is stored in only one cell: the cell
+    containing the center of its AABB, at the finest level whose cell side
+    is not smaller than the object AABB width and height.
+    An object can then stick out of its cell at most half a cell side, so
+    questions only need to look at a known margin around the cells they
+    overlap, at each level.
+
+    Because the level is chosen per object, there is no cell size to tune:
+    bullets and bosses are both stored in a cell fitting their size.
+    Cells and levels are created on demand, so memory depends on the number
+    of known objects and not on the world size.
+
+    Look at CollisionManager for other class and methods documentation.
+    """
+
+    def __init__(self, min_cell_side=8.0):
+        """
+        :Parameters:
+            `min_cell_side` : float
+                side for the cells at the finest level; objects not bigger
+                than this go all to the finest level.
+        """
+        self.min_cell_side = min_cell_side
+        # levels maps level number -> {(ix, iy): objs in cell}
+        self.levels = {}
+        # maps known obj -> (level, (ix, iy))
+        self.obj_cells = {}
+
+    def add(self, obj):
+        level, cell = self._cell_for_aabb(obj.cshape.minmax())
+        self.obj_cells[obj] = (level, cell)
+        buckets = self.levels.setdefault(level, {})
+        bucket = buckets.get(cell)
+        if bucket is None:
+            bucket = buckets[cell] = set()
+        bucket.add(obj)
+
+    def remove_tricky(self, obj):
+        level, cell = self.obj_cells.pop(obj)
+        self._discard(obj, level, cell)
+
+    def clear(self):
+        self.levels.clear()
+        self.obj_cells.clear()
+
+    def update(self, obj):
+        old_level, old_cell = self.obj_cells[obj]
+        level, cell = self._cell_for_aabb(obj.cshape.minmax())
+        if level == old_level and cell == old_cell:
+            return
+        self._discard(obj, old_level, old_cell)
+        self.add(obj)
+
+    def update_many(self, objs):
+        update = self.update
+        for obj in objs:
+            update(obj)
+
+    def they_collide(self, obj1, obj2):
+        return obj1.cshape.overlaps(obj2.cshape)
+
+    def objs_colliding(self, obj):
+        f_overlaps = obj.cshape.overlaps
+        return [other for other in self._iter_candidates(obj.cshape.minmax())
+                if other is not obj and f_overlaps(other.cshape)]
+
+    def iter_colliding(self, obj):
+        f_overlaps = obj.cshape.overlaps
+        for other in self._iter_candidates(obj.cshape.minmax()):
+            if other is not obj and f_overlaps(other.cshape):
+                yield other
+
+    def any_near(self, obj, near_distance):
+        f_near_than = obj.cshape.near_than
+        for other in self._iter_candidates(obj.cshape.minmax(), near_distance):
+            if other is not obj and f_near_than(other.cshape, near_distance):
+                return other
+        return None
+
+    def objs_near(self, obj, near_distance):
+        f_near_than = obj.cshape.near_than
+        return [other for other in
+                self._iter_candidates(obj.cshape.minmax(), near_distance)
+                if other is not obj and f_near_than(other.cshape, near_distance)]
+
+    def objs_near_wdistance(self, obj, near_distance):
+        f_distance = obj.cshape.distance
+        res = []
+        for other in self._iter_candidates(obj.cshape.minmax(), near_distance):
+            if other is obj:
+                continue
+            d = f_distance(other.cshape)
+            if d <= near_distance:
+                res.append((other, d))
+        return res
+
+    def ranked_objs_near(self, obj, near_distance):
+        tmp = self.objs_near_wdistance(obj, near_distance)
+        tmp.sort(key=op.itemgetter(1))
+        return tmp
+
+    def iter_all_collisions(self):
+        # objects in the same level can only collide if they are in the same
+        # or adjacent cells; for objects in different levels the one in the
+        # finer level asks the coarser levels.
+        levels = sorted(self.levels)
+        for idx, level in enumerate(levels):
+            buckets = self.levels[level]
+            coarser = levels[idx + 1:]
+            for (ix, iy), bucket in list(buckets.items()):
+                objs = list(bucket)
+                for i, obj in enumerate(objs):
+                    f_overlaps = obj.cshape.overlaps
+                    for other in objs[i + 1:]:
+                        if f_overlaps(other.cshape):
+                            yield (obj, other)
+                    for neighbour in ((ix + 1, iy - 1), (ix + 1, iy),
+                                      (ix + 1, iy + 1), (ix, iy + 1)):
+                        other_bucket = buckets.get(neighbour)
+                        if not other_bucket:
+                            continue
+                        for other in other_bucket:
+                            if f_overlaps(other.cshape):
+                                yield (obj, other)
+                    if coarser:
+                        aabb = obj.cshape.minmax()
+                        for coarse_level in coarser:
+                            for other in self._iter_level_candidates(
+                                                        coarse_level, aabb):
+                                if f_overlaps(other.cshape):
+                                    yield (obj, other)
+
+    def knows(self, obj):
+        return obj in self.obj_cells
+
+    def known_objs(self):
+        return set(self.obj_cells)
+
+    def objs_touching_point(self, x, y):
+        touching = set()
+        for obj in self._iter_candidates((x, x, y, y)):
+            if obj.cshape.touches_point(x, y):
+                touching.add(obj)
+        return touching
+
+    def objs_into_box(self, minx, maxx, miny, maxy):
+        into = set()
+        packed_box = (minx, maxx, miny, maxy)
+        for obj in self._iter_candidates(packed_box):
+            if obj.cshape.fits_in_box(packed_box):
+                into.add(obj)
+        return into
+
+    def knn(self, obj, k):
+        if k <= 0:
+            return []
+        aabb = obj.cshape.minmax()
+        f_distance = obj.cshape.distance
+        num_others = len(self.obj_cells)
+        if obj in self.obj_cells:
+            num_others -= 1
+        # look in a box around obj that doubles each round, until the k-th
+        # best distance is not bigger than the margin to the box
+        seen = set([obj])
+        found = []
+        margin = self.min_cell_side
+        while len(seen) <= num_others:
+            for other in self._iter_candidates(aabb, margin):
+                if other not in seen:
+                    seen.add(other)
+                    found.append((other, f_distance(other.cshape)))
+            if len(found) >= k:
+                found = heapq.nsmallest(k, found, key=op.itemgetter(1))
+                if found[-1][1] <= margin:
+                    break
+            margin *= 2.0
+        return heapq.nsmallest(k, found, key=op.itemgetter(1))
+
+    def objs_on_segment(self, p0, p1):
+        x0, y0, x1, y1 = p0[0], p0[1], p1[0], p1[1]
+        aabb = (min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1))
+        return _sorted_by_segment_hit(self._iter_candidates(aabb),
+                                      x0, y0, x1, y1)
+
+    def _cell_for_aabb(self, aabb):
+        # returns (level, (ix, iy)), where an object with that AABB is stored
+        minx, maxx, miny, maxy = aabb
+        size = max(maxx - minx, maxy - miny)
+        level = 0
+        side = self.min_cell_side
+        while side < size:
+            level += 1
+            side *= 2.0
+        ix = int(math.floor((minx + maxx) * 0.5 / side))
+        iy = int(math.floor((miny + maxy) * 0.5 / side))
+        return level, (ix, iy)
+
+    def _discard(self, obj, level, cell):
+        buckets = self.levels[level]
+        bucket = buckets[cell]
+        bucket.remove(obj)
+        if not bucket:
+            del buckets[cell]
+            if not buckets:
+                del self.levels[level]
+
+    def _iter_candidates(self, aabb, inflate=0.0):
+        # iterate known objects that potentially overlaps the rectangle
+        # aabb inflated by inflate
+        if inflate:
+            minx, maxx, miny, maxy = aabb
+            aabb = (minx - inflate, maxx + inflate,
+                    miny - inflate, maxy + inflate)
+        for level in list(self.levels):
+            for obj in self._iter_level_candidates(level, aabb):
+                yield obj
+
+    def _iter_level_candidates(self, level, aabb):
+        # iterate the objects stored at level in cells that can overlap aabb;
+        # objects stick out of their cell at most half a cell side
+        buckets = self.levels.get(level)
+        if not buckets:
+            return
+        side = self.min_cell_side * 2 ** level
+        half = side * 0.5
+        minx, maxx, miny, maxy = aabb
+        ix_lo = int(math.floor((minx - half) / side))
+        ix_hi = int(math.floor((maxx + half) / side))
+        iy_lo = int(math.floor((miny - half) / side))
+        iy_hi = int(math.floor((maxy + half) / side))
+        if (ix_hi - ix_lo + 1) * (iy_hi - iy_lo + 1) > len(buckets):
+            # big area, cheaper to look at the non empty cells
+            for (ix, iy), bucket in list(buckets.items()):
+                if ix_lo <= ix <= ix_hi and iy_lo <= iy <= iy_hi:
+                    for obj in bucket:
+                        yield obj
+            return
+        for iy in range(iy_lo, iy_hi + 1):
+            for ix in range(ix_lo, ix_hi + 1):
+                bucket = buckets.get((ix, iy))
+                if bucket:
+                    for obj in bucket:
+                        yield obj
+
+
+def _np_gaps(dx, dy, rx_a, ry_a, circle_a, rx_b, ry_b, circle_b):
+    # vectorized distances for pairs of shapes a, b where the b center is at
+    # offset (dx, dy) from the a center; circles store the radius as rx, ry.
+    # Returns (circle_gap, rect_gap, both_rects):
+    #    circle_gap: euclidean gap, meaningful if some shape is a circle
+    #    rect_gap: max-min gap, meaningful if both shapes are rectangles
+    #    both_rects: True where both shapes are rectangles
+    # negative gaps mean overlap
+    adx = numpy.abs(dx)
+    ady = numpy.abs(dy)
+    only_a = circle_a & ~circle_b
+    only_b = circle_b & ~circle_a
+    # rectangle extents in circle - rectangle pairs, zero otherwise
+    ex = numpy.where(only_a, rx_b, 0.0) + numpy.where(only_b, rx_a, 0.0)
+    ey = numpy.where(only_a, ry_b, 0.0) + numpy.where(only_b, ry_a, 0.0)
+    r = numpy.where(circle_a, rx_a, 0.0) + numpy.where(circle_b, rx_b, 0.0)
+    gx = numpy.maximum(adx - ex, 0.0)
+    gy = numpy.maximum(ady - ey, 0.0)
+    circle_gap = numpy.sqrt(gx * gx + gy * gy) - r
+    rect_gap = numpy.maximum(adx - rx_a - rx_b, ady - ry_a - ry_b)
+    both_rects = ~(circle_a | circle_b)
+    return circle_gap, rect_gap, both_rects
+
+
+# automatic cell sides for CollisionManagerNumpy fit this percentile of the
+# objects sizes
+_CELL_PERCENTILE = 90.0
+
+
+class CollisionManagerNumpy(object):
+    """
+    Implements the CollisionManager interface keeping the geometry of the
+    known objects in numpy arrays, so questions are answered with a few
+    vectorized operations instead of python loops over candidates.
+
+    For iter_all_collisions the broad phase hashes each object center into a
+    grid cell, sorts the objects by cell key and only pairs objects in the
+    same or adjacent cells. Cells fit most of the known objects, so a single
+    cell per object is enough, and no storage is allocated for empty cells.
+    The few objects bigger than a cell are kept out of the grid, and paired
+    with the objects in the cells around them, like the upper levels of
+    CollisionManagerHierarchicalGrid.
+
+    The other questions do a vectorized brute force over all known objects.
+
+    CircleShape and AARectShape cshapes can be mixed; when all the shapes
+    involved are of the same class a faster path is used.
+
+    Requires numpy.
+
+    Look at CollisionManager for other class and methods documentation.
+    """
+
+    def __init__(self, cell_width=None, cell_height=None, workers=1):
+        """
+        When cell_width or cell_height are None, or smaller than most of the
+        known objects, the cell side will be automatically set to fit 90% of
+        the known objects along that axis; a single big object does not
+        make the cells big.
+
+        With workers > 1 iter_all_collisions splits the world in vertical
+        stripes and resolves the pairs of each stripe in a pool of threads;
+        numpy releases the GIL while working on arrays, so stripes run in
+        parallel. Each pair is owned by a single cell, hence there are no
+        duplicates across stripe borders, and the stripes results are joined
+        in order so the output does not depend on threads timing nor on the
+        number of workers (the single worker path yields the same pairs, in
+        another order). Call close() when done to release the threads.
+        Useful for big simulations, by example a headless server.
+
+        :Parameters:
+            `cell_width` : float
+                minimal width for the rectangles the space will be broken
+            `cell_height` : float
+                minimal height for the rectangles the space will be broken
+            `workers` : int
+                number of threads used by iter_all_collisions
+        """
+        if numpy is None:
+            raise ImportError("CollisionManagerNumpy needs numpy")
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.workers = max(1, int(workers))
+        # thread pool, created on first use
+        self._pool = None
+        # objs[i] is the known object with geometry geoms[i], a tuple
+        # (center_x, center_y, half_width, half_height, is_circle)
+        self.objs = []
+        self.geoms = []
+        self.slots = {}
+        # numpy arrays with geoms, rebuilt lazily after add / remove
+        self._arr = None
+        self._circles = None
+        self._num_circles = 0
+
+    def add(self, obj):
+        cshape = obj.cshape
+        self.slots[obj] = len(self.objs)
+        self.objs.append(obj)
+        self.geoms.append(self._geom(cshape))
+        self._arr = None
+
+    def remove_tricky(self, obj):
+        # swap-remove; the stored geometry is used, so here it is not tricky
+        idx = self.slots.pop(obj)
+        last = self.objs.pop()
+        last_geom = self.geoms.pop()
+        if idx < len(self.objs):
+            self.objs[idx] = last
+            self.geoms[idx] = last_geom
+            self.slots[last] = idx
+        self._arr = None
+
+    def clear(self):
+        self.objs = []
+        self.geoms = []
+        self.slots = {}
+        self._arr = None
+
+    def update(self, obj):
+        self.geoms[self.slots[obj]] = self._geom(obj.cshape)
+        self._arr = None
+
+    def update_many(self, objs):
+        geoms = self.geoms
+        slots = self.slots
+        fn_geom = self._geom
+        for obj in objs:
+            geoms[slots[obj]] = fn_geom(obj.cshape)
+        self._arr = None
+
+    def they_collide(self, obj1, obj2):
+        return obj1.cshape.overlaps(obj2.cshape)
+
+    def objs_colliding(self, obj):
+        return self._select(obj, self._mask_overlaps(obj))
+
+    def iter_colliding(self, obj):
+        for other in self.objs_colliding(obj):
+            yield other
+
+    def any_near(self, obj, near_distance):
+        res = self._select(obj, self._mask_near(obj, near_distance))
+        if res:
+            return res[0]
+        return None
+
+    def objs_near(self, obj, near_distance):
+        return self._select(obj, self._mask_near(obj, near_distance))
+
+    def objs_near_wdistance(self, obj, near_distance):
+        arr = self._arrays()
+        if arr is None:
+            return []
+        d = self._distances(obj, arr)
+        mask = d <= near_distance
+        self._exclude(obj, mask)
+        objs = self.objs
+        return [(objs[k], float(d[k])) for k in mask.nonzero()[0]]
+
+    def ranked_objs_near(self, obj, near_distance):
+        tmp = self.objs_near_wdistance(obj, near_distance)
+        tmp.sort(key=op.itemgetter(1))
+        return tmp
+
+    def iter_all_collisions(self):
+        ii, jj = self._colliding_pairs()
+        get = self.objs.__getitem__
+        for pair in zip(map(get, ii.tolist()), map(get, jj.tolist())):
+            yield pair
+
+    def knows(self, obj):
+        return obj in self.slots
+
+    def known_objs(self):
+        return set(self.objs)
+
+    def objs_touching_point(self, x, y):
+        arr = self._arrays()
+        if arr is None:
+            return set()
+        dx = arr[:, 0] - x
+        dy = arr[:, 1] - y
+        mask = numpy.where(self._circles,
+                           dx * dx + dy * dy <= arr[:, 2] * arr[:, 2],
+                           (numpy.abs(dx) < arr[:, 2]) &
+                           (numpy.abs(dy) < arr[:, 3]))
+        objs = self.objs
+        return set(objs[k] for k in mask.nonzero()[0])
+
+    def objs_into_box(self, minx, maxx, miny, maxy):
+        arr = self._arrays()
+        if arr is None:
+            return set()
+        cx, cy, rx, ry = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+        mask = ((minx + rx <= cx) & (cx <= maxx - rx) &
+                (miny + ry <= cy) & (cy <= maxy - ry))
+        objs = self.objs
+        return set(objs[k] for k in mask.nonzero()[0])
+
+    def knn(self, obj, k):
+        arr = self._arrays()
+        if arr is None or k <= 0:
+            return []
+        d = self._distances(obj, arr)
+        idx = self.slots.get(obj)
+        n = len(d)
+        if idx is not None:
+            d[idx] = numpy.inf
+            n -= 1
+        k = min(k, n)
+        if k <= 0:
+            return []
+        nearest = numpy.argpartition(d, k - 1)[:k]
+        nearest = nearest[numpy.argsort(d[nearest], kind='mergesort')]
+        objs = self.objs
+        return [(objs[i], float(d[i])) for i in nearest]
+
+    def objs_on_segment(self, p0, p1):
+        arr = self._arrays()
+        if arr is None:
+            return []
+        x0, y0, x1, y1 = p0[0], p0[1], p1[0], p1[1]
+        t = self._segment_hits(arr, x0, y0, x1, y1)
+        hits = numpy.isfinite(t).nonzero()[0]
+        hits = hits[numpy.argsort(t[hits], kind='mergesort')]
+        objs = self.objs
+        return [objs[i] for i in hits]
+
+    def _geom(self, cshape):
+        center = cshape.center
+        # as in the cshapes, a shape without 'kind' is duck typed: a circle
+        # if it has a radius, else an axis aligned rectangle
+        kind = getattr(cshape, 'kind', None)
+        if kind is None:
+            if hasattr(cshape, 'r'):
+                kind = CircleShape.kind
+            else:
+                kind = AARectShape.kind
+        if kind == CircleShape.kind:
+            return (center[0], center[1], cshape.r, cshape.r, 1.0)
+        return (center[0], center[1], cshape.rx, cshape.ry, 0.0)
+
+    def _arrays(self):
+        # returns the (n, 5) array of known geometries, None if no objects
+        if self._arr is None and self.geoms:
+            self._arr = numpy.array(self.geoms, dtype=numpy.float64)
+            self._circles = self._arr[:, 4] > 0.5
+            self._num_circles = int(self._circles.sum())
+        return self._arr
+
+    def _same_kind(self, is_circle):
+        # True if all known shapes have the kind given by is_circle
+        if is_circle:
+            return self._num_circles == len(self.objs)
+        return self._num_circles == 0
+
+    def _exclude(self, obj, mask):
+        idx = self.slots.get(obj)
+        if idx is not None:
+            mask[idx] = False
+
+    def _select(self, obj, mask):
+        if mask is None:
+            return []
+        self._exclude(obj, mask)
+        objs = self.objs
+        return [objs[k] for k in mask.nonzero()[0]]
+
+    def _query_gaps(self, obj, arr):
+        # returns (rx, ry, is_circle) for obj and the offsets (dx, dy) from
+        # obj center to the known objects centers
+        geom = self._geom(obj.cshape)
+        dx = arr[:, 0] - geom[0]
+        dy = arr[:, 1] - geom[1]
+        return geom[2], geom[3], geom[4] > 0.5, dx, dy
+
+    def _mask_overlaps(self, obj):
+        arr = self._arrays()
+        if arr is None:
+            return None
+        rx, ry, is_circle, dx, dy = self._query_gaps(obj, arr)
+        if self._same_kind(is_circle):
+            if is_circle:
+                rr = arr[:, 2] + rx
+                return dx * dx + dy * dy < rr * rr
+            return ((numpy.abs(dx) < arr[:, 2] + rx) &
+                    (numpy.abs(dy) < arr[:, 3] + ry))
+        circle_gap, rect_gap, both_rects = _np_gaps(
+            dx, dy, arr[:, 2], arr[:, 3], self._circles,
+            rx, ry, numpy.bool_(is_circle))
+        return numpy.where(both_rects, rect_gap < 0.0, circle_gap < 0.0)
+
+    def _mask_near(self, obj, near_distance):
+        arr = self._arrays()
+        if arr is None:
+            return None
+        rx, ry, is_circle, dx, dy = self._query_gaps(obj, arr)
+        if self._same_kind(is_circle):
+            if is_circle:
+                rr = arr[:, 2] + rx + near_distance
+                return dx * dx + dy * dy <= rr * rr
+            return ((numpy.abs(dx) - arr[:, 2] - rx < near_distance) &
+                    (numpy.abs(dy) - arr[:, 3] - ry < near_distance))
+        circle_gap, rect_gap, both_rects = _np_gaps(
+            dx, dy, arr[:, 2], arr[:, 3], self._circles,
+            rx, ry, numpy.bool_(is_circle))
+        return numpy.where(both_rects, rect_gap < near_distance,
+                           circle_gap <= near_distance)
+
+    def _distances(self, obj, arr):
+        rx, ry, is_circle, dx, dy = self._query_gaps(obj, arr)
+        circle_gap, rect_gap, both_rects = _np_gaps(
+            dx, dy, arr[:, 2], arr[:, 3], self._circles,
+            rx, ry, numpy.bool_(is_circle))
+        return numpy.maximum(numpy.where(both_rects, rect_gap, circle_gap),
+                             0.0)
+
+    def _segment_hits(self, arr, x0, y0, x1, y1):
+        # vectorized Cshape.segment_hit, misses are inf
+        cx, cy, rx, ry = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+        dx = x1 - x0
+        dy = y1 - y0
+        inf = numpy.inf
+        # circles
+        fx = x0 - cx
+        fy = y0 - cy
+        c = fx * fx + fy * fy - rx * rx
+        a = dx * dx + dy * dy
+        b = 2.0 * (fx * dx + fy * dy)
+        disc = b * b - 4.0 * a * c
+        if a > 0.0:
+            t_circle = (-b - numpy.sqrt(numpy.maximum(disc, 0.0))) / (2.0 * a)
+            t_circle[(disc < 0.0) | (t_circle < 0.0) | (t_circle > 1.0)] = inf
+        else:
+            t_circle = numpy.empty(len(cx))
+            t_circle.fill(inf)
+        t_circle[c <= 0.0] = 0.0
+        # rects, slabs test
+        t_lo = numpy.zeros(len(cx))
+        t_hi = numpy.ones(len(cx))
+        for p0, d, center, r in ((x0, dx, cx, rx), (y0, dy, cy, ry)):
+            if d == 0.0:
+                outside = (p0 < center - r) | (p0 > center + r)
+                t_lo[outside] = inf
+                continue
+            ta = (center - r - p0) / d
+            tb = (center + r - p0) / d
+            t_lo = numpy.maximum(t_lo, numpy.minimum(ta, tb))
+            t_hi = numpy.minimum(t_hi, numpy.maximum(ta, tb))
+        t_rect = numpy.where(t_lo <= t_hi, t_lo, inf)
+        return numpy.where(self._circles, t_circle, t_rect)
+
+    def _cell_sides(self, arr):
+        # cell sides fit to most of the objects: a single very big object
+        # must not make the cells so big that all the objects share a few
+        # of them. Objects bigger than a cell are paired by _big_pairs
+        cell_width = 2.0 * numpy.percentile(arr[:, 2], _CELL_PERCENTILE)
+        if self.cell_width is not None and self.cell_width > cell_width:
+            cell_width = self.cell_width
+        cell_height = 2.0 * numpy.percentile(arr[:, 3], _CELL_PERCENTILE)
+        if self.cell_height is not None and self.cell_height > cell_height:
+            cell_height = self.cell_height
+        if cell_width <= 0.0:
+            cell_width = 1.0
+        if cell_height <= 0.0:
+            cell_height = 1.0
+        return cell_width, cell_height
+
+    def _cell_keys(self, arr, cell_width, cell_height):
+        # hashes each object center into a cell; returns (keys, stride)
+        # where the neighbour (dx, dy) of the cell with key k has key
+        # k + dx * stride + dy, and neighbours keys are non negative
+        ix = numpy.floor(arr[:, 0] / cell_width).astype(numpy.int64)
+        iy = numpy.floor(arr[:, 1] / cell_height).astype(numpy.int64)
+        ix -= ix.min() - 1
+        iy -= iy.min() - 1
+        stride = int(iy.max()) + 2
+        return ix * stride + iy, stride
+
+    def _sorted_cells(self, arr, cell_width, cell_height):
+        # sorts the objects by cell key. Returns (order, cells, starts,
+        # counts, stride, sorted_arr) where objects
+        # order[starts[c]:starts[c] + counts[c]] are in the cell with key
+        # cells[c], and sorted_arr is arr[order] by columns
+        keys, stride = self._cell_keys(arr, cell_width, cell_height)
+        order = numpy.argsort(keys, kind='mergesort')
+        cells, starts, counts = numpy.unique(keys[order], return_index=True,
+                                             return_counts=True)
+        # geometry sorted by cell, better locality for the narrow phase
+        sorted_arr = numpy.ascontiguousarray(arr[order].T)
+        return order, cells, starts, counts, stride, sorted_arr
+
+    def _overlapping(self, columns, ii, jj):
+        # narrow phase, mask of the pairs (ii[k], jj[k]) that overlap;
+        # columns are the geometry columns cx, cy, rx, ry, circle
+        cx, cy, rx, ry, circle = columns
+        dx = cx[ii] - cx[jj]
+        dy = cy[ii] - cy[jj]
+        if self._same_kind(True):
+            rr = rx[ii] + rx[jj]
+            return dx * dx + dy * dy < rr * rr
+        if self._same_kind(False):
+            return ((numpy.abs(dx) < rx[ii] + rx[jj]) &
+                    (numpy.abs(dy) < ry[ii] + ry[jj]))
+        circle = circle > 0.5
+        circle_gap, rect_gap, both_rects = _np_gaps(
+            dx, dy, rx[ii], ry[ii], circle[ii], rx[jj], ry[jj], circle[jj])
+        return numpy.where(both_rects, rect_gap < 0.0, circle_gap < 0.0)
+
+    def _stripe_pairs(self, sorted_cells, c_lo, c_hi, by_first=False):
+        # returns (ii, jj), positions in the sorted order of the colliding
+        # pairs owned by cells[c_lo:c_hi]. A pair is owned by the cell of
+        # its first object: the same cell or the half of the neighbours
+        # below, so each unordered pair is produced by exactly one cell.
+        # With by_first the pairs are sorted by the first object.
+        order, cells, starts, counts, stride, sorted_arr = sorted_cells
+        num_cells = len(cells)
+        own_cells = numpy.arange(c_lo, c_hi)
+
+        ii_parts = []
+        jj_parts = []
+        for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+            if dx == 0 and dy == 0:
+                ca = cb = own_cells
+            else:
+                target = cells[c_lo:c_hi] + (dx * stride + dy)
+                pos = numpy.searchsorted(cells, target)
+                pos[pos == num_cells] = 0
+                found = cells[pos] == target
+                ca = own_cells[found]
+                cb = pos[found]
+            if len(ca) == 0:
+                continue
+            na = counts[ca]
+            nb = counts[cb]
+            sizes = na * nb
+            total = int(sizes.sum())
+            group = numpy.repeat(numpy.arange(len(ca)), sizes)
+            offsets = numpy.cumsum(sizes) - sizes
+            local = numpy.arange(total) - offsets[group]
+            nb_group = nb[group]
+            ia = local // nb_group
+            ib = local - ia * nb_group
+            if dx == 0 and dy == 0:
+                keep = ia < ib
+                ia = ia[keep]
+                ib = ib[keep]
+                group = group[keep]
+            ii_parts.append(starts[ca][group] + ia)
+            jj_parts.append(starts[cb][group] + ib)
+        if not ii_parts:
+            empty = numpy.zeros(0, dtype=numpy.int64)
+            return empty, empty
+        ii = numpy.concatenate(ii_parts)
+        jj = numpy.concatenate(jj_parts)
+
+        mask = self._overlapping(sorted_arr, ii, jj)
+        ii = ii[mask]
+        jj = jj[mask]
+        if not by_first:
+            return ii, jj
+        # stable order by first object, so joining stripes in order gives
+        # the same output for any number of workers
+        first_order = numpy.argsort(ii, kind='mergesort')
+        return ii[first_order], jj[first_order]
+
+    def _stripes(self, counts):
+        # splits the sorted cells in self.workers contiguous ranges with
+        # about the same number of candidate pairs; cells are sorted by
+        # column first, so each range is a vertical stripe of the world
+        work = numpy.cumsum(counts * counts)
+        bounds = numpy.searchsorted(
+            work, work[-1] * numpy.arange(1, self.workers) / self.workers)
+        bounds = [0] + [int(b) for b in bounds] + [len(counts)]
+        return [(bounds[k], bounds[k + 1]) for k in range(self.workers)
+                if bounds[k] < bounds[k + 1]]
+
+    def _big_pairs(self, arr, big):
+        # returns (ii, jj), indexes in arr of the colliding pairs with a big
+        # object. All the objects are hashed in cells as big as the biggest
+        # one, and only the cells around each big object are looked at, so
+        # the cost grows with the number of big objects, not with the
+        # square of all the objects
+        cell_width = max(2.0 * arr[:, 2].max(), 1.0)
+        cell_height = max(2.0 * arr[:, 3].max(), 1.0)
+        keys, stride = self._cell_keys(arr, cell_width, cell_height)
+        order = numpy.argsort(keys, kind='mergesort')
+        sorted_keys = keys[order]
+        big_idx = big.nonzero()[0]
+        ii_parts = []
+        jj_parts = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                target = keys[big_idx] + (dx * stride + dy)
+                lo = numpy.searchsorted(sorted_keys, target, 'left')
+                sizes = numpy.searchsorted(sorted_keys, target, 'right') - lo
+                total = int(sizes.sum())
+                if total == 0:
+                    continue
+                group = numpy.repeat(numpy.arange(len(big_idx)), sizes)
+                offsets = numpy.cumsum(sizes) - sizes
+                local = numpy.arange(total) - offsets[group]
+                ii_parts.append(big_idx[group])
+                jj_parts.append(order[lo[group] + local])
+        if not ii_parts:
+            empty = numpy.zeros(0, dtype=numpy.int64)
+            return empty, empty
+        ii = numpy.concatenate(ii_parts)
+        jj = numpy.concatenate(jj_parts)
+        # a pair of big objects is seen from both, keep it once
+        keep = (ii != jj) & (~big[jj] | (ii < jj))
+        ii = ii[keep]
+        jj = jj[keep]
+        mask = self._overlapping(arr.T, ii, jj)
+        return ii[mask], jj[mask]
+
+    def _colliding_pairs(self):
+        arr = self._arrays()
+        if arr is None or len(arr) < 2:
+            empty = numpy.zeros(0, dtype=numpy.int64)
+            return empty, empty
+        cell_width, cell_height = self._cell_sides(arr)
+        big = (2.0 * arr[:, 2] > cell_width) | (2.0 * arr[:, 3] > cell_height)
+        if big.any():
+            # the grid only holds the objects fitting in a cell
+            small_idx = (~big).nonzero()[0]
+            ii_big, jj_big = self._big_pairs(arr, big)
+            if len(small_idx) < 2:
+                return ii_big, jj_big
+            small_arr = arr[small_idx]
+        else:
+            small_idx = None
+            small_arr = arr
+        sorted_cells = self._sorted_cells(small_arr, cell_width, cell_height)
+        order, cells, starts, counts = sorted_cells[:4]
+        if small_idx is not None:
+            order = small_idx[order]
+        if self.workers == 1:
+            ii, jj = self._stripe_pairs(sorted_cells, 0, len(cells))
+        else:
+            def do_stripe(stripe):
+                return self._stripe_pairs(sorted_cells, stripe[0], stripe[1],
+                                          by_first=True)
+
+            if self._pool is None:
+                from multiprocessing.pool import ThreadPool
+                self._pool = ThreadPool(self.workers)
+            # map keeps the stripes order, so the output is deterministic
+            parts = self._pool.map(do_stripe, self._stripes(counts))
+            ii = numpy.concatenate([part[0] for part in parts])
+            jj = numpy.concatenate([part[1] for part in parts])
+        ii = order[ii]
+        jj = order[jj]
+        if small_idx is not None:
+            ii = numpy.concatenate((ii, ii_big))
+            jj = numpy.concatenate((jj, jj_big))
+        return ii, jj
+
+    def close(self):
+        """Stops the worker threads, if any
+
+        The manager is still usable after, a new pool will be created if
+        needed.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
@@ -38,7 +38,6 @@ from __future__ import division, print_function, unicode_literals
 
 __docformat__ = 'restructuredtext'
 
-import random
 import pyglet
 from pyglet.gl import *
 import math
@@ -74,14 +73,42 @@ class ExceptionNoEmptyParticle(Exception):
     """particle system have no room for another particle"""
     pass
 
-rand = lambda: random.random() * 2 - 1
-
 # PointerToNumpy by Gary Herron
 # from pyglet's user list
 def PointerToNumpy(a, ptype=ctypes.c_float):
     a = numpy.ascontiguousarray(a)           # Probably a NO-OP, but perhaps not
     return a.ctypes.data_as(ctypes.POINTER(ptype)) # Ugly and undocumented! 
 
+def make_rng(seed=None):
+    """returns a numpy random generator seeded with seed; None seeds from
+    the OS entropy.
+
+    numpy.random.Generator streams are used when available (numpy >= 1.17),
+    else numpy.random.RandomState. Both provide random(size).
+    """
+    if hasattr(numpy.random, 'default_rng'):
+        return numpy.random.default_rng(seed)
+    return _RandomState(seed)
+
+class _RandomState(numpy.random.RandomState):
+    # old numpy RandomState lacks the random alias
+    def random(self, size=None):
+        return self.random_sample(size)
+
+
+class _LazyTexture(object):
+    """Class member descriptor that creates the texture from an image on
+    first use, so no GL context is needed until something is drawn"""
+    def __init__(self, image):
+        self.image = image
+        self.texture = None
+
+    def __get__(self, obj, cls=None):
+        if self.texture is None:
+            self.texture = self.image.get_texture()
+        return self.texture
+
+
 class Color( object ):
     def __init__( self, r,g,b,a ):
         self.r = r
@@ -93,6 +120,157 @@ class Color( object ):
         return self.r, self.g, self.b, self.a
 
 
+class Affector(object):
+    """
+    A stage in the particles update pipeline.
+
+    Each step ParticleSystem.update_particles calls, in order, the affect
+    method of each affector in the system's affectors member.
+
+    An affector changes the per-particle arrays of the alive particles, slots
+    [0, count), with a few numpy operations over the whole block; it must not
+    loop over particles in python.
+
+    Affectors are shared by all the instances of a particle system class, so
+    they should only hold configuration, not per-system state.
+    """
+    def affect(self, system, count, delta):
+        """applies the stage to particles [0, count) of system for a time delta"""
+        raise NotImplementedError
+
+
+class RadialTangentialAccel(Affector):
+    """Radial and tangential accelerations, relative to the system origin.
+
+    Skipped when the system radial_accel, radial_accel_var, tangential_accel
+    and tangential_accel_var are all zero.
+    """
+    def affect(self, system, count, delta):
+        if not (system.radial_accel or system.radial_accel_var or
+                system.tangential_accel or system.tangential_accel_var):
+            return
+        pos = system.particle_pos[:count]
+
+        # radial: posx + posy
+        norm = numpy.sqrt( pos[:,0] ** 2 + pos[:,1] ** 2 )
+        # XXX prevent div by 0
+        norm[norm == 0] = 0.0000001
+        radial = pos / norm[:, numpy.newaxis]
+
+        # tangential: radial rotated 90 degrees
+        tangential = numpy.empty_like( radial )
+        tangential[:,0] = -radial[:,1]
+        tangential[:,1] = radial[:,0]
+
+        radial *= system.particle_rad[:count]
+        tangential *= system.particle_tan[:count]
+        system.particle_dir[:count] += (tangential + radial) * delta
+
+
+class Gravity(Affector):
+    """Constant acceleration, the one stored for each particle when emitted"""
+    def affect(self, system, count, delta):
+        system.particle_dir[:count] += system.particle_grav[:count] * delta
+
+
+class Drag(Affector):
+    """Exponential speed decay: speed is multiplied by exp(-damping * delta)"""
+    def __init__(self, damping):
+        self.damping = damping
+
+    def affect(self, system, count, delta):
+        system.particle_dir[:count] *= math.exp(-self.damping * delta)
+
+
+class Turbulence(Affector):
+    """Random acceleration in [-strength, strength] for each axis, redrawn
+    each step for each particle"""
+    def __init__(self, strength):
+        self.strength = strength
+
+    def affect(self, system, count, delta):
+        noise = system.rng.random((count, 2)) * 2 - 1
+        system.particle_dir[:count] += noise * (self.strength * delta)
+
+
+class Attractor(Affector):
+    """Acceleration of magnitude strength towards the point (x, y), in the
+    system coordinates; negative strength repels.
+
+    Particles nearer than min_distance to the point are not affected.
+    """
+    def __init__(self, x, y, strength, min_distance=1.0):
+        self.x = x
+        self.y = y
+        self.strength = strength
+        self.min_distance = min_distance
+
+    def affect(self, system, count, delta):
+        to_point = numpy.array([self.x, self.y], numpy.float32) - system.particle_pos[:count]
+        dist = numpy.sqrt( to_point[:,0] ** 2 + to_point[:,1] ** 2 )
+        far = dist >= self.min_distance
+        scale = numpy.zeros_like(dist)
+        scale[far] = self.strength * delta / dist[far]
+        system.particle_dir[:count] += to_point * scale[:, numpy.newaxis]
+
+
+class Move(Affector):
+    """Moves the particles according to their direction (velocity)"""
+    def affect(self, system, count, delta):
+        system.particle_pos[:count] += system.particle_dir[:count] * delta
+
+
+class Age(Affector):
+    """Decrements the particles life"""
+    def affect(self, system, count, delta):
+        system.particle_life[:count] -= delta
+
+
+class FreePosition(Affector):
+    """With position_type POSITION_FREE particles don't follow the system
+    node when it moves; no-op with POSITION_GROUPED"""
+    def affect(self, system, count, delta):
+        if system.position_type == system.POSITION_FREE:
+            tuple = numpy.array( [system.x, system.y] )
+            tmp = tuple - system.start_pos[:count]
+            system.particle_pos[:count] -= tmp
+
+
+class ColorOverLife(Affector):
+    """Linear interpolation from the start color to the end color"""
+    def affect(self, system, count, delta):
+        system.particle_color[:count] += system.particle_delta_color[:count] * delta
+
+
+class SizeOverLife(Affector):
+    """Sets the particle size following a curve; sizes are the values at
+    equally spaced fractions of the particle life, the first at birth and the
+    last at death. Linear interpolation is used between values.
+
+    Particle size is only used when rendering with quads (fallback) and
+    use_particle_size is True.
+    """
+    def __init__(self, sizes):
+        self.sizes = numpy.array(sizes, numpy.float32)
+        self.fractions = numpy.linspace(0.0, 1.0, len(sizes))
+
+    def affect(self, system, count, delta):
+        age = 1.0 - system.particle_life[:count, 0] / system.particle_total_life[:count, 0]
+        system.particle_size[:count, 0] = numpy.interp(age, self.fractions, self.sizes)
+
+
+class Spin(Affector):
+    """Linear interpolation from the start spin to the end spin.
+
+    Skipped when the system has no spin, see ParticleSystem.has_spin
+    """
+    def affect(self, system, count, delta):
+        if system.has_spin():
+            system.particle_rotation[:count] += system.particle_delta_rotation[:count] * delta
+
+
+_tex_coords_for_quad = numpy.array([[0.0, 1.0], [0.0, 0.0], [1.0, 0.0], [1.0, 1.0]], numpy.float32)
+
 class ParticleSystem( CocosNode ):
     """
     Base class for many flawors of cocos particle systems
@@ -149,6 +327,16 @@ class ParticleSystem( CocosNode ):
     #: Size variance
     size_var = 0.0
 
+    #: Start rotation of the particles, in degrees, clockwise.
+    #: Only the quads rendering (fallback) shows particle rotation
+    start_spin = 0.0
+    #: Start rotation variance
+    start_spin_var = 0.0
+    #: End rotation of the particles, in degrees, clockwise
+    end_spin = 0.0
+    #: End rotation variance
+    end_spin_var = 0.0
+
     #: How many seconds will the particle live
     life = 0
     #: Life variance
@@ -168,7 +356,7 @@ class ParticleSystem( CocosNode ):
 
     #:texture for the particles
     pic = pyglet.image.load('fire.png', file=pyglet.resource.file('fire.png'))
-    texture = pic.get_texture()
+    texture = _LazyTexture(pic)
 
     #:blend additive
     blend_additive = False
@@ -179,17 +367,52 @@ class ParticleSystem( CocosNode ):
     # position type
     position_type = POSITION_GROUPED
 
-    def __init__(self, fallback=None):
+    #: update pipeline, a sequence of Affector instances applied in order each
+    #: step. Subclasses can redefine it, by example
+    #: affectors = ParticleSystem.affectors + (Drag(0.5),)
+    affectors = (RadialTangentialAccel(), Gravity(), Move(), Age(),
+                 FreePosition(), ColorOverLife(), Spin())
+
+    #: quads rendering (fallback) only: if True each particle is drawn with
+    #: its own size (size +/- size_var), else all are drawn with size
+    use_particle_size = False
+
+    #: if not None, the simulation advances in steps of fixed_step seconds;
+    #: time passed to step is accumulated and consumed in whole fixed steps
+    fixed_step = None
+
+    #: seconds to fast forward when the system enters the stage the first
+    #: time, by example to show a fire already at steady state
+    warm_up_time = 0.0
+
+    def __init__(self, fallback=None, seed=None):
         """
         fallback can be None, True, False; default is None
             False: use point sprites, faster, not always availabel
             True: use quads, slower but always available)
             None: autodetect, use the faster available
-            
+
+        seed: seed for the system random generator; systems created with the
+        same seed evolve identically for the same sequence of time steps.
+        None (default) seeds from the OS entropy.
+
+        The simulation (step, simulate, fast_forward) does not need a GL
+        context; with fallback True or False nor does the constructor.
         """
         super(ParticleSystem,self).__init__()
 
+        #: random generator for this system, see make_rng
+        self.rng = make_rng(seed)
+
+        # time accumulated for the fixed step mode
+        self.step_accumulator = 0.0
+
+        # warm up already done
+        self.warmed_up = False
+
         # particles
+        # Alive particles are kept packed at the start of the arrays, in
+        # slots [0, particle_count); dead ones are swap-removed each step.
         # position x 2
         self.particle_pos = numpy.zeros( (self.total_particles, 2), numpy.float32 )
         # direction x 2
@@ -207,10 +430,16 @@ class ParticleSystem( CocosNode ):
         # life x 1
         self.particle_life = numpy.zeros( (self.total_particles, 1), numpy.float32 )
         self.particle_life.fill(-1.0)
+        # life at emission x 1
+        self.particle_total_life = numpy.zeros( (self.total_particles, 1), numpy.float32 )
         # size x 1
         self.particle_size = numpy.zeros( (self.total_particles, 1), numpy.float32 )
         # start position
         self.start_pos = numpy.zeros( (self.total_particles, 2), numpy.float32 )
+        # rotation x 1, degrees
+        self.particle_rotation = numpy.zeros( (self.total_particles, 1), numpy.float32 )
+        # delta rotation x 1
+        self.particle_delta_rotation = numpy.zeros( (self.total_particles, 1), numpy.float32 )
 
         #: How many particles can be emitted per second
         self.emit_counter = 0
@@ -221,6 +450,12 @@ class ParticleSystem( CocosNode ):
         #: auto remove when particle finishes
         self.auto_remove_on_finish = False
 
+        #: ParticleBatch drawing this system, None if the system draws itself
+        self.batch = None
+
+        #: ParticleSystemPool that recycles this system, or None
+        self.pool = None
+
         #: rendering mode; True is quads, False is point_sprites, None is auto fallback
         if fallback is None:
             fallback = not point_sprites_available()
@@ -235,6 +470,9 @@ class ParticleSystem( CocosNode ):
     def on_enter( self ):
         super( ParticleSystem, self).on_enter()
         #self.add_particle()
+        if self.warm_up_time and not self.warmed_up:
+            self.warmed_up = True
+            self.fast_forward( self.warm_up_time )
     
     def get_scaled_particle_size(self):
         """calcultes the value to pass in glPointSize to respect node scaling
@@ -252,6 +490,8 @@ class ParticleSystem( CocosNode ):
         return self.size * scale
 
     def draw( self ):
+        if self.batch is not None:
+            return
         glPushMatrix()
         self.transform()
 
@@ -290,7 +530,7 @@ class ParticleSystem( CocosNode ):
 #            glTexEnvi( GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE )
 
 
-        glDrawArrays(GL_POINTS, 0, self.total_particles);
+        glDrawArrays(GL_POINTS, 0, self.particle_count);
 
         # un -blend
         glPopAttrib()
@@ -311,20 +551,38 @@ class ParticleSystem( CocosNode ):
 
 
     def step( self, delta ):
+        if self.fixed_step is None:
+            self.simulate( delta )
+        else:
+            self.step_accumulator += delta
+            fixed_step = self.fixed_step
+            while self.step_accumulator >= fixed_step:
+                self.simulate( fixed_step )
+                self.step_accumulator -= fixed_step
 
-        # update particle count
-        self.particle_count = numpy.sum( self.particle_life >= 0 )
+        if (not self.active and
+            self.particle_count == 0 and self.auto_remove_on_finish == True):
+            self.unschedule( self.step )
+            if self.batch is not None:
+                self.batch.unregister( self )
+            self.parent.remove( self )
+            if self.pool is not None:
+                self.pool.release( self )
 
+    def simulate( self, delta ):
+        """
+        Advances the simulation delta seconds: emits, updates and removes
+        the dead particles. Needs no GL context.
+        """
         if self.active:
             rate = 1.0 / self.emission_rate
             self.emit_counter += delta
 
-#            if random.random() < 0.01:
-#                delta += 0.5
-
-            while self.particle_count < self.total_particles and self.emit_counter > rate:
-                self.add_particle()
-                self.emit_counter -= rate
+            # emits as many as the old one-by-one 'while emit_counter > rate'
+            quantity = int(math.ceil(self.emit_counter / rate)) - 1
+            if quantity > 0:
+                quantity = self.emit(quantity)
+                self.emit_counter -= quantity * rate
 
             self.elapsed += delta
 
@@ -332,11 +590,20 @@ class ParticleSystem( CocosNode ):
                 self.stop_system()
 
         self.update_particles( delta )
+        self.remove_dead_particles()
 
-        if (not self.active and
-            self.particle_count == 0 and self.auto_remove_on_finish == True):
-            self.unschedule( self.step )
-            self.parent.remove( self )
+    def fast_forward( self, seconds, dt=None ):
+        """
+        Advances the simulation seconds in steps of dt, without drawing.
+
+        dt defaults to fixed_step, or 1/60 if fixed_step is None.
+        Useful to warm up a system or to precompute an effect.
+        """
+        if dt is None:
+            dt = self.fixed_step or 1.0 / 60.0
+        num_steps = int(round(seconds / dt))
+        for i in range(num_steps):
+            self.simulate( dt )
 
     def add_particle( self ):
         """
@@ -349,6 +616,58 @@ class ParticleSystem( CocosNode ):
         self.init_particle()
         self.particle_count += 1
 
+    def emit( self, quantity ):
+        """
+        Adds up to quantity particles, less if there is no room for all.
+
+        All the new particles are initialized together, with one numpy
+        operation per attribute.
+
+        Returns the number of particles added.
+        """
+        quantity = min(quantity, self.total_particles - self.particle_count)
+        if quantity > 0:
+            start = self.particle_count
+            self.init_particles(start, start + quantity)
+            self.particle_count += quantity
+        return quantity
+
+    def remove_dead_particles( self ):
+        """
+        Swap-removes the particles with negative life, so the alive ones
+        stay packed in slots [0, particle_count)
+        """
+        count = self.particle_count
+        dead = (self.particle_life[:count, 0] < 0).nonzero()[0]
+        num_dead = len(dead)
+        if num_dead == 0:
+            return
+        new_count = count - num_dead
+        # dead slots that will stay inside the alive prefix are refilled with
+        # the alive particles found after it
+        holes = dead[dead < new_count]
+        if len(holes):
+            tail_alive = (self.particle_life[new_count:count, 0] >= 0).nonzero()[0]
+            tail_alive += new_count
+            for arr in self.particle_arrays():
+                arr[holes] = arr[tail_alive]
+        self.particle_life[new_count:count] = -1.0
+        self.particle_count = new_count
+
+    def particle_arrays( self ):
+        """returns the list of per-particle arrays, all indexed by particle slot"""
+        return [self.particle_pos, self.particle_dir, self.particle_rad,
+                self.particle_tan, self.particle_grav, self.particle_color,
+                self.particle_delta_color, self.particle_life,
+                self.particle_total_life,
+                self.particle_size, self.start_pos, self.particle_rotation,
+                self.particle_delta_rotation]
+
+    def has_spin( self ):
+        """True if the particles rotate, given the spin members"""
+        return bool(self.start_spin or self.start_spin_var or
+                    self.end_spin or self.end_spin_var)
+
     def stop_system( self ):
         self.active = False
         self.elapsed= self.duration
@@ -358,124 +677,94 @@ class ParticleSystem( CocosNode ):
         self.elapsed= self.duration
         self.emit_counter = 0
 
-    def update_particles( self, delta ):
-        # radial: posx + posy
-        norm = numpy.sqrt( self.particle_pos[:,0] ** 2 + self.particle_pos[:,1] ** 2 )
-        # XXX prevent div by 0
-        norm = numpy.select( [norm==0], [0.0000001], default=norm )
-        posx = self.particle_pos[:,0] / norm
-        posy = self.particle_pos[:,1] / norm
-
-        radial = numpy.array( [posx, posy] )
-        tangential = numpy.array( [-posy, posx] )
-
-        # update dir
-        radial = numpy.swapaxes(radial,0,1)
-        radial *= self.particle_rad
-        tangential = numpy.swapaxes(tangential,0,1)
-        tangential *= self.particle_tan
-
-        self.particle_dir +=  (tangential + radial + self.particle_grav) * delta
-
-        # update pos with updated dir
-        self.particle_pos += self.particle_dir * delta
-
-        # life
-        self.particle_life -= delta
-
-
-        # position: free or grouped
-        if self.position_type == self.POSITION_FREE:
-            tuple = numpy.array( [self.x, self.y] )
-            tmp = tuple - self.start_pos
-            self.particle_pos -= tmp
-
+    def restart_system( self ):
+        """
+        Brings the system back to the state just after construction, reusing
+        the arrays: no particles, active, elapsed 0 and step scheduled.
+        """
+        self.particle_life[:self.particle_count] = -1.0
+        self.particle_count = 0
+        self.active = True
+        self.elapsed = 0
+        self.emit_counter = 0
+        self.step_accumulator = 0.0
+        self.warmed_up = False
+        if not [c for c in self.scheduled_calls if c[0] == self.step]:
+            self.schedule( self.step )
 
-        # color
-        self.particle_color += self.particle_delta_color * delta
+    def update_particles( self, delta ):
+        count = self.particle_count
+        for affector in self.affectors:
+            affector.affect(self, count, delta)
 
         # if life < 0, set alpha in 0
-        self.particle_color[:,3] = numpy.select( [self.particle_life[:,0] < 0], [0], default=self.particle_color[:,3] )
-
-#        print self.particles[0]
-#        print self.pas[0,0:4]
+        self.particle_color[:count, 3][self.particle_life[:count, 0] < 0] = 0.0
 
     def init_particle( self ):
-        # position
-#        p=self.particles[idx]
-
-        a = self.particle_life < 0
-        idxs = a.nonzero()
-
-        idx = -1
-
-        if len(idxs[0]) > 0:
-            idx = idxs[0][0] 
-        else:
+        """initializes the first free slot, at index particle_count"""
+        idx = self.particle_count
+        if idx >= self.total_particles:
             raise ExceptionNoEmptyParticle()
+        self.init_particles(idx, idx + 1)
+
+    def init_particles( self, start, end ):
+        """initializes the particles in slots [start, end)"""
+        n = end - start
+        random = self.rng.random
+        rand_n = lambda: random(n) * 2 - 1
 
         # position
-        self.particle_pos[idx][0] = self.pos_var.x * rand()
-        self.particle_pos[idx][1] = self.pos_var.y * rand()
+        self.particle_pos[start:end, 0] = self.pos_var.x * rand_n()
+        self.particle_pos[start:end, 1] = self.pos_var.y * rand_n()
 
         # start position
-        self.start_pos[idx][0] = self.x
-        self.start_pos[idx][1] = self.y
+        self.start_pos[start:end, 0] = self.x
+        self.start_pos[start:end, 1] = self.y
 
-        a = math.radians( self.angle + self.angle_var * rand() )
-        v = Point2( math.cos( a ), math.sin( a ) )
-        s = self.speed + self.speed_var * rand()
-
-        dir = v * s
+        a = numpy.radians( self.angle + self.angle_var * rand_n() )
+        s = self.speed + self.speed_var * rand_n()
 
         # direction
-        self.particle_dir[idx][0] = dir.x
-        self.particle_dir[idx][1] = dir.y
+        self.particle_dir[start:end, 0] = numpy.cos( a ) * s
+        self.particle_dir[start:end, 1] = numpy.sin( a ) * s
 
         # radial accel
-        self.particle_rad[idx] = self.radial_accel + self.radial_accel_var * rand()
-
+        self.particle_rad[start:end, 0] = self.radial_accel + self.radial_accel_var * rand_n()
 
         # tangential accel
-        self.particle_tan[idx] = self.tangential_accel + self.tangential_accel_var * rand()
-        
+        self.particle_tan[start:end, 0] = self.tangential_accel + self.tangential_accel_var * rand_n()
+
         # life
-        life = self.particle_life[idx] = self.life + self.life_var * rand()
+        life = self.life + self.life_var * rand_n()
+        self.particle_life[start:end, 0] = life
+        self.particle_total_life[start:end, 0] = life
 
         # Color
         # start
-        sr = self.start_color.r + self.start_color_var.r * rand()
-        sg = self.start_color.g + self.start_color_var.g * rand()
-        sb = self.start_color.b + self.start_color_var.b * rand()
-        sa = self.start_color.a + self.start_color_var.a * rand()
-
-        self.particle_color[idx][0] = sr
-        self.particle_color[idx][1] = sg
-        self.particle_color[idx][2] = sb
-        self.particle_color[idx][3] = sa
+        start_color = (numpy.array( self.start_color.to_array() ) +
+                       numpy.array( self.start_color_var.to_array() ) *
+                       (random( (n, 4) ) * 2 - 1))
+        self.particle_color[start:end] = start_color
 
         # end
-        er = self.end_color.r + self.end_color_var.r * rand()
-        eg = self.end_color.g + self.end_color_var.g * rand()
-        eb = self.end_color.b + self.end_color_var.b * rand()
-        ea = self.end_color.a + self.end_color_var.a * rand()
-
-        delta_color_r = (er - sr) / life
-        delta_color_g = (eg - sg) / life
-        delta_color_b = (eb - sb) / life
-        delta_color_a = (ea - sa) / life
+        end_color = (numpy.array( self.end_color.to_array() ) +
+                     numpy.array( self.end_color_var.to_array() ) *
+                     (random( (n, 4) ) * 2 - 1))
 
-        self.particle_delta_color[idx][0] = delta_color_r
-        self.particle_delta_color[idx][1] = delta_color_g
-        self.particle_delta_color[idx][2] = delta_color_b
-        self.particle_delta_color[idx][3] = delta_color_a
+        self.particle_delta_color[start:end] = (end_color - start_color) / life[:, numpy.newaxis]
 
         # size
-        self.particle_size[idx] = self.size + self.size_var * rand()
+        self.particle_size[start:end, 0] = self.size + self.size_var * rand_n()
 
         # gravity
-        self.particle_grav[idx][0] = self.gravity.x
-        self.particle_grav[idx][1] = self.gravity.y
+        self.particle_grav[start:end, 0] = self.gravity.x
+        self.particle_grav[start:end, 1] = self.gravity.y
+
+        # rotation
+        start_spin = self.start_spin + self.start_spin_var * rand_n()
+        end_spin = self.end_spin + self.end_spin_var * rand_n()
+        self.particle_rotation[start:end, 0] = start_spin
+        self.particle_delta_rotation[start:end, 0] = (end_spin - start_spin) / life
 
 
     # Below only fallback functionality.
@@ -483,20 +772,24 @@ class ParticleSystem( CocosNode ):
     # point sprites buffers -> quads buffer, so any change in point sprite mode
     # is automatically reflects in the fallback mode (except for changes in the
     # draw method which should be manually adapted
+    # The quads buffer interleaves, for each vertex, x, y, r, g, b, a, u, v as
+    # float32; the transformation is done with numpy broadcasting, writing in
+    # place into the buffer.
 
-    def _fallback_init(self):
-        self.vertexs = numpy.zeros((self.total_particles * 4, 2), numpy.float32)
-        tex_coords_for_quad = numpy.array([[0.0, 1.0], [0.0, 0.0], [1.0, 0.0], [1.0, 1.0]], numpy.float32)
-        self.tex_coords = numpy.zeros((self.total_particles * 4, 2), numpy.float32)
-        all_tex_coords = self.tex_coords
-        for i in range(0,len(self.vertexs),4):
-            all_tex_coords[i : i + 4 ] = tex_coords_for_quad
-        self.per_vertex_colors = numpy.zeros( (self.total_particles * 4, 4), numpy.float32)
-        self.delta_pos_to_vertex = numpy.zeros((4, 2), numpy.float32)
+    # vertex offsets for a quad of side 2 centered at origin, counter-clockwise
+    _quad_corners = numpy.array([[-1.0, 1.0], [-1.0, -1.0], [1.0, -1.0], [1.0, 1.0]], numpy.float32)
 
+    def _fallback_init(self):
+        self.quads_buffer = numpy.zeros((self.total_particles * 4, 8), numpy.float32)
+        # views into quads_buffer
+        self.vertexs = self.quads_buffer[:, 0:2]
+        self.per_vertex_colors = self.quads_buffer[:, 2:6]
+        self.tex_coords = self.quads_buffer[:, 6:8]
+        self.tex_coords[:] = numpy.tile(_tex_coords_for_quad, (self.total_particles, 1))
 
     def draw_fallback(self):
-        self.make_delta_pos_to_vertex()
+        if self.batch is not None:
+            return
         self.update_vertexs_from_pos()
         self.update_per_vertex_colors()
 
@@ -509,18 +802,17 @@ class ParticleSystem( CocosNode ):
         glEnable(GL_TEXTURE_2D)
         glBindTexture(GL_TEXTURE_2D, self.texture.id )
 
+        # one interleaved buffer, stride 8 floats
+        buffer_ptr = self.quads_buffer.ctypes.data
+        stride = self.quads_buffer.strides[0]
         glEnableClientState(GL_VERTEX_ARRAY)
-        vertexs_ptr = PointerToNumpy(self.vertexs)
-        glVertexPointer(2, GL_FLOAT, 0, vertexs_ptr)
+        glVertexPointer(2, GL_FLOAT, stride, buffer_ptr)
 
         glEnableClientState(GL_COLOR_ARRAY)
-        color_ptr = PointerToNumpy(self.per_vertex_colors)
-        #glColorPointer(4, GL_UNSIGNED_BYTE, 0, color_ptr)
-        glColorPointer(4, GL_FLOAT, 0, color_ptr)
-        
+        glColorPointer(4, GL_FLOAT, stride, buffer_ptr + 2 * 4)
+
         glEnableClientState( GL_TEXTURE_COORD_ARRAY )
-        tex_coord_ptr = PointerToNumpy(self.tex_coords)
-        glTexCoordPointer(2, GL_FLOAT, 0, tex_coord_ptr)
+        glTexCoordPointer(2, GL_FLOAT, stride, buffer_ptr + 6 * 4)
 
         glPushAttrib(GL_COLOR_BUFFER_BIT)
         glEnable(GL_BLEND)
@@ -529,7 +821,7 @@ class ParticleSystem( CocosNode ):
         else:
             glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA);
 
-        glDrawArrays(GL_QUADS, 0, len(self.vertexs))
+        glDrawArrays(GL_QUADS, 0, self.particle_count * 4)
     
         # un -blend
         glPopAttrib()
@@ -546,25 +838,286 @@ class ParticleSystem( CocosNode ):
         glPopMatrix()
 
     def update_vertexs_from_pos(self):
-        vertexs = self.vertexs
-        delta = self.delta_pos_to_vertex
-        pos = self.particle_pos
-        for i, pos_i in enumerate(pos):
-            i4 = i*4
-            vertexs[i4:i4 + 4 ] = delta + pos_i
+        count = self.particle_count
+        # shape (count, 4, 2), a view into quads_buffer
+        vertexs = self.quads_buffer[:count * 4].reshape(count, 4, 8)[:, :, 0:2]
+        self.write_quads_vertexs(vertexs)
+
+    def write_quads_vertexs(self, vertexs):
+        """writes the quads vertexs, in the system coordinates, for the alive
+        particles into vertexs, an array of shape (particle_count, 4, 2)"""
+        count = self.particle_count
+        pos = self.particle_pos[:count, numpy.newaxis, :]
+        rotated = self.has_spin()
+        if self.use_particle_size:
+            half_size = self.particle_size[:count, :, numpy.newaxis] * 0.5
+        else:
+            half_size = self.size * 0.5
+        corners = self._quad_corners * half_size
+        if rotated:
+            # clockwise, as CocosNode.rotation
+            a = numpy.radians(self.particle_rotation[:count])
+            cos_a = numpy.cos(a)
+            sin_a = numpy.sin(a)
+            x = corners[..., 0]
+            y = corners[..., 1]
+            vertexs[:, :, 0] = x * cos_a + y * sin_a
+            vertexs[:, :, 1] = y * cos_a - x * sin_a
+            vertexs += pos
+        else:
+            vertexs[:] = pos + corners
 
     def update_per_vertex_colors(self):
-        colors = self.particle_color
-        per_vertex_colors = self.per_vertex_colors
-        for i, color in enumerate(colors):
-            i4 = i*4
-            per_vertex_colors[i4:i4 + 4 ] = color
-
-    def make_delta_pos_to_vertex(self):
-        size2 = self.size / 2.0
-        # counter-clockwise
-        self.delta_pos_to_vertex[0] = (-size2, +size2) # NW
-        self.delta_pos_to_vertex[1] = (-size2, -size2) # SW
-        self.delta_pos_to_vertex[2] = (+size2, -size2) # SE
-        self.delta_pos_to_vertex[3] = (+size2, +size2) # NE
+        count = self.particle_count
+        per_vertex_colors = self.quads_buffer[:count * 4].reshape(count, 4, 8)[:, :, 2:6]
+        self.write_quads_colors(per_vertex_colors)
+
+    def write_quads_colors(self, per_vertex_colors):
+        """writes the alive particles colors into per_vertex_colors, an array
+        of shape (particle_count, 4, 4)"""
+        per_vertex_colors[:] = self.particle_color[:self.particle_count, numpy.newaxis, :]
+
+
+class ParticleBatch( CocosNode ):
+    """
+    Draws many particle systems with few GL calls.
+
+    Systems registered with the batch don't draw themselves; the batch
+    merges the ones sharing texture and blend mode in one buffer, drawn with
+    a single glDrawArrays call.
+
+    Registered systems step as usual, so they must be in the scene, anywhere
+    in the tree. The batch draws at its own place in the scene graph: the
+    transform from each system to the batch coordinates is applied on the
+    CPU, with one vectorized operation per system. Systems not running or
+    not visible are not drawn.
 
+    Particles are drawn as quads, so systems with different sizes can share
+    a draw call. Cameras of the individual systems are ignored.
+    """
+    def __init__(self):
+        super(ParticleBatch, self).__init__()
+
+        #: registered systems, in draw order
+        self.systems = []
+
+        # (texture id, blend_additive) -> quads buffer, as the quads buffer
+        # in ParticleSystem
+        self._buffers = {}
+
+    def register(self, system):
+        """the batch will draw system"""
+        if system.batch is not None:
+            system.batch.unregister(system)
+        system.batch = self
+        self.systems.append(system)
+
+    def unregister(self, system):
+        """system will draw itself again"""
+        self.systems.remove(system)
+        system.batch = None
+
+    def groups(self):
+        """returns a list of (texture, blend_additive, systems) with the
+        systems to draw in each draw call, in draw order"""
+        groups = []
+        by_key = {}
+        for system in self.systems:
+            if (system.particle_count == 0 or not system.is_running or
+                not system.visible):
+                continue
+            key = (system.texture.id, system.blend_additive)
+            if key not in by_key:
+                by_key[key] = []
+                groups.append((system.texture, system.blend_additive, by_key[key]))
+            by_key[key].append(system)
+        return groups
+
+    def _get_buffer(self, key, num_particles):
+        buffer = self._buffers.get(key)
+        if buffer is None or len(buffer) < num_particles * 4:
+            capacity = 64
+            while capacity < num_particles:
+                capacity *= 2
+            buffer = numpy.zeros((capacity * 4, 8), numpy.float32)
+            buffer[:, 6:8] = numpy.tile(_tex_coords_for_quad, (capacity, 1))
+            self._buffers[key] = buffer
+        return buffer
+
+    def fill_buffer(self, texture, blend_additive, systems):
+        """writes the quads for systems in the buffer for its group, in the
+        batch coordinates, and returns (buffer, number of vertexs)"""
+        num_particles = sum(system.particle_count for system in systems)
+        buffer = self._get_buffer((texture.id, blend_additive), num_particles)
+        inverse = self.get_world_inverse()
+        start = 0
+        for system in systems:
+            count = system.particle_count
+            quads = buffer[start * 4:(start + count) * 4].reshape(count, 4, 8)
+            vertexs = quads[:, :, 0:2]
+            system.write_quads_vertexs(vertexs)
+            m = inverse * system.get_world_transform()
+            x = vertexs[:, :, 0].copy()
+            y = vertexs[:, :, 1]
+            vertexs[:, :, 0] = m.a * x + m.b * y + m.c
+            vertexs[:, :, 1] = m.e * x + m.f * y + m.g
+            system.write_quads_colors(quads[:, :, 2:6])
+            start += count
+        return buffer, num_particles * 4
+
+    def draw(self):
+        groups = self.groups()
+        if not groups:
+            return
+
+        glPushMatrix()
+        self.transform()
+
+        # color preserve - at least intel 945G needs that
+        glPushAttrib(GL_CURRENT_BIT)
+        glPushAttrib(GL_COLOR_BUFFER_BIT)
+        glEnable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+
+        for texture, blend_additive, systems in groups:
+            buffer, num_vertexs = self.fill_buffer(texture, blend_additive, systems)
+
+            glBindTexture(GL_TEXTURE_2D, texture.id)
+            if blend_additive:
+                glBlendFunc(GL_SRC_ALPHA, GL_ONE);
+            else:
+                glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA);
+
+            # one interleaved buffer, stride 8 floats
+            buffer_ptr = buffer.ctypes.data
+            stride = buffer.strides[0]
+            glVertexPointer(2, GL_FLOAT, stride, buffer_ptr)
+            glColorPointer(4, GL_FLOAT, stride, buffer_ptr + 2 * 4)
+            glTexCoordPointer(2, GL_FLOAT, stride, buffer_ptr + 6 * 4)
+
+            glDrawArrays(GL_QUADS, 0, num_vertexs)
+
+        # disable states
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisable(GL_TEXTURE_2D);
+
+        # un -blend
+        glPopAttrib()
+
+        # color restore
+        glPopAttrib()
+
+        glPopMatrix()
+
+
+class ParticleSystemPool(object):
+    """
+    Recycles the particle systems of one class, avoiding the allocation of
+    the particle arrays for each short lived effect, like explosions.
+
+    Systems handed by get have auto_remove_on_finish True; when they finish
+    and remove themselves from the parent they return to the pool, and a
+    later get will hand them again after restart_system.
+
+    Usage::
+
+        explosions = ParticleSystemPool(Explosion, prewarm=8)
+        ...
+        explosion = explosions.get()
+        explosion.position = x, y
+        layer.add(explosion)
+
+    The hits and misses members count the get calls served from the pool and
+    the ones that needed a new system.
+
+    A recycled system is handed as a new one: see release for the state that
+    is reset.
+    """
+
+    #: emitter parameters that a recycled system takes again from its class,
+    #: discarding the values its previous user set on the instance
+    reset_members = ('duration', 'emission_rate', 'gravity', 'pos_var',
+                     'angle', 'angle_var', 'speed', 'speed_var',
+                     'tangential_accel', 'tangential_accel_var',
+                     'radial_accel', 'radial_accel_var', 'size', 'size_var',
+                     'start_spin', 'start_spin_var', 'end_spin', 'end_spin_var',
+                     'life', 'life_var', 'start_color', 'start_color_var',
+                     'end_color', 'end_color_var', 'blend_additive',
+                     'color_modulate', 'position_type', 'affectors',
+                     'use_particle_size', 'fixed_step', 'warm_up_time')
+
+    def __init__(self, system_class, prewarm=0, max_size=None, **kwargs):
+        """
+        system_class: the ParticleSystem subclass to pool
+        prewarm: number of systems to create now, ready for get
+        max_size: maximum number of systems kept in the pool, None means no
+        limit
+        kwargs: passed to system_class when creating a system, by example
+        fallback
+        """
+        self.system_class = system_class
+        self.max_size = max_size
+        self.kwargs = kwargs
+
+        #: get calls served with a recycled system
+        self.hits = 0
+        #: get calls that created a new system
+        self.misses = 0
+
+        # systems ready to be handed
+        self.free = [self._new_system() for i in range(prewarm)]
+
+    def _new_system(self):
+        system = self.system_class(**self.kwargs)
+        system.pool = self
+        system.auto_remove_on_finish = True
+        return system
+
+    def get(self):
+        """returns a system ready to be added to the scene"""
+        if self.free:
+            self.hits += 1
+            return self.free.pop()
+        self.misses += 1
+        return self._new_system()
+
+    def release(self, system):
+        """
+        Returns system to the pool; called automatically when a system handed
+        by get finishes. system must not be in the scene.
+
+        The system is left as a new one: its actions are stopped and
+        removed, position, rotation, scale, scale_x, scale_y and
+        transform_anchor get their default values, visible is True, the
+        members named in reset_members take again the class values and
+        restart_system is called. Other state set on the instance, like
+        children or grid, is kept.
+        """
+        if self.max_size is not None and len(self.free) >= self.max_size:
+            system.pool = None
+            return
+        system.stop()
+        system.actions = []
+        system.to_remove = []
+        system.position = (0, 0)
+        system.rotation = 0.0
+        system.scale = 1.0
+        system.scale_x = 1.0
+        system.scale_y = 1.0
+        system.transform_anchor = (0, 0)
+        system.visible = True
+        for name in self.reset_members:
+            system.__dict__.pop(name, None)
+        system.restart_system()
+        system.auto_remove_on_finish = True
+        self.free.append(system)
+
+    def stats(self):
+        """returns a dict with keys 'hits', 'misses', 'free'"""
+        return {'hits': self.hits, 'misses': self.misses,
+                'free': len(self.free)}
@@ -69,3 +69,62 @@ class Bezier(Path):
 
             )
     
+
+
+class PathTable(Path):
+    """A path sampled once from another path, evaluated by linear
+    interpolation between the samples.
+
+    With arc_length=True the samples are spaced at equal distances along the
+    path, so an action following it moves at constant speed.
+
+    The table is immutable: copies of an action holding it share it.
+    """
+    def __init__(self, path, resolution=256, arc_length=False):
+        self.resolution = resolution
+        self.arc_length = arc_length
+        if arc_length:
+            points = self._equal_length_points(path, resolution)
+        else:
+            points = [path.at(i / resolution) for i in range(resolution + 1)]
+        self.xs = [p[0] for p in points]
+        self.ys = [p[1] for p in points]
+
+    @staticmethod
+    def _equal_length_points(path, resolution):
+        # measure the length with more samples than the table will keep
+        n = resolution * 4
+        samples = [path.at(i / n) for i in range(n + 1)]
+        lengths = [0.0]
+        for (x0, y0), (x1, y1) in zip(samples, samples[1:]):
+            lengths.append(lengths[-1] + ((x1 - x0) ** 2 + (y1 - y0) ** 2) ** 0.5)
+        total = lengths[-1]
+        if total == 0.0:
+            return samples[::4]
+        points = []
+        j = 0
+        for k in range(resolution + 1):
+            target = total * k / resolution
+            while j < n - 1 and lengths[j + 1] < target:
+                j += 1
+            seg = lengths[j + 1] - lengths[j]
+            f = (target - lengths[j]) / seg if seg else 0.0
+            (x0, y0), (x1, y1) = samples[j], samples[j + 1]
+            points.append((x0 + (x1 - x0) * f, y0 + (y1 - y0) * f))
+        return points
+
+    def at(self, t):
+        xs = self.xs
+        ys = self.ys
+        if t >= 1.0:
+            return xs[-1], ys[-1]
+        if t <= 0.0:
+            return xs[0], ys[0]
+        x = t * self.resolution
+        i = int(x)
+        f = x - i
+        return (xs[i] + (xs[i + 1] - xs[i]) * f,
+                ys[i] + (ys[i + 1] - ys[i]) * f)
+
+    def __deepcopy__(self, memo):
+        return self
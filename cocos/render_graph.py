@@ -0,0 +1,245 @@
+# ----------------------------------------------------------------------------
+# cocos2d
+# Copyright (c) 2008-2012 Daniel Moisset, Ricardo Quesada, Rayentray Tappa,
+# Lucio Torre
+# Copyright (c) 2009-2014  Richard Jones, Claudio Canepa
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#   * Neither the name of cocos2d nor the names of its
+#     contributors may be used to endorse or promote products
+#     derived from this software without specific prior written
+#     permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# ----------------------------------------------------------------------------
+'''Retained render mode for a scene
+
+By default a scene is drawn by `CocosNode.visit`, which walks the whole tree
+each frame, pushing, transforming and popping the GL modelview matrix at each
+node with children.
+
+A `RenderGraph` assigned to a scene replaces that walk: the tree is flattened
+once into a list of draw operations in visit order, and the list is rebuilt
+only when a node is added or removed (which is also how the z of a child
+changes). Each frame the graph:
+
+    - refreshes the world matrices of the nodes with children, recomputing
+      only those whose `CocosNode.get_local_transform` changed or whose
+      parent world matrix changed
+    - calls `draw` for each visible node, loading in GL the world matrix of
+      its parent only when it differs from the one of the previous draw
+
+Invisible nodes skip their whole subtree in O(1). Leaf nodes need no matrix
+at all.
+
+Usage::
+
+    scene = Scene(layer)
+    scene.render_graph = RenderGraph()
+    director.run(scene)
+
+Nodes that customize `visit` (like `BatchNode` or `ScrollableLayer`), and
+nodes with an active grid or a moved camera, are drawn with their own
+`visit`, in the right place of the list.
+'''
+
+from __future__ import division, print_function, unicode_literals
+
+__docformat__ = 'restructuredtext'
+
+__all__ = ['RenderGraph']
+
+from pyglet.gl import glPushMatrix, glPopMatrix, glMultMatrixf, GLfloat
+
+from cocos.cocosnode import CocosNode
+
+# operations
+_ENTER, _DRAW, _VISIT = range(3)
+
+
+def _gl_matrix(m):
+    """the 4x4 column major GL matrix of an euclid.Matrix3 2D transform"""
+    return (GLfloat * 16)(m.a, m.e, 0.0, 0.0,
+                          m.b, m.f, 0.0, 0.0,
+                          0.0, 0.0, 1.0, 0.0,
+                          m.c, m.g, 0.0, 1.0)
+
+
+def _is_identity(m):
+    return (m.a == 1.0 and m.b == 0.0 and m.c == 0.0 and
+            m.e == 0.0 and m.f == 1.0 and m.g == 0.0)
+
+
+class RenderGraph(object):
+    """
+    Draws a scene from a flattened draw list, see the module docs.
+
+    Nodes in the scene tell the graph about structural changes through
+    `invalidate`; `CocosNode.add` and `CocosNode.remove` do that.
+    """
+    def __init__(self):
+        # structure changed since the last build
+        self.dirty = True
+
+        # nodes in the draw list, their add and remove invalidate it
+        self.nodes = []
+
+        # [kind, node, slot, end]: slot is the index in containers of the
+        # node whose world matrix applies to the operation, -1 means the
+        # base modelview; end is the index past the subtree of an _ENTER
+        self.ops = []
+
+        # nodes with children, in visit order, and for each one the index
+        # of the parent container, the local matrix used last time, the
+        # world matrix and its GL version (None if identity)
+        self.containers = []
+        self.parents = []
+        self.locals = []
+        self.worlds = []
+        self.gl_worlds = []
+
+        #: number of world matrices recomputed by the last render
+        self.num_updated = 0
+        #: number of draw list rebuilds
+        self.num_builds = 0
+
+    def invalidate(self):
+        """marks the draw list to be rebuilt before the next frame"""
+        if self.dirty:
+            return
+        self.dirty = True
+        # the old draw list is not used anymore, don't keep removed nodes
+        # alive until the rebuild
+        self._release()
+
+    # building
+
+    def _release(self):
+        # forgets the draw list; nodes that joined another graph meanwhile
+        # keep pointing to it
+        for node in self.nodes:
+            if node._render_graph is self:
+                node._render_graph = None
+        self.nodes = []
+        self.ops = []
+        self.containers = []
+        self.parents = []
+
+    def build(self, root):
+        """flattens the tree under root in a new draw list"""
+        self._release()
+        self._flatten(root, -1, True)
+        n = len(self.containers)
+        self.locals = [None] * n
+        self.worlds = [None] * n
+        self.gl_worlds = [None] * n
+        self.dirty = False
+        self.num_builds += 1
+
+    def _flatten(self, node, slot, is_root=False):
+        ops = self.ops
+        if not is_root and type(node).visit is not CocosNode.visit:
+            ops.append([_VISIT, node, slot, len(ops) + 1])
+            return
+        node._render_graph = self
+        self.nodes.append(node)
+        op = [_ENTER, node, slot, None]
+        ops.append(op)
+        children = node.children
+        position = 0
+        if children:
+            inner = len(self.containers)
+            self.containers.append(node)
+            self.parents.append(slot)
+            for z, c in children:
+                if z >= 0:
+                    break
+                position += 1
+                self._flatten(c, inner)
+        ops.append([_DRAW, node, slot, None])
+        for z, c in children[position:]:
+            self._flatten(c, inner)
+        op[3] = len(ops)
+
+    # drawing
+
+    def update_transforms(self):
+        """recomputes the world matrices of the containers that changed"""
+        containers = self.containers
+        parents = self.parents
+        locals_ = self.locals
+        worlds = self.worlds
+        gl_worlds = self.gl_worlds
+        changed = [False] * len(containers)
+        updated = 0
+        for i, node in enumerate(containers):
+            local = node.get_local_transform()
+            p = parents[i]
+            if local is locals_[i] and (p < 0 or not changed[p]):
+                continue
+            locals_[i] = local
+            world = local if p < 0 else worlds[p] * local
+            worlds[i] = world
+            gl_worlds[i] = None if _is_identity(world) else _gl_matrix(world)
+            changed[i] = True
+            updated += 1
+        self.num_updated = updated
+
+    def render(self, root):
+        """draws the tree under root, as root.visit() would"""
+        if self.dirty:
+            self.build(root)
+        self.update_transforms()
+
+        ops = self.ops
+        gl_worlds = self.gl_worlds
+        n = len(ops)
+        i = 0
+        current = -1
+        glPushMatrix()
+        while i < n:
+            kind, node, slot, end = ops[i]
+            if kind == _DRAW:
+                if slot != current:
+                    glPopMatrix()
+                    glPushMatrix()
+                    if slot >= 0 and gl_worlds[slot] is not None:
+                        glMultMatrixf(gl_worlds[slot])
+                    current = slot
+                node.draw()
+                i += 1
+            elif not node.visible:
+                i = end
+            elif (kind == _VISIT or (node.grid and node.grid.active) or
+                  node.camera.dirty or node.camera.once):
+                if slot != current:
+                    glPopMatrix()
+                    glPushMatrix()
+                    if slot >= 0 and gl_worlds[slot] is not None:
+                        glMultMatrixf(gl_worlds[slot])
+                    current = slot
+                node.visit()
+                i = end
+            else:
+                i += 1
+        glPopMatrix()
@@ -111,9 +111,22 @@ class Scene(cocosnode.CocosNode, EventHandlerMixin):
         self.music = None
         self.music_playing = False
 
+        #: a `cocos.scheduler.Scheduler` to drive the scheduled callbacks and
+        #: actions of the nodes in the scene with one pyglet.clock callback;
+        #: None (default) means each node registers with pyglet.clock. Must
+        #: be set before the scene enters the stage.
+        self.scheduler = None
+
+        #: a `cocos.render_graph.RenderGraph` to draw the scene from a
+        #: flattened draw list instead of walking the tree each frame;
+        #: None (default) means the scene is drawn by `CocosNode.visit`.
+        self.render_graph = None
+
     def on_enter(self):
         for c in self.get_children():
             c.parent = self
+        if self.scheduler is not None:
+            self.scheduler.start()
         super(Scene, self).on_enter()
         if self.music is not None:
             cocos.audio.music.control.load(self.music)
@@ -122,11 +135,27 @@ class Scene(cocosnode.CocosNode, EventHandlerMixin):
 
     def on_exit(self):
         super(Scene, self).on_exit()
+        if self.scheduler is not None:
+            self.scheduler.stop()
         # _apply_music after super, because is_running must be already False
         if self.music_playing:
             cocos.audio.music.control.stop()
 
 
+    def visit(self):
+        graph = self.render_graph
+        if (graph is None or not self.visible or
+                (self.grid and self.grid.active) or
+                self.camera.dirty or self.camera.once):
+            super(Scene, self).visit()
+        else:
+            graph.render(self)
+
+    def _find_scheduler(self):
+        if self.scheduler is not None:
+            return self.scheduler
+        return super(Scene, self)._find_scheduler()
+
     def push_all_handlers(self):
         for child in self.get_children():
             if isinstance(child, cocos.layer.Layer):
@@ -0,0 +1,360 @@
+# ----------------------------------------------------------------------------
+# cocos2d
+# Copyright (c) 2008-2012 Daniel Moisset, Ricardo Quesada, Rayentray Tappa,
+# Lucio Torre
+# Copyright (c) 2009-2014  Richard Jones, Claudio Canepa
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#   * Neither the name of cocos2d nor the names of its
+#     contributors may be used to endorse or promote products
+#     derived from this software without specific prior written
+#     permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# ----------------------------------------------------------------------------
+'''Central scheduler for the nodes in a scene
+
+By default each `CocosNode` registers its scheduled callbacks and its actions
+stepper with pyglet.clock, one by one, and unregisters them when the node
+leaves the stage. With thousands of nodes this makes scene changes slow.
+
+A `Scheduler` assigned to a scene replaces that: the scene registers only
+`Scheduler.tick` with pyglet.clock, and the nodes in the scene register their
+callbacks with the scheduler. Pausing or resuming the callbacks of a node is
+O(1), it only flips a flag.
+
+Usage::
+
+    scene = Scene(layer)
+    scene.scheduler = Scheduler()
+    director.run(scene)
+
+Callbacks run in order of ascending node `schedule_priority` (default 0),
+and in registration order for equal priorities.
+
+The scheduler can run with a fixed timestep, and can measure the time spent
+in each callback.
+'''
+
+from __future__ import division, print_function, unicode_literals
+
+__docformat__ = 'restructuredtext'
+
+__all__ = ['Scheduler']
+
+import bisect
+import time
+
+import pyglet
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+class _Slot(object):
+    """the callbacks of a node share a slot; pausing the slot pauses them"""
+    __slots__ = ('paused', 'evicted', 'entries')
+
+    def __init__(self):
+        self.paused = True
+        self.evicted = False
+        self.entries = []
+
+
+class _Entry(object):
+    __slots__ = ('key', 'node', 'slot', 'callback', 'args', 'kwargs',
+                 'interval', 'last_time', 'next_time', 'removed')
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+class Scheduler(object):
+    """
+    Calls the scheduled callbacks of the nodes in a scene from a single
+    pyglet.clock callback.
+
+    Nodes use it through `CocosNode.schedule`, `CocosNode.schedule_interval`,
+    `CocosNode.unschedule`, `CocosNode.pause_scheduler` and
+    `CocosNode.resume_scheduler`, and for the actions stepping.
+    """
+    def __init__(self, fixed_dt=None, profile=False):
+        """
+        :Parameters:
+            `fixed_dt` : float or None
+                If not None the callbacks are called with dt=fixed_dt, as
+                many times as needed to consume the time elapsed.
+            `profile` : bool
+                If True the time spent in each callback is accumulated; see
+                `cost_report`.
+        """
+        self.fixed_dt = fixed_dt
+        self.profile = profile
+
+        #: time elapsed, sum of the dt processed
+        self.time = 0.0
+        # time not consumed by fixed steps
+        self.accumulator = 0.0
+
+        # entries sorted by key (priority, sequence)
+        self.entries = []
+        # entries added while ticking
+        self.pending = []
+        self.ticking = False
+        self.num_removed = 0
+        self.num_paused_entries = 0
+        self.sequence = 0
+
+        # node -> _Slot
+        self.slots = {}
+        # node -> entry for node._step
+        self.action_entries = {}
+
+        # (node class name, callback name) -> [calls, seconds]
+        self.costs = {}
+
+    # pyglet.clock registration
+
+    def start(self):
+        """starts receiving ticks from pyglet.clock"""
+        pyglet.clock.schedule(self.tick)
+
+    def stop(self):
+        """stops receiving ticks from pyglet.clock"""
+        pyglet.clock.unschedule(self.tick)
+
+    # nodes
+
+    def adopt(self, node):
+        """
+        Registers all the callbacks of node, paused; `CocosNode.on_enter`
+        calls it when the node enters a scene using this scheduler.
+        """
+        slot = self.slots.get(node)
+        if slot is None or slot.evicted:
+            slot = self.slots[node] = _Slot()
+            for c, i, a, k in node.scheduled_interval_calls:
+                self._add(node, slot, c, i, a, k)
+            for c, a, k in node.scheduled_calls:
+                self._add(node, slot, c, 0.0, a, k)
+        return slot
+
+    def forget(self, node):
+        """unregisters all the callbacks of node; `CocosNode.remove` calls it
+        for the nodes it removes, so the scheduler doesn't keep them alive"""
+        slot = self.slots.pop(node, None)
+        if slot is not None:
+            for entry in slot.entries:
+                self._remove_entry(entry)
+            slot.entries = []
+        self.unschedule_actions(node)
+
+    def pause_node(self, node):
+        """pauses the scheduled callbacks of node, O(1)"""
+        slot = self.slots.get(node)
+        if slot is None or slot.paused:
+            return
+        slot.paused = True
+        self.num_paused_entries += len(slot.entries)
+
+    def resume_node(self, node):
+        """resumes the scheduled callbacks of node; O(1) unless the paused
+        callbacks were evicted by a compaction"""
+        slot = self.adopt(node)
+        if not slot.paused:
+            return
+        slot.paused = False
+        self.num_paused_entries -= len(slot.entries)
+        now = self.time
+        for entry in slot.entries:
+            entry.last_time = now
+            if entry.interval:
+                entry.next_time = now + entry.interval
+
+    # callbacks
+
+    # A node not adopted yet, or whose slot was evicted, is not running; its
+    # callbacks will be registered by adopt from the node lists.
+
+    def schedule(self, node, callback, *args, **kwargs):
+        """calls callback(dt, *args, **kwargs) each tick"""
+        slot = self.slots.get(node)
+        if slot is not None:
+            self._add(node, slot, callback, 0.0, args, kwargs)
+
+    def schedule_interval(self, node, callback, interval, *args, **kwargs):
+        """calls callback(dt, *args, **kwargs) every interval seconds"""
+        slot = self.slots.get(node)
+        if slot is not None:
+            self._add(node, slot, callback, interval, args, kwargs)
+
+    def unschedule(self, node, callback):
+        """removes all the registrations of callback for node"""
+        slot = self.slots.get(node)
+        if slot is None:
+            return
+        keep = []
+        for entry in slot.entries:
+            if entry.callback == callback:
+                self._remove_entry(entry)
+            else:
+                keep.append(entry)
+        slot.entries = keep
+
+    def schedule_actions(self, node):
+        """calls node._step each tick; not affected by pause_node"""
+        entry = self.action_entries.get(node)
+        if entry is None or entry.removed:
+            self.action_entries[node] = self._add(node, None, node._step, 0.0,
+                                                  (), {})
+
+    def unschedule_actions(self, node):
+        entry = self.action_entries.pop(node, None)
+        if entry is not None:
+            self._remove_entry(entry)
+
+    def _add(self, node, slot, callback, interval, args, kwargs):
+        entry = _Entry()
+        self.sequence += 1
+        entry.key = (getattr(node, 'schedule_priority', 0), self.sequence)
+        entry.node = node
+        entry.slot = slot
+        entry.callback = callback
+        entry.args = args
+        entry.kwargs = kwargs
+        entry.interval = interval
+        entry.last_time = self.time
+        entry.next_time = self.time + interval
+        entry.removed = False
+        if slot is not None:
+            slot.entries.append(entry)
+            if slot.paused:
+                self.num_paused_entries += 1
+        if self.ticking:
+            self.pending.append(entry)
+        else:
+            bisect.insort(self.entries, entry)
+        return entry
+
+    def _remove_entry(self, entry):
+        if entry.removed:
+            return
+        entry.removed = True
+        self.num_removed += 1
+        if entry.slot is not None and entry.slot.paused:
+            self.num_paused_entries -= 1
+        # the entry stays in self.entries until the next compaction, it must
+        # not keep the node alive meanwhile
+        entry.node = entry.callback = entry.args = entry.kwargs = None
+
+    def _compact(self):
+        # drops removed entries, and evicts the entries of paused nodes when
+        # they are the majority; resume_node re-registers them
+        live = len(self.entries) - self.num_removed
+        if self.num_paused_entries * 2 > live:
+            for node, slot in list(self.slots.items()):
+                if slot.paused:
+                    slot.evicted = True
+                    for entry in slot.entries:
+                        entry.removed = True
+                    del self.slots[node]
+            self.num_paused_entries = 0
+        self.entries = [e for e in self.entries if not e.removed]
+        self.num_removed = 0
+
+    # time
+
+    def tick(self, dt):
+        """advances time dt seconds, calling the due callbacks"""
+        if self.fixed_dt is None:
+            self._run(dt)
+        else:
+            self.accumulator += dt
+            fixed_dt = self.fixed_dt
+            while self.accumulator >= fixed_dt:
+                self._run(fixed_dt)
+                self.accumulator -= fixed_dt
+
+    def _run(self, dt):
+        self.time += dt
+        now = self.time
+        profile = self.profile
+        self.ticking = True
+        try:
+            for entry in self.entries:
+                if entry.removed:
+                    continue
+                slot = entry.slot
+                if slot is not None and slot.paused:
+                    continue
+                if entry.interval:
+                    if now < entry.next_time:
+                        continue
+                    elapsed = now - entry.last_time
+                    entry.next_time += entry.interval
+                    if entry.next_time <= now:
+                        entry.next_time = now + entry.interval
+                else:
+                    elapsed = now - entry.last_time
+                entry.last_time = now
+                if profile:
+                    start = _timer()
+                    entry.callback(elapsed, *entry.args, **entry.kwargs)
+                    self._add_cost(entry, _timer() - start)
+                else:
+                    entry.callback(elapsed, *entry.args, **entry.kwargs)
+        finally:
+            self.ticking = False
+        if self.pending:
+            for entry in self.pending:
+                if not entry.removed:
+                    bisect.insort(self.entries, entry)
+            self.pending = []
+        if (self.num_removed * 2 > len(self.entries) or
+            self.num_paused_entries * 2 > len(self.entries)):
+            self._compact()
+
+    # profiling
+
+    def _add_cost(self, entry, seconds):
+        callback = entry.callback
+        key = (type(entry.node).__name__,
+               getattr(callback, '__name__', repr(callback)))
+        cost = self.costs.get(key)
+        if cost is None:
+            cost = self.costs[key] = [0, 0.0]
+        cost[0] += 1
+        cost[1] += seconds
+
+    def cost_report(self):
+        """
+        Returns a list of (name, calls, total_seconds, mean_seconds) sorted
+        by descending total time, where name is 'NodeClass.callback_name';
+        only filled when profile is True.
+        """
+        report = [('%s.%s' % key, calls, total, total / calls)
+                  for key, (calls, total) in self.costs.items()]
+        report.sort(key=lambda r: -r[2])
+        return report
+
+    def reset_costs(self):
+        self.costs = {}
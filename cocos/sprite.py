@@ -74,7 +74,7 @@ import pyglet
 from pyglet import image
 from pyglet.gl import *
 
-from cocos.batch import BatchableNode
+from cocos.batch import BatchableNode, vertex_updates
 from cocos.rect import Rect
 from cocos import euclid
 
@@ -91,8 +91,19 @@ class Sprite( BatchableNode, pyglet.sprite.Sprite):
     Example::
 
         sprite = Sprite('grossini.png')
+
+    With ``deferred_updates`` True, changes to position, rotation, scale,
+    anchor or visibility don't rebuild the vertex list right away; it is
+    rebuilt once before drawing, however many changes were made. The number
+    of rebuilds avoided in the last frame is in
+    ``cocos.batch.vertex_updates.last_avoided``. Only a `BatchNode` or
+    `draw` rebuild the pending sprites, see `cocos.batch.vertex_updates`.
     '''
 
+    #: whether the vertex list rebuilds are deferred until drawing; can be
+    #: set per instance or for all sprites in the class
+    deferred_updates = False
+
     def __init__( self, image, position=(0,0), rotation=0, scale=1, opacity = 255, color=(255,255,255), anchor = None ):
         '''Initialize the sprite
 
@@ -200,6 +211,7 @@ class Sprite( BatchableNode, pyglet.sprite.Sprite):
 
         Returns a cocos.rect.Rect instance.
         '''
+        vertex_updates.flush_node(self)
         v = self._vertex_list.vertices
         x = v[0], v[2], v[4], v[6]
         y = v[1], v[3], v[5], v[7]
@@ -298,13 +310,35 @@ class Sprite( BatchableNode, pyglet.sprite.Sprite):
         If in a batch, this method is not called, and the draw is done by
         the batch.
         """
+        if self in vertex_updates.pending:
+            vertex_updates.flush()
         self._group.set_state()
         if self._vertex_list is not None:
             self._vertex_list.draw(GL_QUADS)
         self._group.unset_state()
 
+    def on_exit(self):
+        super(Sprite, self).on_exit()
+        # a pending update would keep the sprite alive until next flush
+        vertex_updates.flush_node(self)
+
+    def delete(self):
+        """Frees the vertex list; the sprite can't be drawn after"""
+        vertex_updates.discard(self)
+        super(Sprite, self).delete()
+
     def _update_position(self):
+        """updates vertex list, or defers it until drawing"""
+        if self.deferred_updates:
+            vertex_updates.mark(self)
+        else:
+            self.rebuild_vertexs()
+
+    def rebuild_vertexs(self):
         """updates vertex list"""
+        if self._vertex_list is None:
+            # deleted while its update was pending
+            return
         if not self._visible:
             self._vertex_list.vertices[:] = [0, 0, 0, 0, 0, 0, 0, 0]
             return
@@ -0,0 +1,391 @@
+# ----------------------------------------------------------------------------
+# cocos2d
+# Copyright (c) 2008-2012 Daniel Moisset, Ricardo Quesada, Rayentray Tappa,
+# Lucio Torre
+# Copyright (c) 2009-2014  Richard Jones, Claudio Canepa
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#   * Neither the name of cocos2d nor the names of its
+#     contributors may be used to endorse or promote products
+#     derived from this software without specific prior written
+#     permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# ----------------------------------------------------------------------------
+'''Many sprites with the same image in numpy arrays
+
+Each `cocos.sprite.Sprite` updates its own vertex list whenever its position,
+rotation or scale change. A `SpriteArray` instead keeps the attributes of
+many sprites in numpy arrays, one column per attribute, and computes all the
+quads in one vectorized pass when drawn, handing them to GL in one
+interleaved buffer with a single glDrawArrays call.
+
+Sprites are identified by index::
+
+    bullets = SpriteArray('bullet.png')
+    i = bullets.add_sprite(position=(100, 100), rotation=45)
+    bullets[i].position = (120, 100)
+    bullets.positions[:, 0] += 5    # move all of them at once
+
+`SpriteArray.__getitem__` returns a view with the common `Sprite`
+attributes, which actions can target::
+
+    bullets.do(MoveBy((100, 0), 1), target=bullets[i])
+
+Removed sprites leave a hidden slot, reused by the next `add_sprite`, so
+the indexes of the other sprites don't change.
+'''
+
+from __future__ import division, print_function, unicode_literals
+from six import string_types
+
+__docformat__ = 'restructuredtext'
+
+import pyglet
+from pyglet.gl import *
+
+from cocos.cocosnode import CocosNode
+from cocos.rect import Rect
+
+# numpy is only needed by SpriteArray
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['SpriteArray']
+
+
+class SpriteArray(CocosNode):
+    """
+    Draws many sprites sharing an image, see the module docs.
+
+    The attributes of the sprites are numpy arrays with one row per slot,
+    which can be modified in place:
+
+        - positions: (capacity, 2) float
+        - rotations, scales, scales_x, scales_y: (capacity,) float
+        - image_anchors: (capacity, 2) float
+        - colors: (capacity, 3) float, 0..255
+        - opacities: (capacity,) float, 0..255
+        - visibility: (capacity,) bool
+
+    The node attributes (position, rotation, scale, ...) transform the
+    whole array as with any `CocosNode`.
+
+    Only the first `size` slots are used; the arrays are replaced by bigger
+    ones when the capacity is exceeded, so don't keep references to them
+    across `add_sprite` calls.
+    """
+    def __init__(self, image, capacity=64, blend_additive=False):
+        """
+        :Parameters:
+            `image` : string or image
+                name of the image resource or a pyglet image.
+            `capacity` : int
+                initial number of slots, grows as needed.
+            `blend_additive` : bool
+                blend with GL_ONE instead of GL_ONE_MINUS_SRC_ALPHA
+        """
+        if numpy is None:
+            raise ImportError("SpriteArray needs numpy")
+        super(SpriteArray, self).__init__()
+        if isinstance(image, string_types):
+            image = pyglet.resource.image(image)
+        self.image = image
+        self.texture = image.get_texture()
+        self.blend_additive = blend_additive
+
+        #: number of slots in use, including removed ones not reused yet
+        self.size = 0
+        # removed slots, in removal order; the set for membership tests
+        self.free = []
+        self._free_set = set()
+
+        self.capacity = 0
+        self._resize(max(capacity, 1))
+
+    def _resize(self, capacity):
+        old_size = self.size
+        columns = [('positions', (2,), 0.0), ('rotations', (), 0.0),
+                   ('scales', (), 1.0), ('scales_x', (), 1.0),
+                   ('scales_y', (), 1.0), ('image_anchors', (2,), 0.0),
+                   ('colors', (3,), 255.0), ('opacities', (), 255.0)]
+        for name, shape, default in columns:
+            column = numpy.empty((capacity,) + shape)
+            column[:] = default
+            if old_size:
+                column[:old_size] = getattr(self, name)[:old_size]
+            setattr(self, name, column)
+        visible = numpy.zeros(capacity, bool)
+        if old_size:
+            visible[:old_size] = self.visibility[:old_size]
+        self.visibility = visible
+
+        # interleaved quads, 4 vertexs per sprite: x, y, r, g, b, a, u, v
+        buffer = numpy.zeros((capacity * 4, 8), numpy.float32)
+        tc = self.texture.tex_coords
+        buffer[:, 6:8] = numpy.tile([[tc[0], tc[1]], [tc[3], tc[4]],
+                                     [tc[6], tc[7]], [tc[9], tc[10]]],
+                                    (capacity, 1))
+        self.quads_buffer = buffer
+        self.capacity = capacity
+
+    # sprites
+
+    def add_sprite(self, position=(0, 0), rotation=0, scale=1, opacity=255,
+                   color=(255, 255, 255), anchor=None):
+        """
+        Adds a sprite, with the same parameters as `cocos.sprite.Sprite`
+        besides the image, and returns its index.
+        """
+        if self.free:
+            i = self.free.pop()
+            self._free_set.discard(i)
+        else:
+            if self.size == self.capacity:
+                self._resize(self.capacity * 2)
+            i = self.size
+            self.size += 1
+        if anchor is None:
+            anchor = (self.image.width // 2, self.image.height // 2)
+        self.positions[i] = position
+        self.rotations[i] = rotation
+        self.scales[i] = scale
+        self.scales_x[i] = 1.0
+        self.scales_y[i] = 1.0
+        self.image_anchors[i] = anchor
+        self.colors[i] = color
+        self.opacities[i] = opacity
+        self.visibility[i] = True
+        return i
+
+    def remove_sprite(self, index):
+        """hides the sprite, its slot will be reused by `add_sprite`
+
+        Raises IndexError if there is no sprite at index, because it is out
+        of range or was already removed.
+        """
+        if not 0 <= index < self.size or index in self._free_set:
+            raise IndexError("No sprite at index %s" % index)
+        self.visibility[index] = False
+        self.free.append(index)
+        self._free_set.add(index)
+
+    def _get_num_sprites(self):
+        return self.size - len(self.free)
+
+    num_sprites = property(_get_num_sprites, doc='number of sprites, read-only')
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return _SpriteView(self, index)
+
+    # drawing
+
+    def fill_buffer(self):
+        """writes the quads of the sprites in the buffer, in the node
+        coordinates, and returns (buffer, number of vertexs)"""
+        n = self.size
+        buffer = self.quads_buffer
+        if n == 0:
+            return buffer, 0
+        quads = buffer[:n * 4].reshape(n, 4, 8)
+
+        sx = self.scales[:n] * self.scales_x[:n]
+        sy = self.scales[:n] * self.scales_y[:n]
+        x1 = -self.image_anchors[:n, 0] * sx
+        y1 = -self.image_anchors[:n, 1] * sy
+        x2 = x1 + self.image.width * sx
+        y2 = y1 + self.image.height * sy
+        r = numpy.radians(-self.rotations[:n])
+        cr = numpy.cos(r)
+        sr = numpy.sin(r)
+        x = self.positions[:n, 0]
+        y = self.positions[:n, 1]
+        # hidden sprites collapse to a point
+        hidden = ~self.visibility[:n]
+        for corner, (cx, cy) in enumerate([(x1, y1), (x2, y1),
+                                           (x2, y2), (x1, y2)]):
+            vx = cx * cr - cy * sr + x
+            vy = cx * sr + cy * cr + y
+            vx[hidden] = 0.0
+            vy[hidden] = 0.0
+            quads[:, corner, 0] = vx
+            quads[:, corner, 1] = vy
+
+        colors = quads[:, :, 2:6]
+        colors[:, :, 0:3] = (self.colors[:n] / 255.0)[:, numpy.newaxis, :]
+        colors[:, :, 3] = (self.opacities[:n] / 255.0)[:, numpy.newaxis]
+        return buffer, n * 4
+
+    def draw(self):
+        buffer, num_vertexs = self.fill_buffer()
+        if num_vertexs == 0:
+            return
+
+        glPushMatrix()
+        self.transform()
+
+        # color preserve - at least intel 945G needs that
+        glPushAttrib(GL_CURRENT_BIT)
+        glPushAttrib(GL_COLOR_BUFFER_BIT)
+        glEnable(self.texture.target)
+        glBindTexture(self.texture.target, self.texture.id)
+        glEnable(GL_BLEND)
+        if self.blend_additive:
+            glBlendFunc(GL_SRC_ALPHA, GL_ONE)
+        else:
+            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+        # one interleaved buffer, stride 8 floats
+        buffer_ptr = buffer.ctypes.data
+        stride = buffer.strides[0]
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_FLOAT, stride, buffer_ptr)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glColorPointer(4, GL_FLOAT, stride, buffer_ptr + 2 * 4)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glTexCoordPointer(2, GL_FLOAT, stride, buffer_ptr + 6 * 4)
+
+        glDrawArrays(GL_QUADS, 0, num_vertexs)
+
+        # disable states
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisable(self.texture.target)
+
+        # un -blend
+        glPopAttrib()
+
+        # color restore
+        glPopAttrib()
+
+        glPopMatrix()
+
+
+class _SpriteView(object):
+    """one sprite of a `SpriteArray`, with the common `Sprite` attributes"""
+    __slots__ = ('array', 'index')
+
+    def __init__(self, array, index):
+        self.array = array
+        self.index = index
+
+    def _get_position(self):
+        x, y = self.array.positions[self.index]
+        return float(x), float(y)
+
+    def _set_position(self, p):
+        self.array.positions[self.index] = p
+
+    position = property(_get_position, _set_position)
+
+    def _get_x(self):
+        return float(self.array.positions[self.index, 0])
+
+    def _set_x(self, x):
+        self.array.positions[self.index, 0] = x
+
+    x = property(_get_x, _set_x)
+
+    def _get_y(self):
+        return float(self.array.positions[self.index, 1])
+
+    def _set_y(self, y):
+        self.array.positions[self.index, 1] = y
+
+    y = property(_get_y, _set_y)
+
+    def _make_scalar(name):
+        def get_attr(self):
+            return float(getattr(self.array, name)[self.index])
+        def set_attr(self, value):
+            getattr(self.array, name)[self.index] = value
+        return property(get_attr, set_attr)
+
+    rotation = _make_scalar('rotations')
+    scale = _make_scalar('scales')
+    scale_x = _make_scalar('scales_x')
+    scale_y = _make_scalar('scales_y')
+    opacity = _make_scalar('opacities')
+    del _make_scalar
+
+    def _get_color(self):
+        r, g, b = self.array.colors[self.index]
+        return int(r), int(g), int(b)
+
+    def _set_color(self, color):
+        self.array.colors[self.index] = color
+
+    color = property(_get_color, _set_color)
+
+    def _get_visible(self):
+        return bool(self.array.visibility[self.index])
+
+    def _set_visible(self, visible):
+        self.array.visibility[self.index] = visible
+
+    visible = property(_get_visible, _set_visible)
+
+    def _get_anchor(self):
+        x, y = self.array.image_anchors[self.index]
+        return float(x), float(y)
+
+    def _set_anchor(self, anchor):
+        self.array.image_anchors[self.index] = anchor
+
+    image_anchor = property(_get_anchor, _set_anchor)
+
+    def _get_width(self):
+        a = self.array
+        i = self.index
+        return int(a.image.width * a.scales[i] * a.scales_x[i])
+
+    width = property(_get_width, doc='Scaled width of the sprite, read-only')
+
+    def _get_height(self):
+        a = self.array
+        i = self.index
+        return int(a.image.height * a.scales[i] * a.scales_y[i])
+
+    height = property(_get_height, doc='Scaled height of the sprite, read-only')
+
+    def get_rect(self):
+        '''Get a cocos.rect.Rect for this sprite, as `Sprite.get_rect`'''
+        x, y = self.position
+        ax, ay = self.image_anchor
+        return Rect(x - ax, y - ay, self.width, self.height)
+
+    def contains(self, x, y):
+        '''Test whether this (untransformed) sprite contains the pixel
+        coordinates given, as `Sprite.contains`'''
+        sx, sy = self.position
+        ax, ay = self.image_anchor
+        sx -= ax
+        sy -= ay
+        if x < sx or x > sx + self.width: return False
+        if y < sy or y > sy + self.height: return False
+        return True
@@ -0,0 +1,50 @@
+from __future__ import division, print_function, unicode_literals
+
+# This code is so you can run the samples without installing the package
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+#
+
+testinfo = "f 10 0.033, s, f 20 0.033, s, f 30 0.033, s, q"
+tags = "particles, ParticleBatch"
+
+import pyglet
+import cocos
+from cocos.director import director
+from cocos.layer import *
+from cocos.particle import ParticleBatch
+from cocos.particle_systems import *
+
+class Torch(Fire):
+    total_particles = 40
+    emission_rate = total_particles / Fire.life
+    size = 20.0
+
+class L(Layer):
+    def __init__(self):
+        super( L, self).__init__()
+        # 200 small emitters drawn by the batch with one draw call per
+        # (texture, blend) group
+        batch = ParticleBatch()
+        for i in range(200):
+            if i % 4 == 0:
+                p = Smoke()
+                p.scale = 0.2
+            else:
+                p = Torch()
+            p.position = (20 + (i % 20) * 30, 40 + (i // 20) * 45)
+            self.add( p )
+            batch.register( p )
+        self.add( batch, z=1 )
+
+def main():
+    director.init( resizable=True )
+    main_scene = cocos.scene.Scene()
+
+    main_scene.add( L() )
+
+    director.run( main_scene )
+
+if __name__ == '__main__':
+    main()
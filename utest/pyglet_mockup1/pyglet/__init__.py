@@ -3,7 +3,8 @@ from __future__ import division, print_function, unicode_literals
 mock_level = 1
 import pyglet.resource
 import pyglet.app
-#import sprite
+import pyglet.image
+import pyglet.sprite
 
 version = "1.1.4"
 
@@ -1,6 +1,10 @@
 # gl
 from __future__ import division, print_function, unicode_literals
 
+import ctypes
+
+GLfloat = ctypes.c_float
+
 
 GL_BLEND = 3042
 GL_ZERO = 0     # /usr/include/GL/gl.h:147
@@ -54,6 +58,18 @@ def glPushMatrix():
 def glPopMatrix():
     pass
 
+def glMultMatrixf(a1):
+    pass
+
+def glTranslatef(a1, a2, a3):
+    pass
+
+def glRotatef(a1, a2, a3, a4):
+    pass
+
+def glScalef(a1, a2, a3):
+    pass
+
 def glBindTexture(a1, a2):
     pass
 
@@ -0,0 +1,56 @@
+# sprite
+from __future__ import division, print_function, unicode_literals
+
+# keeps only the state that cocos.sprite.Sprite uses to build its vertex
+# list; there is no batch, group nor drawing
+
+
+class _VertexList(object):
+    def __init__(self):
+        self.vertices = [0] * 8
+
+    def draw(self, *args, **kwargs):
+        pass
+
+    def delete(self):
+        pass
+
+
+class Sprite(object):
+    def __init__(self, img, x=0, y=0, *args, **kwargs):
+        self.image = img
+        self._texture = img.get_texture()
+        self._x = x
+        self._y = y
+        self._rotation = 0
+        self._scale = 1.0
+        self._visible = True
+        self._vertex_list = _VertexList()
+        self._update_position()
+
+    def delete(self):
+        self._vertex_list = None
+
+    def set_position(self, x, y):
+        self._x = x
+        self._y = y
+        self._update_position()
+
+    def _set_x(self, x):
+        self._x = x
+        self._update_position()
+
+    def _set_y(self, y):
+        self._y = y
+        self._update_position()
+
+    def _set_rotation(self, rotation):
+        self._rotation = rotation
+        self._update_position()
+
+    def _set_scale(self, scale):
+        self._scale = scale
+        self._update_position()
+
+    def _update_position(self):
+        pass
@@ -0,0 +1,165 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+import copy
+
+from cocos.director import director
+from cocos.cocosnode import CocosNode
+import cocos.actions as ac
+
+director.init()
+
+fe = 1.0e-4
+
+def make_node(i):
+    node = CocosNode()
+    node.position = (i * 10.0, 5.0)
+    node.rotation = i * 20.0
+    node.scale = 1.0 + i * 0.1
+    node.opacity = 100 + i
+    return node
+
+def node_state(node):
+    return (node.position[0], node.position[1], node.rotation, node.scale,
+            node.opacity)
+
+def assert_same_state(node_a, node_b):
+    for a, b in zip(node_state(node_a), node_state(node_b)):
+        assert abs(a - b) < fe
+
+templates = [ac.MoveBy((100, -50), 2), ac.MoveTo((300, 200), 1.5),
+             ac.RotateBy(270, 1), ac.RotateTo(10, 1), ac.ScaleBy(2.0, 1),
+             ac.ScaleTo(0.5, 3), ac.FadeTo(20, 1), ac.FadeOut(2),
+             ac.FadeIn(0.5), ac.MoveBy((10, 10), 0)]
+
+def test_batched_actions_match_action_step():
+    manager = ac.ActionManager()
+    dts = [0.1, 0.35, 0.2, 0.5, 1.0, 0.7, 0.4]
+    for i, template in enumerate(templates):
+        reference = make_node(i)
+        batched = make_node(i)
+        a = copy.deepcopy(template)
+        a.target = reference
+        a.start()
+        manager.do(template, batched)
+        finished = False
+        for dt in dts:
+            # as CocosNode._step does
+            if not finished:
+                a.step(dt)
+                finished = a.done()
+            manager.step(dt)
+            assert_same_state(reference, batched)
+    # all finished
+    assert len(manager) == 0
+    assert not manager.are_actions_running()
+
+def test_many_targets_same_group():
+    manager = ac.ActionManager()
+    nodes = [make_node(i) for i in range(100)]
+    for node in nodes:
+        manager.do(ac.MoveBy((100, 0), 1), node)
+    assert len(manager.groups) == 1
+    manager.step(0.5)
+    for i, node in enumerate(nodes):
+        assert abs(node.position[0] - (i * 10.0 + 50.0)) < fe
+
+def test_remove_action_and_unsupported_actions():
+    manager = ac.ActionManager()
+    node = make_node(0)
+    move = manager.do(ac.MoveBy((100, 0), 1), node)
+    manager.step(0.5)
+    manager.remove_action(move)
+    assert move.target is None
+    manager.step(0.5)
+    assert abs(node.position[0] - 50.0) < fe
+
+    # not batchable, runs in the node
+    jump = manager.do(ac.JumpBy((10, 0), 10, 1, 1), node)
+    assert jump in node.actions
+    assert len(manager) == 0
+
+def test_pause_resume():
+    manager = ac.ActionManager()
+    node = make_node(0)
+    manager.do(ac.MoveBy((100, 0), 1), node)
+    manager.pause()
+    manager.step(0.5)
+    assert abs(node.position[0]) < fe
+    manager.resume()
+    manager.step(0.5)
+    assert abs(node.position[0] - 50.0) < fe
+
+def make_mover_node(i):
+    node = make_node(i)
+    node.velocity = (30.0 * i - 40.0, 10.0 - 5.0 * i)
+    if i % 2:
+        node.acceleration = (5.0, -3.0)
+    if i % 3:
+        node.gravity = -9.8
+    if i % 4:
+        node.dr = 20.0
+        node.ddr = i - 3.0
+    node.width = 16
+    node.height = 8
+    return node
+
+def node_kinematics(node):
+    return (node.position[0], node.position[1], node.velocity[0],
+            node.velocity[1], node.rotation, getattr(node, 'dr', 0))
+
+def test_swarm_mover_matches_move_actions():
+    for edges, move in [(None, ac.Move()),
+                        ('wrap', ac.WrappedMove(100, 80)),
+                        ('bound', ac.BoundedMove(100, 80))]:
+        mover = ac.SwarmMover(edges, 100, 80)
+        # more nodes than the initial capacity
+        pairs = [(make_mover_node(i % 8), make_mover_node(i % 8))
+                 for i in range(100)]
+        actions = []
+        for reference, moved in pairs:
+            a = copy.deepcopy(move)
+            a.target = reference
+            a.start()
+            actions.append(a)
+            mover.add(moved)
+        assert len(mover) == 100
+        for dt in [0.1, 0.5, 0.25, 1.0]:
+            for a in actions:
+                a.step(dt)
+            mover.step(dt)
+            for reference, moved in pairs:
+                for a, b in zip(node_kinematics(reference),
+                                node_kinematics(moved)):
+                    assert abs(a - b) < fe
+
+def test_swarm_mover_remove_and_refresh():
+    mover = ac.SwarmMover()
+    nodes = [make_mover_node(i) for i in range(5)]
+    for node in nodes:
+        mover.add(node)
+    mover.remove(nodes[1])
+    assert nodes[1] not in mover and len(mover) == 4
+    position = nodes[1].position
+    nodes[2].position = (0.0, 0.0)
+    nodes[2].velocity = (10.0, 0.0)
+    nodes[2].acceleration = (0.0, 0.0)
+    nodes[2].gravity = 0
+    mover.refresh(nodes[2])
+    mover.step(1.0)
+    assert nodes[1].position == position
+    assert abs(nodes[2].position[0] - 10.0) < fe
+    assert abs(nodes[2].position[1]) < fe
+    # the last node was moved to the removed slot
+    assert mover.nodes[1] is nodes[4]
@@ -0,0 +1,77 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+import random
+
+import pytest
+
+from cocos.director import director
+from cocos.cocosnode import CocosNode
+
+director.init()
+
+def test_children_sorted_by_z_then_insertion():
+    rand = random.Random(3)
+    parent = CocosNode()
+    expected = []
+    for i in range(200):
+        child = CocosNode()
+        z = rand.randint(-3, 3)
+        parent.add(child, z=z)
+        expected.append((z, i, child))
+        if i % 17 == 0:
+            # reading in the middle compacts
+            assert len(parent.children) == i + 1
+    expected.sort(key=lambda e: (e[0], e[1]))
+    assert parent.children == [(z, c) for z, i, c in expected]
+    assert parent.get_children() == [c for z, i, c in expected]
+
+def test_remove_and_add_again():
+    parent = CocosNode()
+    a, b, c = CocosNode(), CocosNode(), CocosNode()
+    parent.add(a, z=1)
+    parent.add(b, z=1)
+    parent.add(c, z=0)
+    parent.remove(a)
+    assert a not in parent
+    parent.add(a, z=-1)
+    assert a in parent
+    assert parent.children == [(-1, a), (0, c), (1, b)]
+    b.kill()
+    assert parent.get_children() == [a, c]
+    with pytest.raises(Exception):
+        parent.remove(b)
+
+def test_remove_while_iterating():
+    parent = CocosNode()
+    kids = [CocosNode() for i in range(10)]
+    for child in kids:
+        parent.add(child)
+    seen = []
+    for z, child in parent.children:
+        seen.append(child)
+        if len(seen) == 2:
+            for other in kids[5:]:
+                other.kill()
+    assert seen == kids
+    assert parent.get_children() == kids[:5]
+
+def test_walk():
+    root = CocosNode()
+    a, b = CocosNode(), CocosNode()
+    root.add(a, z=2)
+    root.add(b, z=1)
+    a.add(CocosNode())
+    assert len(root.walk(lambda node: node)) == 4
+    assert root.walk(lambda node: node)[1] is b
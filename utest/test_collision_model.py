@@ -134,6 +134,18 @@ def pytest_generate_tests(metafunc):
              [0.0, 100.0, 0.0, 100.0, 2.0, 2.0],
              (2.0, 2.0)
              ),
+        "SweepAndPrune":
+            ('CollisionManagerSweepAndPrune', [], (2.2, 3.7)),
+        "HierarchicalGrid, objects at finest level":
+            ('CollisionManagerHierarchicalGrid', [4.0], (2.0, 2.0)),
+        "HierarchicalGrid, objects at different levels":
+            ('CollisionManagerHierarchicalGrid', [0.25], (4.0, 4.0)),
+        "Numpy, automatic cell size":
+            ('CollisionManagerNumpy', [], (2.2, 3.7)),
+        "Numpy, parallel stripes":
+            ('CollisionManagerNumpy', [None, None, 3], (4.0, 4.0)),
+        "Numpy, target bigger than cell":
+            ('CollisionManagerNumpy', [2.0, 2.0], (2.0, 2.0)),
         }
 
     for name in cases:
@@ -73,3 +73,358 @@ def test_ops_near_boundaries():
 
     nears = collman.objs_near(lo_lo, w_width + w_height)
     assert set(nears) == set([lo_hi, hi_lo, hi_hi])
+
+def test_numpy_all_collisions_match_bruteforce():
+    import random
+    rnd = random.Random(1234)
+    brute = cm.CollisionManagerBruteForce()
+    collman = cm.CollisionManagerNumpy()
+    for i in range(300):
+        center = eu.Vector2(rnd.uniform(-50.0, 250.0), rnd.uniform(0.0, 100.0))
+        obj = create_obj_with_circle('%d' % i, center, rnd.uniform(0.5, 6.0))
+        brute.add(obj)
+        collman.add(obj)
+
+    def as_pairs(pairs):
+        return set(frozenset(pair) for pair in pairs)
+
+    expected = list(brute.iter_all_collisions())
+    got = list(collman.iter_all_collisions())
+    assert len(got) == len(expected)
+    assert as_pairs(got) == as_pairs(expected)
+
+    for obj in list(brute.known_objs())[:20]:
+        assert set(collman.objs_colliding(obj)) == set(brute.objs_colliding(obj))
+        assert set(collman.objs_near(obj, 3.0)) == set(brute.objs_near(obj, 3.0))
+
+def test_numpy_big_objects_among_small_ones():
+    import random
+    rnd = random.Random(4321)
+    objs = []
+    for i in range(400):
+        center = eu.Vector2(rnd.uniform(0.0, 400.0), rnd.uniform(0.0, 200.0))
+        r = rnd.uniform(1.0, 3.0)
+        if i % 2:
+            cshape = cm.AARectShape(center, r, r)
+        else:
+            cshape = cm.CircleShape(center, r)
+        objs.append(Obj_with_shape('%d' % i, cshape))
+    # a huge circle, and two long slabs crossing it and each other
+    objs.append(create_obj_with_circle('boss', eu.Vector2(200.0, 100.0), 80.0))
+    objs.append(Obj_with_shape(
+        'h_slab', cm.AARectShape(eu.Vector2(150.0, 60.0), 150.0, 4.0)))
+    objs.append(Obj_with_shape(
+        'v_slab', cm.AARectShape(eu.Vector2(120.0, 100.0), 4.0, 90.0)))
+
+    brute = cm.CollisionManagerBruteForce()
+    serial = cm.CollisionManagerNumpy()
+    parallel = cm.CollisionManagerNumpy(workers=3)
+    for obj in objs:
+        brute.add(obj)
+        serial.add(obj)
+        parallel.add(obj)
+
+    # the cells fit the small objects, not the boss
+    cell_width, cell_height = serial._cell_sides(serial._arrays())
+    assert cell_width <= 6.0 and cell_height <= 6.0
+
+    def as_pairs(pairs):
+        return set(frozenset(pair) for pair in pairs)
+
+    expected = list(brute.iter_all_collisions())
+    try:
+        for collman in [serial, parallel]:
+            got = list(collman.iter_all_collisions())
+            assert len(got) == len(expected)
+            assert as_pairs(got) == as_pairs(expected)
+    finally:
+        parallel.close()
+    names = set(obj.name for pair in as_pairs(expected) for obj in pair)
+    assert set(['boss', 'h_slab', 'v_slab']) <= names
+
+def test_update_moved_objects():
+    collmans = [cm.CollisionManagerBruteForce(),
+                cm.CollisionManagerGrid(0.0, 100.0, 0.0, 100.0, 4.0, 4.0),
+                cm.CollisionManagerSweepAndPrune(),
+                cm.CollisionManagerHierarchicalGrid(2.0),
+                cm.CollisionManagerNumpy()]
+    for collman in collmans:
+        static = create_obj_with_circle('static', eu.Vector2(10.0, 10.0), 1.0)
+        mover = create_obj_with_circle('mover', eu.Vector2(50.0, 50.0), 1.0)
+        collman.add(static)
+        collman.add(mover)
+        assert not collman.objs_colliding(static)
+
+        # move into the static object, crossing cells
+        mover.cshape.center = eu.Vector2(11.0, 10.0)
+        collman.update(mover)
+        assert set(collman.objs_colliding(static)) == set([mover])
+        assert set(collman.objs_colliding(mover)) == set([static])
+
+        # move inside the same cells
+        mover.cshape.center = eu.Vector2(11.5, 10.0)
+        collman.update_many([mover, static])
+        assert set(collman.objs_colliding(static)) == set([mover])
+
+        # after update, remove_tricky must not leak
+        collman.remove_tricky(mover)
+        assert not collman.knows(mover)
+        assert collman.known_objs() == set([static])
+        assert not collman.objs_colliding(static)
+
+def test_sweep_and_prune_tracks_moving_objects():
+    import random
+    rnd = random.Random(4321)
+    brute = cm.CollisionManagerBruteForce()
+    collman = cm.CollisionManagerSweepAndPrune()
+    objs = []
+    for i in range(200):
+        center = eu.Vector2(rnd.uniform(0.0, 5000.0), rnd.uniform(0.0, 50.0))
+        obj = create_obj_with_circle('%d' % i, center, rnd.uniform(1.0, 20.0))
+        objs.append(obj)
+        brute.add(obj)
+        collman.add(obj)
+
+    def as_pairs(pairs):
+        return set(frozenset(pair) for pair in pairs)
+
+    for frame in range(5):
+        for obj in objs:
+            obj.cshape.center += eu.Vector2(rnd.uniform(-15.0, 15.0),
+                                            rnd.uniform(-15.0, 15.0))
+        collman.update_many(objs)
+        expected = list(brute.iter_all_collisions())
+        got = list(collman.iter_all_collisions())
+        assert len(got) == len(expected)
+        assert as_pairs(got) == as_pairs(expected)
+        for obj in objs[:10]:
+            assert (set(collman.objs_near(obj, 5.0)) ==
+                    set(brute.objs_near(obj, 5.0)))
+
+    for obj in objs[::2]:
+        collman.remove_tricky(obj)
+    assert collman.known_objs() == set(objs[1::2])
+
+def test_sweep_and_prune_remove_while_iterating():
+    collman = cm.CollisionManagerSweepAndPrune()
+    objs = [create_obj_with_circle('%d' % i, eu.Vector2(i * 1.0, 0.0), 2.0)
+            for i in range(6)]
+    for obj in objs:
+        collman.add(obj)
+    removed = set()
+    for obj, other in collman.iter_all_collisions():
+        assert obj not in removed and other not in removed
+        # as a game killing both actors of a collision
+        for o in (obj, other):
+            collman.remove_tricky(o)
+            removed.add(o)
+    assert len(removed) == 6 and not collman.known_objs()
+
+def test_hierarchical_grid_mixed_sizes():
+    import random
+    rnd = random.Random(2468)
+    brute = cm.CollisionManagerBruteForce()
+    collman = cm.CollisionManagerHierarchicalGrid(16.0)
+    objs = []
+    for i in range(300):
+        center = eu.Vector2(rnd.uniform(-500.0, 3000.0), rnd.uniform(0.0, 800.0))
+        # mostly small objects, some huge ones
+        r = rnd.choice([4.0, 8.0, 8.0, 8.0, 60.0, 400.0])
+        obj = create_obj_with_circle('%d' % i, center, r)
+        objs.append(obj)
+        brute.add(obj)
+        collman.add(obj)
+    assert len(collman.levels) > 1
+
+    def as_pairs(pairs):
+        return set(frozenset(pair) for pair in pairs)
+
+    expected = list(brute.iter_all_collisions())
+    got = list(collman.iter_all_collisions())
+    assert len(got) == len(expected)
+    assert as_pairs(got) == as_pairs(expected)
+    for obj in objs[:30]:
+        assert set(collman.objs_colliding(obj)) == set(brute.objs_colliding(obj))
+        assert set(collman.objs_near(obj, 20.0)) == set(brute.objs_near(obj, 20.0))
+    assert (collman.objs_into_box(0.0, 1000.0, 0.0, 400.0) ==
+            brute.objs_into_box(0.0, 1000.0, 0.0, 400.0))
+    assert (collman.objs_touching_point(100.0, 100.0) ==
+            brute.objs_touching_point(100.0, 100.0))
+
+def test_circle_aarect_pair_functions():
+    rect = cm.AARectShape(eu.Vector2(0.0, 0.0), 2.0, 1.0)
+    # circle near the rect corner, euclidean distance to the corner is 1.0
+    corner = cm.CircleShape(eu.Vector2(2.0 + 0.6, 1.0 + 0.8), 0.5)
+    assert not rect.overlaps(corner)
+    assert not corner.overlaps(rect)
+    assert abs(rect.distance(corner) - 0.5) < fe
+    assert abs(corner.distance(rect) - 0.5) < fe
+    assert corner.near_than(rect, 0.5 + fe)
+    assert not rect.near_than(corner, 0.5 - fe)
+
+    # circle over the rect side
+    side = cm.CircleShape(eu.Vector2(0.0, 1.4), 0.5)
+    assert rect.overlaps(side) and side.overlaps(rect)
+    assert rect.distance(side) == 0.0
+
+    # circle center inside the rect
+    inside = cm.CircleShape(eu.Vector2(1.0, 0.0), 0.1)
+    assert rect.overlaps(inside) and inside.overlaps(rect)
+
+def test_shapes_without_kind():
+    # user cshapes that only duck type the same class, no 'kind' attribute
+    class Disc(object):
+        def __init__(self, center, r):
+            self.center = center
+            self.r = r
+
+    class Box(object):
+        def __init__(self, center, rx, ry):
+            self.center = center
+            self.rx = rx
+            self.ry = ry
+
+    circle = cm.CircleShape(eu.Vector2(0.0, 0.0), 1.0)
+    assert circle.overlaps(Disc(eu.Vector2(1.5, 0.0), 1.0))
+    assert abs(circle.distance(Disc(eu.Vector2(3.0, 0.0), 1.0)) - 1.0) < fe
+    assert circle.near_than(Disc(eu.Vector2(3.0, 0.0), 1.0), 1.0 + fe)
+    rect = cm.AARectShape(eu.Vector2(0.0, 0.0), 2.0, 1.0)
+    assert not rect.overlaps(Box(eu.Vector2(5.0, 0.0), 2.0, 1.0))
+    assert abs(rect.distance(Box(eu.Vector2(5.0, 0.0), 2.0, 1.0)) - 1.0) < fe
+    assert rect.near_than(Box(eu.Vector2(5.0, 0.0), 2.0, 1.0), 1.0 + fe)
+
+    collman = cm.CollisionManagerNumpy()
+    disc = Obj_with_shape('disc', Disc(eu.Vector2(1.5, 0.0), 1.0))
+    box = Obj_with_shape('box', Box(eu.Vector2(0.0, 3.0), 2.0, 1.0))
+    collman.add(disc)
+    collman.add(box)
+    probe = create_obj_with_circle('probe', eu.Vector2(0.0, 0.0), 1.0)
+    assert collman.objs_colliding(probe) == [disc]
+    assert set(collman.objs_near(probe, 1.0 + fe)) == set([disc, box])
+
+def test_mixed_shapes_match_bruteforce():
+    import random
+    rnd = random.Random(1357)
+    brute = cm.CollisionManagerBruteForce()
+    collmans = [cm.CollisionManagerGrid(0.0, 400.0, 0.0, 400.0, 10.0, 10.0),
+                cm.CollisionManagerSweepAndPrune(),
+                cm.CollisionManagerHierarchicalGrid(4.0),
+                cm.CollisionManagerNumpy()]
+    objs = []
+    for i in range(300):
+        center = eu.Vector2(rnd.uniform(0.0, 400.0), rnd.uniform(0.0, 400.0))
+        if i % 2:
+            shape = cm.CircleShape(center, rnd.uniform(1.0, 8.0))
+        else:
+            shape = cm.AARectShape(center, rnd.uniform(1.0, 8.0),
+                                   rnd.uniform(1.0, 8.0))
+        objs.append(Obj_with_shape('%d' % i, shape))
+    for obj in objs:
+        brute.add(obj)
+        for collman in collmans:
+            collman.add(obj)
+
+    def as_pairs(pairs):
+        return set(frozenset(pair) for pair in pairs)
+
+    expected = as_pairs(brute.iter_all_collisions())
+    for collman in collmans:
+        assert as_pairs(collman.iter_all_collisions()) == expected
+        for obj in objs[:20]:
+            assert (set(collman.objs_colliding(obj)) ==
+                    set(brute.objs_colliding(obj)))
+            assert (set(collman.objs_near(obj, 4.0)) ==
+                    set(brute.objs_near(obj, 4.0)))
+            expected_d = dict(brute.objs_near_wdistance(obj, 4.0))
+            got_d = dict(collman.objs_near_wdistance(obj, 4.0))
+            assert set(got_d) == set(expected_d)
+            for other in got_d:
+                assert abs(got_d[other] - expected_d[other]) < fe
+        assert (collman.objs_touching_point(200.0, 200.0) ==
+                brute.objs_touching_point(200.0, 200.0))
+
+def test_segment_hit():
+    circle = cm.CircleShape(eu.Vector2(5.0, 0.0), 1.0)
+    assert abs(circle.segment_hit(0.0, 0.0, 10.0, 0.0) - 0.4) < fe
+    assert circle.segment_hit(0.0, 2.0, 10.0, 2.0) is None
+    assert circle.segment_hit(0.0, 0.0, 3.0, 0.0) is None
+    assert circle.segment_hit(5.0, 0.5, 10.0, 0.0) == 0.0
+    rect = cm.AARectShape(eu.Vector2(5.0, 0.0), 1.0, 2.0)
+    assert abs(rect.segment_hit(0.0, 0.0, 10.0, 0.0) - 0.4) < fe
+    assert abs(rect.segment_hit(5.0, 10.0, 5.0, 0.0) - 0.8) < fe
+    assert rect.segment_hit(0.0, 3.0, 10.0, 3.0) is None
+    assert rect.segment_hit(5.0, 0.0, 6.0, 6.0) == 0.0
+
+def test_knn_and_segment_match_bruteforce():
+    import random
+    rnd = random.Random(97531)
+    brute = cm.CollisionManagerBruteForce()
+    collmans = [cm.CollisionManagerGrid(0.0, 400.0, 0.0, 300.0, 12.0, 12.0),
+                cm.CollisionManagerSweepAndPrune(),
+                cm.CollisionManagerHierarchicalGrid(4.0),
+                cm.CollisionManagerNumpy()]
+    objs = []
+    for i in range(250):
+        center = eu.Vector2(rnd.uniform(0.0, 400.0), rnd.uniform(0.0, 300.0))
+        if i % 3:
+            shape = cm.CircleShape(center, rnd.uniform(0.5, 5.0))
+        else:
+            shape = cm.AARectShape(center, rnd.uniform(0.5, 5.0),
+                                   rnd.uniform(0.5, 5.0))
+        objs.append(Obj_with_shape('%d' % i, shape))
+    for obj in objs:
+        brute.add(obj)
+        for collman in collmans:
+            collman.add(obj)
+    probe = create_obj_with_circle('probe', eu.Vector2(390.0, 10.0), 2.0)
+
+    segments = [((-10.0, -5.0), (410.0, 290.0)), ((200.0, 0.0), (200.0, 300.0)),
+                ((400.0, 150.0), (0.0, 151.0)), ((50.0, 50.0), (53.0, 51.0))]
+    for collman in collmans:
+        for obj in objs[:15] + [probe]:
+            for k in [1, 5, 20]:
+                expected = brute.knn(obj, k)
+                got = collman.knn(obj, k)
+                assert len(got) == len(expected)
+                for (a, da), (b, db) in zip(got, expected):
+                    assert abs(da - db) < fe
+        assert len(collman.knn(probe, 1000)) == len(objs)
+        for p0, p1 in segments:
+            expected = brute.objs_on_segment(p0, p1)
+            got = collman.objs_on_segment(eu.Vector2(*p0), eu.Vector2(*p1))
+            assert set(got) == set(expected)
+            ts = [o.cshape.segment_hit(p0[0], p0[1], p1[0], p1[1]) for o in got]
+            assert ts == sorted(ts)
+
+def test_numpy_parallel_stripes_deterministic():
+    import random
+    rnd = random.Random(8642)
+    serial = cm.CollisionManagerNumpy()
+    parallel = cm.CollisionManagerNumpy(workers=4)
+    other_parallel = cm.CollisionManagerNumpy(workers=3)
+    brute = cm.CollisionManagerBruteForce()
+    for i in range(800):
+        center = eu.Vector2(rnd.uniform(0.0, 600.0), rnd.uniform(0.0, 300.0))
+        obj = create_obj_with_circle('%d' % i, center, rnd.uniform(1.0, 8.0))
+        serial.add(obj)
+        parallel.add(obj)
+        other_parallel.add(obj)
+        brute.add(obj)
+    try:
+        expected = list(parallel.iter_all_collisions())
+        assert expected == list(parallel.iter_all_collisions())
+        assert expected == list(other_parallel.iter_all_collisions())
+        # the single worker path yields the same pairs, in another order
+        expected = set(frozenset(pair) for pair in expected)
+        assert expected == set(frozenset(pair)
+                               for pair in serial.iter_all_collisions())
+        assert expected == set(frozenset(pair)
+                               for pair in brute.iter_all_collisions())
+    finally:
+        parallel.close()
+        other_parallel.close()
+    assert parallel._pool is None
+    # still usable after close
+    assert expected == set(frozenset(pair)
+                           for pair in parallel.iter_all_collisions())
+    parallel.close()
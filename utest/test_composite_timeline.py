@@ -0,0 +1,127 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+from cocos.director import director
+from cocos.cocosnode import CocosNode
+import cocos.actions as ac
+from cocos.actions.base_actions import Sequence_IntervalAction
+
+director.init()
+
+fe = 1.0e-4
+
+def long_sequence(segments):
+    template = ac.MoveBy((10, 0), 1)
+    for i in range(1, segments):
+        template = template + ac.MoveBy((0, i), 0.5 * (i % 3))
+    return template
+
+def test_sequence_is_flat():
+    template = long_sequence(50)
+    assert len(template.templates) == 50
+    assert abs(template.duration - sum(0.5 * (i % 3) for i in range(50)) - 1) < fe
+    assert template.splits == sorted(template.splits)
+
+def test_do_shares_templates():
+    template = long_sequence(50)
+    node = CocosNode()
+    worker = node.do(template)
+    assert worker.templates is template.templates
+    # only the first two components have workers
+    assert len([a for a in worker.actions if a is not None]) == 2
+    assert worker.actions[0] is not template.templates[0]
+
+def test_operands():
+    a, b, c = ac.MoveBy((10, 0), 1), ac.RotateBy(90, 2), ac.ScaleBy(2, 3)
+    template = a + (b + c)
+    assert isinstance(template.one, ac.MoveBy)
+    assert template.one.duration == 1
+    two = template.two
+    assert isinstance(two, Sequence_IntervalAction)
+    assert two.duration == 5 and two.templates == template.templates[1:]
+    assert isinstance(two.one, ac.RotateBy) and isinstance(two.two, ac.ScaleBy)
+    left = (a + b + c).one
+    assert left.duration == 3 and isinstance(left.two, ac.RotateBy)
+    # once started, a single action operand is its worker
+    node = CocosNode()
+    worker = node.do(a + b)
+    assert worker.one is worker.actions[0] and worker.one.target is node
+    assert worker.two is worker.actions[1] and worker.two.target is node
+
+def test_long_sequence_ends_where_expected():
+    template = long_sequence(50)
+    node = CocosNode()
+    node.do(template)
+    elapsed = 0.0
+    while node.actions:
+        node._step(0.1)
+        elapsed += 0.1
+        if elapsed < template.duration:
+            assert node.position[1] <= sum(range(50)) + fe
+    assert abs(node.position[0] - 10) < fe
+    assert abs(node.position[1] - sum(range(50))) < fe
+
+def test_trailing_instant_after_rounded_durations():
+    # 0.1 + 0.2 + 0.3 is not exactly 0.1 + (0.2 + 0.3) in floating point
+    calls = []
+    template = ac.MoveBy((10, 0), 0.1) + (ac.MoveBy((10, 0), 0.2) +
+                                          ac.MoveBy((10, 0), 0.3) +
+                                          ac.CallFunc(calls.append, 1))
+    assert max(template.splits) <= 1.0
+    node = CocosNode()
+    node.do(template)
+    for i in range(100):
+        node._step(0.01)
+    assert calls == [1]
+    assert node.position == (30, 0)
+
+def test_reversed_flat_sequence():
+    template = ac.MoveBy((10, 0), 1) + ac.MoveBy((0, 10), 1) + ac.MoveBy((5, 5), 0)
+    node = CocosNode()
+    node.do(template + ac.Reverse(template))
+    for i in range(50):
+        node._step(0.1)
+    assert abs(node.position[0]) < fe and abs(node.position[1]) < fe
+
+def test_spawn_is_flat():
+    node = CocosNode()
+    template = (ac.MoveBy((10, 0), 1) | ac.RotateBy(90, 2) |
+                ac.ScaleBy(3, 4))
+    assert len(template.templates) == 3
+    assert template.duration == 4
+    worker = node.do(template)
+    assert worker.templates is template.templates
+    node._step(0.0)
+    node._step(1.0)
+    assert abs(node.position[0] - 10) < fe
+    assert abs(node.rotation - 45) < fe and abs(node.scale - 1.5) < fe
+    for i in range(4):
+        node._step(1.0)
+    assert abs(node.scale - 3) < fe and abs(node.rotation - 90) < fe
+    assert not node.actions
+
+def test_spawn_zero_duration_done_before_next_starts():
+    node = CocosNode()
+    node.do(ac.MoveTo((100, 100), 0) | ac.MoveBy((50, 0), 1))
+    for i in range(12):
+        node._step(0.1)
+    assert abs(node.position[0] - 150) < fe
+    assert abs(node.position[1] - 100) < fe
+
+def test_loop_and_repeat_share_templates():
+    node = CocosNode()
+    loop = ac.MoveBy((10, 0), 1) * 3
+    assert node.do(loop).one is loop.one
+    repeat = ac.Repeat(ac.RotateBy(10, 1))
+    assert node.do(repeat).original is repeat.original
@@ -0,0 +1,105 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+import math
+
+from cocos.director import director
+from cocos.cocosnode import CocosNode
+from cocos.path import Bezier as BezierPath, PathTable
+import cocos.actions as ac
+
+director.init()
+
+rec = []
+
+class UIntervalAction(ac.IntervalAction):
+    def init(self, duration):
+        self.duration = duration
+
+    def update(self, t):
+        rec.append(t)
+
+    def __reversed__(self):
+        return UIntervalAction(self.duration)
+
+def test_easing_table_interpolates():
+    table = ac.EasingTable(lambda t: t * t, 4)
+    assert table.values == [0.0, 1 / 16, 4 / 16, 9 / 16, 1.0]
+    assert table(0.0) == 0.0 and table(1.0) == 1.0
+    assert abs(table(0.125) - 1 / 32) < 1.0e-9
+    assert table(-1.0) == 0.0 and table(2.0) == 1.0
+    r = table.reversed()
+    assert abs(r(0.25) - (1.0 - table(0.75))) < 1.0e-9
+
+def test_tables_follow_exact_curves():
+    exact = ac.Accelerate(UIntervalAction(1), 3.0)
+    table = ac.Ease(UIntervalAction(1), lambda t: t ** 3.0, 1024)
+    jump = ac.JumpBy((0, 0), 1, 2, 1, resolution=1024)
+    for t in [0.0, 0.1, 0.33, 0.5, 0.77, 1.0]:
+        del rec[:]
+        exact.update(t)
+        table.update(t)
+        assert abs(rec[0] - rec[1]) < 1.0e-4
+        assert abs(jump.hop(t) - abs(math.sin(t * math.pi * 2))) < 1.0e-4
+    # update(1.0) must be exact
+    assert rec[1] == 1.0
+
+def test_tables_shared():
+    node = CocosNode()
+    worker = node.do(ac.JumpBy((10, 0), 20, 2, 1, resolution=64))
+    assert worker.hop is ac.JumpBy((0, 0), 5, 2, 3, resolution=64).hop
+    # Ease tables are not cached, an EasingTable can be shared explicitly
+    def func(t):
+        return t * t
+    assert (ac.Ease(UIntervalAction(1), func).ease is not
+            ac.Ease(UIntervalAction(1), func).ease)
+    table = ac.EasingTable(func)
+    assert ac.Ease(UIntervalAction(1), table).ease is table
+    assert node.do(ac.Ease(UIntervalAction(1), table)).ease is table
+
+def test_ease_and_reverse():
+    ease = ac.Ease(UIntervalAction(1), lambda t: t ** 4, 256)
+    del rec[:]
+    ease.update(0.5)
+    assert abs(rec[0] - 0.0625) < 1.0e-3
+    reverse = ac.Reverse(ease)
+    assert isinstance(reverse, ac.Ease)
+    assert abs(reverse.ease(0.5) - (1.0 - 0.0625)) < 1.0e-3
+
+path = BezierPath((0, 0), (300, 0), (50, 200), (250, -200))
+
+def test_path_table_matches_path():
+    table = PathTable(path, 512)
+    for t in [0.0, 0.2, 0.5, 0.9, 1.0]:
+        x, y = path.at(t)
+        tx, ty = table.at(t)
+        assert abs(x - tx) < 0.1 and abs(y - ty) < 0.1
+
+def test_path_table_arc_length():
+    table = PathTable(path, 256, arc_length=True)
+    points = [table.at(i / 64) for i in range(65)]
+    steps = [math.hypot(x1 - x0, y1 - y0)
+             for (x0, y0), (x1, y1) in zip(points, points[1:])]
+    assert max(steps) - min(steps) < 0.02 * max(steps)
+    assert abs(points[-1][0] - 300) < 1.0e-6 and abs(points[-1][1]) < 1.0e-6
+
+def test_bezier_action_shares_table():
+    template = ac.Bezier(path, 2, resolution=128, arc_length=True)
+    assert isinstance(template.bezier, PathTable)
+    node = CocosNode()
+    worker = node.do(template)
+    assert worker.bezier is template.bezier
+    node._step(2.0)
+    assert abs(node.position[0] - 300) < 1.0e-6
+    assert ac.Reverse(template).bezier is template.bezier
@@ -0,0 +1,314 @@
+from __future__ import division, print_function, unicode_literals
+
+# unit test to run with py.test
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+import numpy
+import pytest
+
+from cocos.director import director
+import cocos.particle as pa
+from cocos.euclid import Point2
+
+director.init()
+
+class SmallSystem(pa.ParticleSystem):
+    total_particles = 50
+    duration = -1
+    gravity = Point2(0, -90)
+    angle = 90.0
+    angle_var = 20.0
+    speed = 100.0
+    speed_var = 10.0
+    life = 1.0
+    life_var = 0.5
+    size = 10.0
+    size_var = 2.0
+    emission_rate = 100.0
+    start_color = pa.Color(0.5, 0.5, 0.5, 1.0)
+    end_color = pa.Color(0.1, 0.1, 0.1, 0.0)
+
+def test_emit_fills_alive_prefix():
+    ps = SmallSystem(fallback=False)
+    assert ps.particle_count == 0
+    assert ps.emit(20) == 20
+    assert ps.particle_count == 20
+    assert (ps.particle_life[:20] >= 0).all()
+    assert (ps.particle_life[20:] < 0).all()
+    # no room for all
+    assert ps.emit(40) == 30
+    assert ps.particle_count == ps.total_particles
+    assert ps.emit(1) == 0
+
+def test_add_particle_raises_when_full():
+    ps = SmallSystem(fallback=False)
+    ps.emit(ps.total_particles)
+    with pytest.raises(pa.ExceptionNoEmptyParticle):
+        ps.add_particle()
+
+def test_remove_dead_particles_keeps_alive_packed():
+    ps = SmallSystem(fallback=False)
+    ps.emit(30)
+    # tag each particle to follow it after swap-remove
+    ps.particle_size[:30, 0] = numpy.arange(30)
+    dead = [0, 3, 4, 17, 28, 29]
+    ps.particle_life[dead] = -1.0
+    ps.remove_dead_particles()
+    assert ps.particle_count == 30 - len(dead)
+    survivors = set(ps.particle_size[:ps.particle_count, 0].astype(int))
+    assert survivors == set(range(30)) - set(dead)
+    assert (ps.particle_life[:ps.particle_count] >= 0).all()
+    assert (ps.particle_life[ps.particle_count:] < 0).all()
+
+def test_step_emits_as_one_by_one_loop():
+    ps = SmallSystem(fallback=False)
+    # emission_rate 100 -> rate 0.01; 0.055 allows 5 particles
+    ps.step(0.055)
+    assert ps.particle_count == 5
+    assert abs(ps.emit_counter - 0.005) < 1.0e-6
+
+def test_step_removes_dead_particles():
+    ps = SmallSystem(fallback=False)
+    ps.emit(10)
+    ps.stop_system()
+    ps.particle_life[:5] = 0.01
+    ps.step(0.02)
+    assert ps.particle_count == 5
+
+def test_fallback_quads_from_particles():
+    ps = SmallSystem(fallback=True)
+    ps.emit(7)
+    ps.update_vertexs_from_pos()
+    ps.update_per_vertex_colors()
+    for i in range(7):
+        for j in range(4):
+            vertex = ps.vertexs[i * 4 + j]
+            expected = (ps.particle_pos[i] +
+                        ps._quad_corners[j] * ps.size / 2.0)
+            assert numpy.allclose(vertex, expected)
+            assert numpy.allclose(ps.per_vertex_colors[i * 4 + j],
+                                  ps.particle_color[i])
+    assert numpy.allclose(ps.tex_coords[4:8],
+                          [[0.0, 1.0], [0.0, 0.0], [1.0, 0.0], [1.0, 1.0]])
+
+class SpinningSystem(SmallSystem):
+    start_spin = 90.0
+    end_spin = 90.0
+    use_particle_size = True
+
+def test_fallback_quads_per_particle_size_and_rotation():
+    ps = SpinningSystem(fallback=True)
+    ps.emit(2)
+    ps.particle_pos[:2] = [[10.0, 20.0], [0.0, 0.0]]
+    ps.particle_size[:2, 0] = [4.0, 8.0]
+    ps.update_vertexs_from_pos()
+    # rotated 90 degrees clockwise, NW corner goes to NE
+    assert numpy.allclose(ps.vertexs[0], [12.0, 22.0])
+    assert numpy.allclose(ps.vertexs[4], [4.0, 4.0])
+    # SW corner goes to NW
+    assert numpy.allclose(ps.vertexs[5], [-4.0, 4.0])
+
+class SwirlSystem(SmallSystem):
+    radial_accel = -60.0
+    radial_accel_var = 10.0
+    tangential_accel = 15.0
+    tangential_accel_var = 5.0
+    pos_var = Point2(20, 20)
+
+def legacy_update(ps, delta):
+    # the update_particles before the affectors pipeline, alive particles
+    n = ps.particle_count
+    pos = ps.particle_pos[:n].astype(numpy.float64)
+    norm = numpy.sqrt((pos ** 2).sum(axis=1))
+    radial = pos / norm[:, None]
+    tangential = numpy.column_stack([-radial[:, 1], radial[:, 0]])
+    accel = (radial * ps.particle_rad[:n] + tangential * ps.particle_tan[:n] +
+             ps.particle_grav[:n])
+    direction = ps.particle_dir[:n] + accel * delta
+    pos = pos + direction * delta
+    color = ps.particle_color[:n] + ps.particle_delta_color[:n] * delta
+    return direction, pos, color
+
+def test_default_affectors_match_legacy_update():
+    ps = SwirlSystem(fallback=False)
+    ps.emit(30)
+    direction, pos, color = legacy_update(ps, 0.1)
+    ps.update_particles(0.1)
+    assert numpy.allclose(ps.particle_dir[:30], direction, atol=1.0e-3)
+    assert numpy.allclose(ps.particle_pos[:30], pos, atol=1.0e-3)
+    assert numpy.allclose(ps.particle_color[:30], color, atol=1.0e-5)
+
+class DraggedSystem(SmallSystem):
+    gravity = Point2(0, 0)
+    affectors = (pa.Drag(1.0), pa.Move(), pa.Age(),
+                 pa.SizeOverLife([10.0, 30.0]))
+
+def test_custom_affectors_pipeline():
+    ps = DraggedSystem(fallback=False)
+    ps.emit(10)
+    ps.particle_life[:10, 0] = 2.0
+    ps.particle_total_life[:10, 0] = 2.0
+    speed_before = ps.particle_dir[:10].copy()
+    ps.update_particles(1.0)
+    assert numpy.allclose(ps.particle_dir[:10], speed_before * numpy.exp(-1.0))
+    # half life elapsed, size half way between 10 and 30
+    assert numpy.allclose(ps.particle_size[:10, 0], 20.0)
+
+def test_attractor_pulls_towards_point():
+    ps = SmallSystem(fallback=False)
+    ps.emit(2)
+    ps.particle_pos[:2] = [[10.0, 0.0], [0.0, 0.0]]
+    ps.particle_dir[:2] = 0.0
+    attractor = pa.Attractor(0.0, 0.0, 5.0)
+    attractor.affect(ps, 2, 1.0)
+    assert numpy.allclose(ps.particle_dir[0], [-5.0, 0.0])
+    # inside min_distance, not affected
+    assert numpy.allclose(ps.particle_dir[1], [0.0, 0.0])
+
+class AdditiveSystem(SmallSystem):
+    blend_additive = True
+
+def test_particle_batch_groups_and_batch_coordinates():
+    batch = pa.ParticleBatch()
+    batch.position = (10, 10)
+    systems = [SmallSystem(fallback=False), SmallSystem(fallback=False),
+               AdditiveSystem(fallback=False)]
+    for i, system in enumerate(systems):
+        system.is_running = True
+        system.position = (100 + i * 100, 50)
+        system.scale = 2.0
+        system.emit(i + 1)
+        system.particle_pos[:i + 1] = 0.0
+        batch.register(system)
+        assert system.batch is batch
+
+    groups = batch.groups()
+    assert [len(systems) for texture, additive, systems in groups] == [2, 1]
+    texture, additive, group = groups[0]
+    buffer, num_vertexs = batch.fill_buffer(texture, additive, group)
+    assert num_vertexs == (1 + 2) * 4
+    # size 10 scaled by 2, position relative to the batch
+    assert numpy.allclose(buffer[0, 0:2], [100 - 10 - 10, 50 + 10 - 10])
+    assert numpy.allclose(buffer[6, 0:2], [200 + 10 - 10, 50 - 10 - 10])
+    assert numpy.allclose(buffer[4, 2:6], systems[1].particle_color[0])
+
+    batch.unregister(systems[0])
+    assert systems[0].batch is None
+    assert len(batch.groups()[0][2]) == 1
+
+def test_seeded_systems_evolve_identically():
+    a = SwirlSystem(fallback=False, seed=7)
+    b = SwirlSystem(fallback=False, seed=7)
+    c = SwirlSystem(fallback=False, seed=8)
+    for system in (a, b, c):
+        system.fast_forward(0.5, dt=0.05)
+    assert a.particle_count == b.particle_count > 0
+    for arr_a, arr_b in zip(a.particle_arrays(), b.particle_arrays()):
+        assert (arr_a == arr_b).all()
+    assert not (a.particle_pos[:10] == c.particle_pos[:10]).all()
+
+class FixedStepSystem(SwirlSystem):
+    fixed_step = 0.02
+
+def test_fixed_step_substepping():
+    a = FixedStepSystem(fallback=False, seed=1)
+    b = FixedStepSystem(fallback=False, seed=1)
+    a.step(0.05)
+    # two whole fixed steps, 0.01 left for the next step
+    assert abs(a.step_accumulator - 0.01) < 1.0e-6
+    b.simulate(0.02)
+    b.simulate(0.02)
+    assert a.particle_count == b.particle_count
+    assert (a.particle_pos == b.particle_pos).all()
+    a.step(0.01)
+    b.simulate(0.02)
+    assert abs(a.step_accumulator) < 1.0e-6
+    assert (a.particle_pos == b.particle_pos).all()
+
+class WarmFire(SmallSystem):
+    warm_up_time = 2.0
+
+def test_warm_up_on_enter():
+    ps = WarmFire(fallback=False, seed=3)
+    ps.on_enter()
+    # 100 particles per second, life 1.0 +/- 0.5; near to full
+    assert ps.particle_count > 40
+    count = ps.particle_count
+    ps.on_exit()
+    ps.on_enter()
+    # only the first time
+    assert ps.particle_count == count
+
+class ShortBurst(SmallSystem):
+    duration = 0.05
+    life = 0.1
+    life_var = 0.0
+
+def test_pool_recycles_finished_systems():
+    from cocos.cocosnode import CocosNode
+    pool = pa.ParticleSystemPool(ShortBurst, prewarm=1, fallback=False)
+    parent = CocosNode()
+    first = pool.get()
+    arrays = first.particle_arrays()
+    second = pool.get()
+    assert pool.stats() == {'hits': 1, 'misses': 1, 'free': 0}
+    parent.add(first)
+    for i in range(20):
+        if first not in parent.get_children():
+            break
+        first.step(0.02)
+    # finished, removed from parent and back in the pool
+    assert first not in parent.get_children()
+    assert pool.free == [first]
+
+    again = pool.get()
+    assert again is first
+    assert pool.hits == 2
+    assert again.particle_count == 0 and again.active and again.elapsed == 0
+    assert [c for c in again.scheduled_calls if c[0] == again.step]
+    # arrays reused, not reallocated
+    assert all(a is b for a, b in zip(arrays, again.particle_arrays()))
+    again.step(0.02)
+    assert again.particle_count > 0
+
+def test_pool_resets_recycled_systems():
+    from cocos.cocosnode import CocosNode
+    import cocos.actions as ac
+    pool = pa.ParticleSystemPool(ShortBurst, fallback=False)
+    system = pool.get()
+    system.position = (100, 50)
+    system.rotation = 30
+    system.scale = 2
+    system.visible = False
+    system.angle = 45.0
+    system.gravity = Point2(0.0, -10.0)
+    action = system.do(ac.MoveBy((10, 0), 5))
+    pool.release(system)
+
+    again = pool.get()
+    assert again is system
+    assert again.position == (0, 0) and again.rotation == 0.0
+    assert again.scale == 1.0 and again.visible
+    assert not again.actions and action.target is None
+    assert again.angle == ShortBurst.angle
+    assert again.gravity is ShortBurst.gravity
+    assert 'angle' not in again.__dict__
+
+def test_pool_max_size():
+    pool = pa.ParticleSystemPool(ShortBurst, max_size=1, fallback=False)
+    a = pool.get()
+    b = pool.get()
+    pool.release(a)
+    pool.release(b)
+    assert pool.free == [a]
+    assert b.pool is None
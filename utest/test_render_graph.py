@@ -0,0 +1,158 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+from cocos.director import director
+from cocos.cocosnode import CocosNode
+from cocos.scene import Scene
+from cocos import euclid
+import cocos.render_graph as render_graph
+
+director.init()
+
+fe = 1.0e-4
+
+# a modelview stack replacing the GL one used by the render graph
+stack = [euclid.Matrix3()]
+
+def glPushMatrix():
+    stack.append(stack[-1].copy())
+
+def glPopMatrix():
+    stack.pop()
+
+def glMultMatrixf(m):
+    mat = euclid.Matrix3()
+    mat.a, mat.e, mat.b, mat.f, mat.c, mat.g = m[0], m[1], m[4], m[5], m[12], m[13]
+    stack[-1] = stack[-1] * mat
+
+render_graph.glPushMatrix = glPushMatrix
+render_graph.glPopMatrix = glPopMatrix
+render_graph.glMultMatrixf = glMultMatrixf
+
+rec = []
+
+class Recorder(CocosNode):
+    def __init__(self, name):
+        super(Recorder, self).__init__()
+        self.name = name
+
+    def draw(self):
+        # where the node origin lands
+        p = stack[-1] * self.get_local_transform() * euclid.Point2(0, 0)
+        rec.append((self.name, p.x, p.y))
+
+class CustomVisit(Recorder):
+    def visit(self):
+        rec.append(('visit', self.name))
+
+def expected(node):
+    p = node.get_world_transform() * euclid.Point2(0, 0)
+    return p.x, p.y
+
+def make_tree():
+    scene = Scene()
+    scene.render_graph = render_graph.RenderGraph()
+    a = Recorder('a')
+    a.position = (100, 50)
+    a.rotation = 30
+    b = Recorder('b')
+    b.position = (10, 0)
+    b.scale = 2
+    c = Recorder('c')
+    c.position = (5, 5)
+    d = Recorder('d')
+    d.position = (-3, 7)
+    scene.add(a, z=1)
+    a.add(b, z=-1)
+    a.add(d, z=2)
+    b.add(c)
+    return scene, dict(a=a, b=b, c=c, d=d)
+
+def check_frame(scene, nodes, order):
+    del rec[:]
+    scene.visit()
+    assert [r[0] for r in rec] == order
+    for name, x, y in rec:
+        ex, ey = expected(nodes[name])
+        assert abs(x - ex) < fe and abs(y - ey) < fe
+
+def test_draws_in_visit_order_with_world_matrices():
+    scene, nodes = make_tree()
+    check_frame(scene, nodes, ['b', 'c', 'a', 'd'])
+    assert scene.render_graph.num_builds == 1
+    # nothing changed, no world matrix recomputed
+    check_frame(scene, nodes, ['b', 'c', 'a', 'd'])
+    assert scene.render_graph.num_updated == 0
+    # a changes, its subtree follows
+    nodes['a'].rotation = 90
+    nodes['a'].position = (0, 0)
+    check_frame(scene, nodes, ['b', 'c', 'a', 'd'])
+    assert scene.render_graph.num_updated == 2
+    assert scene.render_graph.num_builds == 1
+
+def test_add_remove_rebuilds():
+    scene, nodes = make_tree()
+    check_frame(scene, nodes, ['b', 'c', 'a', 'd'])
+    e = nodes['e'] = Recorder('e')
+    e.position = (1, 1)
+    nodes['b'].add(e, z=-5)
+    check_frame(scene, nodes, ['e', 'b', 'c', 'a', 'd'])
+    nodes['a'].remove(nodes['d'])
+    check_frame(scene, nodes, ['e', 'b', 'c', 'a'])
+    assert scene.render_graph.num_builds == 3
+    # removed nodes are not tracked anymore
+    nodes['d'].add(Recorder('f'))
+    assert not scene.render_graph.dirty
+
+def test_node_moved_to_another_graph():
+    scene, nodes = make_tree()
+    other, other_nodes = make_tree()
+    check_frame(scene, nodes, ['b', 'c', 'a', 'd'])
+    d = nodes['d']
+    nodes['a'].remove(d)
+    d.name = 'e'
+    other_nodes['a'].add(d, z=3)
+    other_nodes['e'] = d
+    check_frame(other, other_nodes, ['b', 'c', 'a', 'd', 'e'])
+    # the rebuild of the old graph must not steal d from the new one
+    check_frame(scene, nodes, ['b', 'c', 'a'])
+    d.add(Recorder('f'))
+    assert other.render_graph.dirty
+    assert not scene.render_graph.dirty
+
+def test_invisible_subtree_skipped():
+    scene, nodes = make_tree()
+    nodes['b'].visible = False
+    check_frame(scene, nodes, ['a', 'd'])
+    nodes['b'].visible = True
+    check_frame(scene, nodes, ['b', 'c', 'a', 'd'])
+
+def test_custom_visit_nodes_visited():
+    scene, nodes = make_tree()
+    custom = CustomVisit('x')
+    custom.add(Recorder('y'))
+    nodes['b'].add(custom, z=1)
+    del rec[:]
+    scene.visit()
+    assert rec[2] == ('visit', 'x')
+    # children of custom visit nodes are not in the draw list
+    custom.add(Recorder('z'))
+    assert not scene.render_graph.dirty
+
+def test_scene_without_graph_uses_visit():
+    scene, nodes = make_tree()
+    scene.render_graph = None
+    del rec[:]
+    scene.visit()
+    assert [r[0] for r in rec] == ['b', 'c', 'a', 'd']
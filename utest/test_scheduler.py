@@ -0,0 +1,152 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+from cocos.director import director
+from cocos.cocosnode import CocosNode
+from cocos.scene import Scene
+from cocos.scheduler import Scheduler
+import cocos.actions as ac
+
+director.init()
+
+fe = 1.0e-6
+
+rec = []
+
+class Recorder(CocosNode):
+    def __init__(self, name, priority=0):
+        super(Recorder, self).__init__()
+        self.name = name
+        self.schedule_priority = priority
+        self.schedule(self.tick)
+
+    def tick(self, dt):
+        rec.append((self.name, dt))
+
+def make_scene(*nodes, **kwargs):
+    scene = Scene()
+    scene.scheduler = Scheduler(**kwargs)
+    for node in nodes:
+        scene.add(node)
+    return scene
+
+def test_callbacks_by_priority():
+    del rec[:]
+    scene = make_scene(Recorder('a', 5), Recorder('b', -1), Recorder('c', 5))
+    scene.on_enter()
+    scene.scheduler.tick(0.1)
+    assert [name for name, dt in rec] == ['b', 'a', 'c']
+    assert all(abs(dt - 0.1) < fe for name, dt in rec)
+
+def test_pause_resume_on_exit_enter():
+    del rec[:]
+    a = Recorder('a')
+    scene = make_scene(a)
+    scene.on_enter()
+    scene.scheduler.tick(0.1)
+    a.on_exit()
+    scene.scheduler.tick(0.1)
+    assert [name for name, dt in rec] == ['a']
+    a.on_enter()
+    scene.scheduler.tick(0.1)
+    assert [name for name, dt in rec] == ['a', 'a']
+
+def test_schedule_unschedule_while_running():
+    del rec[:]
+    a = Recorder('a')
+    scene = make_scene(a)
+    scene.on_enter()
+    a.unschedule(a.tick)
+    scene.scheduler.tick(0.1)
+    assert rec == []
+    a.schedule_interval(a.tick, 0.25)
+    for i in range(5):
+        scene.scheduler.tick(0.1)
+    assert len(rec) == 2
+    assert abs(rec[0][1] - 0.3) < fe
+
+def test_actions_stepped_by_scheduler():
+    node = CocosNode()
+    scene = make_scene(node)
+    scene.on_enter()
+    node.do(ac.MoveBy((100, 0), 1))
+    # as with pyglet.clock, the first step after on_enter is skipped
+    for i in range(5):
+        scene.scheduler.tick(0.1)
+    assert abs(node.position[0] - 40.0) < fe
+    # pause_scheduler does not stop actions
+    node.pause_scheduler()
+    scene.scheduler.tick(0.1)
+    assert abs(node.position[0] - 50.0) < fe
+    # pause does
+    node.pause()
+    scene.scheduler.tick(0.1)
+    assert abs(node.position[0] - 50.0) < fe
+
+def test_fixed_dt():
+    del rec[:]
+    scene = make_scene(Recorder('a'), fixed_dt=0.02)
+    scene.on_enter()
+    scene.scheduler.tick(0.05)
+    assert [dt for name, dt in rec] == [0.02, 0.02]
+    assert abs(scene.scheduler.accumulator - 0.01) < fe
+
+def test_cost_report():
+    scene = make_scene(Recorder('a'), Recorder('b'), profile=True)
+    scene.on_enter()
+    scene.scheduler.tick(0.1)
+    scene.scheduler.tick(0.1)
+    report = scene.scheduler.cost_report()
+    calls = dict((name, calls) for name, calls, total, mean in report)
+    assert calls['Recorder.tick'] == 4
+    assert all(mean >= 0.0 for name, calls, total, mean in report)
+    scene.scheduler.reset_costs()
+    assert scene.scheduler.cost_report() == []
+
+def test_many_nodes_exit_and_enter_again():
+    del rec[:]
+    nodes = [Recorder(i) for i in range(100)]
+    scene = make_scene(*nodes)
+    scene.on_enter()
+    scene.on_exit()
+    # evicts the paused callbacks
+    scene.scheduler.tick(0.1)
+    assert rec == []
+    assert len(scene.scheduler.entries) < 10
+    scene.on_enter()
+    scene.scheduler.tick(0.1)
+    assert sorted(name for name, dt in rec) == list(range(100))
+
+def test_removed_nodes_are_collectable():
+    import gc
+    import weakref
+    nodes = [Recorder(i) for i in range(10)]
+    scene = make_scene(*nodes)
+    scene.on_enter()
+    removed = []
+    for i in range(200):
+        node = CocosNode()
+        node.add(CocosNode())
+        scene.add(node)
+        node.do(ac.MoveBy((10, 0), 1))
+        scene.scheduler.tick(0.1)
+        scene.remove(node)
+        scene.scheduler.tick(0.1)
+        removed.append(weakref.ref(node))
+    del node
+    # drawing a frame drops the removed children from the list
+    scene.get_children()
+    gc.collect()
+    assert len(scene.scheduler.slots) == 11
+    assert not [r for r in removed if r() is not None]
@@ -0,0 +1,119 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+import math
+
+import pytest
+
+from cocos.director import director
+from cocos.sprite_array import SpriteArray
+import cocos.actions as ac
+
+director.init()
+
+fe = 1.0e-3
+
+class FakeImage(object):
+    id = 1
+    target = 3553
+    width = 32
+    height = 16
+    tex_coords = (0.0, 0.0, 0.0, 0.5, 0.0, 0.0,
+                  0.5, 0.25, 0.0, 0.0, 0.25, 0.0)
+
+    def get_texture(self):
+        return self
+
+def expected_quad(x, y, rotation, scale, anchor, width=32, height=16):
+    # as Sprite._update_position, without rounding
+    x1 = -anchor[0] * scale
+    y1 = -anchor[1] * scale
+    x2 = x1 + width * scale
+    y2 = y1 + height * scale
+    r = -math.radians(rotation)
+    cr = math.cos(r)
+    sr = math.sin(r)
+    return [(cx * cr - cy * sr + x, cx * sr + cy * cr + y)
+            for cx, cy in [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]]
+
+def test_quads_match_sprite_math():
+    array = SpriteArray(FakeImage(), capacity=2)
+    params = [((10, 20), 0, 1, None), ((-5, 7), 30, 2, (0, 0)),
+              ((100, 50), 200, 0.5, (4, 8))]
+    for position, rotation, scale, anchor in params:
+        array.add_sprite(position, rotation, scale, anchor=anchor)
+    # grown past the initial capacity
+    assert array.capacity >= 3 and array.num_sprites == 3
+    buffer, num_vertexs = array.fill_buffer()
+    assert num_vertexs == 12
+    for i, (position, rotation, scale, anchor) in enumerate(params):
+        if anchor is None:
+            anchor = (16, 8)
+        quad = expected_quad(position[0], position[1], rotation, scale, anchor)
+        for k, (x, y) in enumerate(quad):
+            assert abs(buffer[i * 4 + k, 0] - x) < fe
+            assert abs(buffer[i * 4 + k, 1] - y) < fe
+    # texture coordinates from the image
+    assert list(buffer[4:8, 6]) == [0.0, 0.5, 0.5, 0.0]
+    assert list(buffer[4:8, 7]) == [0.0, 0.0, 0.25, 0.25]
+
+def test_bulk_update_and_colors():
+    array = SpriteArray(FakeImage())
+    for i in range(10):
+        array.add_sprite((i, 0), opacity=51, color=(255, 0, 102))
+    array.positions[:, 1] += 100
+    buffer, num_vertexs = array.fill_buffer()
+    quad = expected_quad(3, 100, 0, 1, (16, 8))
+    assert abs(buffer[3 * 4, 0] - quad[0][0]) < fe
+    assert abs(buffer[3 * 4, 1] - quad[0][1]) < fe
+    assert abs(buffer[0, 2] - 1.0) < fe
+    assert abs(buffer[0, 4] - 0.4) < fe
+    assert abs(buffer[0, 5] - 0.2) < fe
+
+def test_sprite_view_and_removal():
+    array = SpriteArray(FakeImage())
+    a = array.add_sprite((0, 0))
+    b = array.add_sprite((5, 5))
+    view = array[b]
+    view.position = (50, 60)
+    view.rotation = 90
+    view.scale = 2
+    view.opacity = 128
+    view.color = (1, 2, 3)
+    assert view.position == (50.0, 60.0)
+    assert view.x == 50.0 and view.rotation == 90.0
+    assert view.width == 64 and view.height == 32
+    assert view.color == (1, 2, 3)
+    assert view.contains(40, 55)
+
+    array.remove_sprite(a)
+    assert array.num_sprites == 1
+    with pytest.raises(IndexError):
+        array.remove_sprite(a)
+    with pytest.raises(IndexError):
+        array.remove_sprite(2)
+    assert array.num_sprites == 1 and array.free == [a]
+    buffer, num_vertexs = array.fill_buffer()
+    assert (buffer[0:4, 0:2] == 0).all()
+    # the slot is reused, the other index is kept
+    assert array.add_sprite((1, 1)) == a
+    assert array[b].position == (50.0, 60.0)
+
+def test_actions_target_views():
+    array = SpriteArray(FakeImage())
+    i = array.add_sprite((0, 0))
+    array.do(ac.MoveBy((100, 0), 1) | ac.FadeTo(0, 1), target=array[i])
+    array._step(0.5)
+    assert abs(array.positions[i, 0] - 50.0) < fe
+    assert abs(array.opacities[i] - 127.5) < 1.0
@@ -0,0 +1,94 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+from cocos.director import director
+from cocos.batch import vertex_updates
+from cocos.sprite import Sprite
+
+director.init()
+
+# the mockup images have no size
+class _Texture(object):
+    width = 32
+    height = 16
+
+    def get_texture(self):
+        return self
+
+def change(sprite):
+    sprite.position = (100, 50)
+    sprite.rotation = 30
+    sprite.scale = 2
+
+def test_deferred_updates_rebuild_once():
+    vertex_updates.flush()
+    immediate = Sprite(_Texture())
+    deferred = Sprite(_Texture())
+    deferred.deferred_updates = True
+    before = list(deferred._vertex_list.vertices)
+
+    change(immediate)
+    change(deferred)
+    assert deferred._vertex_list.vertices == before
+    assert deferred in vertex_updates.pending
+    assert vertex_updates.avoided == 2
+
+    vertex_updates.flush()
+    assert deferred._vertex_list.vertices == immediate._vertex_list.vertices
+    assert vertex_updates.last_avoided == 2
+    assert vertex_updates.avoided == 0
+    assert not vertex_updates.pending
+
+    # nothing pending, the last frame stats are kept
+    vertex_updates.flush()
+    assert vertex_updates.last_avoided == 2
+
+def test_get_AABB_sees_pending_changes():
+    vertex_updates.flush()
+    immediate = Sprite(_Texture())
+    deferred = Sprite(_Texture())
+    deferred.deferred_updates = True
+    change(immediate)
+    change(deferred)
+    assert deferred.get_AABB() == immediate.get_AABB()
+    assert deferred not in vertex_updates.pending
+
+def test_deleted_while_pending():
+    vertex_updates.flush()
+    deferred = Sprite(_Texture())
+    deferred.deferred_updates = True
+    deferred.position = (10, 10)
+    deferred._vertex_list = None
+    vertex_updates.flush()
+
+def test_exit_and_delete_drop_pending():
+    from cocos.cocosnode import CocosNode
+    vertex_updates.flush()
+    immediate = Sprite(_Texture())
+    deferred = Sprite(_Texture())
+    deferred.deferred_updates = True
+    parent = CocosNode()
+    parent.add(deferred)
+    parent.on_enter()
+    change(immediate)
+    change(deferred)
+    parent.remove(deferred)
+    assert deferred not in vertex_updates.pending
+    assert deferred._vertex_list.vertices == immediate._vertex_list.vertices
+
+    deferred.position = (1, 2)
+    assert deferred in vertex_updates.pending
+    deferred.delete()
+    assert deferred not in vertex_updates.pending
+    assert deferred._vertex_list is None
@@ -0,0 +1,92 @@
+from __future__ import division, print_function, unicode_literals
+
+# important: set cocos_utest=1 in the environment before run.
+# that simplifies the pyglet mockup needed
+# remember to erase or set to zero for normal runs
+import os
+assert os.environ['cocos_utest']
+
+# set the desired pyglet mockup
+import sys
+sys.path.insert(0,'pyglet_mockup1')
+import pyglet
+assert pyglet.mock_level == 1
+
+from cocos.director import director
+from cocos.cocosnode import CocosNode
+
+director.init()
+
+fe = 1.0e-4
+
+def uncached_world_point(node, p):
+    x, y = p
+    while node is not None:
+        m = node.get_local_transform()
+        x, y = m.a * x + m.b * y + m.c, m.e * x + m.f * y + m.g
+        node = node.parent
+    return x, y
+
+def make_chain(depth):
+    nodes = [CocosNode()]
+    for i in range(1, depth):
+        node = CocosNode()
+        node.position = (10 * i, -5 * i)
+        node.rotation = 15 * i
+        node.scale = 1.0 + 0.1 * i
+        nodes[-1].add(node)
+        nodes.append(node)
+    return nodes
+
+def assert_close(p, q):
+    assert abs(p[0] - q[0]) < fe and abs(p[1] - q[1]) < fe
+
+def test_world_transform_cached_until_ancestor_changes():
+    nodes = make_chain(6)
+    leaf = nodes[-1]
+    m = leaf.get_world_transform()
+    assert leaf.get_world_transform() is m
+    assert_close(leaf.point_to_world((3, 4)), uncached_world_point(leaf, (3, 4)))
+
+    nodes[2].rotation = 70
+    assert leaf.get_world_transform() is not m
+    assert_close(leaf.point_to_world((3, 4)), uncached_world_point(leaf, (3, 4)))
+
+    # a sibling branch change does not invalidate
+    m = leaf.get_world_transform()
+    other = CocosNode()
+    nodes[3].add(other)
+    other.position = (50, 50)
+    other.get_world_transform()
+    assert leaf.get_world_transform() is m
+
+def test_reparent_invalidates():
+    a = make_chain(3)
+    b = make_chain(3)
+    leaf = a[-1]
+    p = leaf.point_to_world((1, 1))
+    a[-2].remove(leaf)
+    b[-1].add(leaf)
+    q = leaf.point_to_world((1, 1))
+    assert_close(q, uncached_world_point(leaf, (1, 1)))
+    assert abs(p[0] - q[0]) > fe or abs(p[1] - q[1]) > fe
+
+def test_world_inverse():
+    nodes = make_chain(5)
+    leaf = nodes[-1]
+    for angle in (0, 33):
+        nodes[1].rotation = angle
+        p = leaf.point_to_world((7, -2))
+        assert_close(leaf.point_to_local(p), (7, -2))
+    m = leaf.get_world_inverse()
+    assert leaf.get_world_inverse() is m
+
+def test_points_to_world():
+    numpy = __import__('numpy')
+    nodes = make_chain(4)
+    leaf = nodes[-1]
+    points = numpy.array([[0, 0], [1, 2], [-3, 5.5]])
+    out = leaf.points_to_world(points)
+    assert out.shape == (3, 2)
+    for p, q in zip(points, out):
+        assert_close(q, leaf.point_to_world(p))